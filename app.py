@@ -1,12 +1,28 @@
+import io
 import os
 
-from flask import Flask, jsonify, redirect, render_template, request, url_for
+from flask import Flask, abort, jsonify, redirect, render_template, request, send_file, url_for
+from requests import RequestException
 
+from commands import register_commands
 from config import config
+from constants import AppConstants, ValidationMessages
 from models.models import Author, Book, init_db
+from models.search_index import is_fuzzy_search_enabled
+from services.cover_images import get_cover_image, has_cover_image
+from services.cover_jobs import enqueue_cover_image_job, notify_cover_workers, start_cover_workers
 from services.cover_service import refresh_book_cover
-from services.services import AuthorService, BookService, ServiceError
-from utils.helpers import flash_error, flash_success, safe_get_form_data
+from services.import_service import guess_import_format, import_catalog
+from services.services import AuthorService, BookService, CatalogService, ServiceError
+from services.suggest_index import BOOK, get_suggest_index, init_suggest_index, suggest
+from utils.compression import init_compression
+from utils.conditional import conditional_get
+from utils.helpers import (flash_error, flash_success, ndjson_response, parse_field_list, parse_id_list,
+                           parse_page_size, safe_get_form_data)
+from utils.instrumentation import init_instrumentation
+from utils.json_provider import init_json_provider
+from utils.response_cache import cached_response, init_response_cache
+from utils.slow_queries import init_slow_query_log
 from utils.validators import ValidationError
 
 
@@ -21,9 +37,18 @@ def create_app(config_name: str = None) -> Flask:
     config_name = config_name or os.environ.get('FLASK_ENV', 'default')
     app.config.from_object(config[config_name])
 
+    init_json_provider(app)
     init_db(app)
+    init_instrumentation(app)
+    init_slow_query_log(app)
+    init_response_cache(app)
+    init_compression(app)
+    init_suggest_index(app)
     register_error_handlers(app)
     register_routes(app)
+    register_commands(app)
+    if app.config['COVER_WORKERS_AUTOSTART']:
+        start_cover_workers(app)
 
     return app
 
@@ -80,30 +105,42 @@ def register_routes(app: Flask) -> None:
     """
 
     @app.route("/")
+    @conditional_get(CatalogService.get_catalog_version)
+    @cached_response
     def homepage():
         """
-        Display the library homepage with books.
+        Display the library homepage with one page of books.
         :return: Homepage template with books
         """
         try:
             search_query = request.args.get('search', '').strip()
-            sort_by = request.args.get('sort', 'title')
+            fuzzy = request.args.get('fuzzy', '').lower() in ('1', 'true')
+            # Fuzzy results are ranked by similarity unless another order was chosen
+            sort_by = request.args.get('sort') or ('relevance' if fuzzy else 'title')
 
-            if sort_by not in ['title', 'author', 'year']:
+            cursor = request.args.get('cursor')
+
+            if sort_by not in ['title', 'author', 'year', 'relevance']:
                 sort_by = 'title'
+            sort_by = Book.resolve_sort(sort_by, search_query)
 
-            books = BookService.get_all_books(search_query, sort_by)
+            page = BookService.get_books_page(search_query, sort_by, cursor, fuzzy=fuzzy)
 
             return render_template(
                 "home.html",
-                books=books,
+                books=page['books'],
+                next_cursor=page['next_cursor'],
+                is_first_page=not cursor,
                 search_query=search_query,
-                sort_by=sort_by
+                sort_by=sort_by,
+                fuzzy=fuzzy,
+                fuzzy_available=is_fuzzy_search_enabled()
             )
 
-        except ServiceError as e:
+        except (ValidationError, ServiceError) as e:
             flash_error(f"Error loading books: {str(e)}")
-            return render_template("home.html", books=[], search_query='', sort_by='title')
+            return render_template("home.html", books=[], next_cursor=None, is_first_page=True,
+                                   search_query='', sort_by='title', fuzzy=False, fuzzy_available=False)
 
     @app.route("/add_author", methods=["GET", "POST"])
     def add_author():
@@ -136,14 +173,13 @@ def register_routes(app: Flask) -> None:
         :return: Add book template or redirect
         """
         try:
-            authors = AuthorService.get_all_authors()
-
             if request.method == "POST":
                 form_data = {
                     'title': safe_get_form_data(request.form, 'title', ''),
                     'isbn': safe_get_form_data(request.form, 'isbn'),
                     'publication_year': safe_get_form_data(request.form, 'publication_year'),
-                    'author_id': safe_get_form_data(request.form, 'author_id'),
+                    'author_id': (safe_get_form_data(request.form, 'author_id')
+                                  or AuthorService.find_author_id(safe_get_form_data(request.form, 'author_name'))),
                     'rating': safe_get_form_data(request.form, 'rating')
                 }
 
@@ -151,13 +187,14 @@ def register_routes(app: Flask) -> None:
                 flash_success(f"Book '{book.title}' successfully added.")
                 return redirect(url_for("add_book"))
 
-            return render_template("add_book.html", authors=authors)
+            return render_template("add_book.html")
 
         except (ValidationError, ServiceError) as e:
             flash_error(str(e))
-            return render_template("add_book.html", authors=[])
+            return render_template("add_book.html")
 
     @app.route("/book/<int:book_id>")
+    @conditional_get(BookService.get_book_version)
     def book_detail(book_id: int):
         """
         Display detailed information about a specific book.
@@ -195,7 +232,8 @@ def register_routes(app: Flask) -> None:
                         'title': safe_get_form_data(request.form, 'title', ''),
                         'isbn': safe_get_form_data(request.form, 'isbn'),
                         'publication_year': safe_get_form_data(request.form, 'publication_year'),
-                        'author_id': safe_get_form_data(request.form, 'author_id'),
+                        'author_id': (safe_get_form_data(request.form, 'author_id')
+                                      or AuthorService.find_author_id(safe_get_form_data(request.form, 'author_name'))),
                         'rating': safe_get_form_data(request.form, 'rating')
                     }
 
@@ -205,11 +243,9 @@ def register_routes(app: Flask) -> None:
 
                 except (ValidationError, ServiceError) as e:
                     flash_error(str(e))
-                    authors = AuthorService.get_all_authors()
-                    return render_template("edit_book.html", book=book, authors=authors)
+                    return render_template("edit_book.html", book=book)
 
-            authors = AuthorService.get_all_authors()
-            return render_template("edit_book.html", book=book, authors=authors)
+            return render_template("edit_book.html", book=book)
 
         except (ValidationError, ServiceError) as e:
             flash_error(str(e))
@@ -263,6 +299,7 @@ def register_routes(app: Flask) -> None:
         return redirect(url_for("homepage"))
 
     @app.route("/author/<int:author_id>")
+    @conditional_get(AuthorService.get_author_version)
     def author_detail(author_id: int):
         """
         Display detailed information about a specific author.
@@ -337,24 +374,53 @@ def register_routes(app: Flask) -> None:
         return redirect(url_for("homepage"))
 
     @app.route("/api/books")
+    @conditional_get(CatalogService.get_catalog_version)
+    @cached_response
     def api_books():
         """
-        API endpoint to get all books as JSON.
-        :return: JSON response with books data
+        API endpoint to get one page of books as JSON.
+        With format=ndjson all matching books are streamed, one JSON object per line.
+        fields=id,title,author.name limits the keys of each book and embed=author
+        adds the author; only the requested values are loaded and computed.
+        fuzzy=1 also matches books whose title or author name is misspelled in the search.
+        sort=relevance orders search results by their bm25 score, best match first, followed
+        by the books fuzzy=1 found only by similarity, most similar first; it is the default
+        sort of fuzzy searches. When searching, each book has highlights of the matching
+        parts of its title and author, unless fields leaves out highlights.
+        :return: JSON response with books data and the next page cursor
         """
         try:
+            fields = parse_field_list(request.args.get('fields'))
+            projection = BookService.get_book_projection(fields, parse_field_list(request.args.get('embed')))
             search_query = request.args.get('search', '')
-            sort_by = request.args.get('sort', 'title')
+            fuzzy = request.args.get('fuzzy', '').lower() in ('1', 'true')
+            sort_by = request.args.get('sort') or ('relevance' if fuzzy else 'title')
+            cursor = request.args.get('cursor')
+            per_page = parse_page_size(request.args.get('limit'))
+
+            if sort_by not in ['title', 'author', 'year', 'relevance']:
+                sort_by = 'title'
 
-            books = BookService.get_all_books(search_query, sort_by)
-            books_data = [book.to_dict() for book in books]
+            if request.args.get('format') == 'ndjson':
+                return ndjson_response(BookService.iter_books(projection, search_query, sort_by, fuzzy=fuzzy),
+                                       serialize=projection.build)
+
+            page = BookService.get_book_dicts_page(projection, search_query, sort_by, cursor, per_page,
+                                                   fuzzy=fuzzy, highlights=fields is None or 'highlights' in fields)
+            books_data = page['books']
 
             return jsonify({
                 'success': True,
                 'books': books_data,
-                'count': len(books_data)
+                'count': len(books_data),
+                'next_cursor': page['next_cursor']
             })
 
+        except ValidationError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
         except ServiceError as e:
             return jsonify({
                 'success': False,
@@ -362,14 +428,23 @@ def register_routes(app: Flask) -> None:
             }), 500
 
     @app.route("/api/authors")
+    @conditional_get(CatalogService.get_catalog_version)
+    @cached_response
     def api_authors():
         """
         API endpoint to get all authors as JSON.
+        With format=ndjson the authors are streamed, one JSON object per line.
+        fields=id,name limits the keys of each author.
         :return: JSON response with authors data
         """
         try:
-            authors = AuthorService.get_all_authors()
-            authors_data = [author.to_dict() for author in authors]
+            projection = AuthorService.get_author_projection(parse_field_list(request.args.get('fields')),
+                                                             parse_field_list(request.args.get('embed')))
+
+            if request.args.get('format') == 'ndjson':
+                return ndjson_response(AuthorService.iter_authors(projection), serialize=projection.build)
+
+            authors_data = AuthorService.get_author_dicts(projection)
 
             return jsonify({
                 'success': True,
@@ -377,6 +452,74 @@ def register_routes(app: Flask) -> None:
                 'count': len(authors_data)
             })
 
+        except ValidationError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        except ServiceError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 500
+
+    @app.route("/api/authors/lookup")
+    def author_lookup_api():
+        """
+        API endpoint for the author picker of the book forms: authors with a name word starting with q.
+        limit caps the number of authors.
+        :return: JSON response with id and name of the matching authors
+        """
+        try:
+            query = request.args.get('q', '')[:AppConstants.MAX_AUTHOR_NAME_LENGTH]
+            limit = parse_page_size(request.args.get('limit'), AppConstants.DEFAULT_SUGGEST_LIMIT,
+                                    AppConstants.MAX_SUGGEST_LIMIT)
+
+            return jsonify({
+                'success': True,
+                'authors': AuthorService.lookup_authors(query, limit)
+            })
+
+        except ServiceError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 500
+
+    @app.route("/api/import", methods=["POST"])
+    def api_import():
+        """
+        API endpoint to bulk import books and authors from an uploaded CSV or JSONL file.
+        :return: JSON response with import statistics
+        """
+        try:
+            upload = request.files.get('file')
+            if not upload:
+                return jsonify({
+                    'success': False,
+                    'error': 'No file uploaded'
+                }), 400
+
+            import_format = request.form.get('format') or guess_import_format(upload.filename)
+            batch_size = parse_page_size(request.form.get('batch_size'), default=1000, maximum=10000)
+            enqueue_covers = request.form.get('enqueue_covers', '').lower() in ('1', 'true')
+
+            stream = io.TextIOWrapper(upload.stream, encoding='utf-8', errors='replace')
+            stats = import_catalog(stream, import_format, batch_size, enqueue_covers)
+
+            if enqueue_covers:
+                notify_cover_workers()
+
+            return jsonify({
+                'success': True,
+                **stats
+            })
+
+        except ValidationError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
         except ServiceError as e:
             return jsonify({
                 'success': False,
@@ -386,30 +529,134 @@ def register_routes(app: Flask) -> None:
     @app.route("/api/book/<int:book_id>/cover")
     def get_book_cover_api(book_id: int):
         """
-        API endpoint to get book cover asynchronously.
+        API endpoint to get book cover and the status of its background lookup.
         :param book_id: Book ID
-        :return: JSON response with cover URL
+        :return: JSON response with cover URL and cover status
         """
         try:
             book = BookService.get_book_by_id(book_id)
             if not book:
                 return jsonify({'error': 'Book not found'}), 404
 
-            cover_url = book.cover_url
-            return jsonify({'cover_url': cover_url})
+            return jsonify({
+                'cover_url': book.cover_url,
+                'cover_status': book.cover_status
+            })
 
         except Exception as e:
             return jsonify({'error': str(e)}), 500
 
+    @app.route("/api/covers")
+    @conditional_get(CatalogService.get_catalog_version)
+    def get_book_covers_api():
+        """
+        API endpoint to get the covers of many books at once, used by the homepage's lazy cover loading.
+        Pass the book IDs as ids=1,2,3; unknown IDs are listed under missing.
+        :return: JSON response with cover URL and cover status by book ID
+        """
+        try:
+            try:
+                book_ids = parse_id_list(request.args.get('ids'))
+            except ValueError:
+                raise ValidationError(ValidationMessages.INVALID_BOOK_IDS)
+
+            covers = BookService.get_covers(book_ids)
+
+            return jsonify({
+                'success': True,
+                'covers': {str(book_id): cover for book_id, cover in covers.items()},
+                'missing': [book_id for book_id in book_ids if book_id not in covers]
+            })
+
+        except ValidationError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        except ServiceError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 500
+
+    @app.route("/api/suggest")
+    def suggest_api():
+        """
+        API endpoint for search-as-you-type, answered from the in-memory suggestion index.
+        Matches titles and author names with a word starting with q; limit caps the number of suggestions.
+        :return: JSON response with the suggested books and authors
+        """
+        if get_suggest_index() is None:
+            return jsonify({'success': False, 'error': 'Suggestions are disabled'}), 404
+
+        query = request.args.get('q', '')[:AppConstants.MAX_SEARCH_LENGTH]
+        limit = parse_page_size(request.args.get('limit'), AppConstants.DEFAULT_SUGGEST_LIMIT,
+                                AppConstants.MAX_SUGGEST_LIMIT)
+
+        suggestions = [
+            {
+                'type': kind,
+                'id': item_id,
+                'label': label,
+                'url': url_for('book_detail' if kind == BOOK else 'author_detail', **{f'{kind}_id': item_id})
+            }
+            for kind, item_id, label in suggest(query, limit)
+        ]
+
+        return jsonify({
+            'success': True,
+            'query': query,
+            'suggestions': suggestions
+        })
+
+    @app.route("/covers/<int:book_id>/<size>")
+    def book_cover_image(book_id: int, size: str):
+        """
+        Serve a book cover from the local cover cache.
+        Requests carrying the current image version as v may be cached forever.
+        Covers not stored locally redirect to the provider URL or placeholder while
+        a cover job downloads them in the background.
+        :param book_id: Book ID
+        :param size: Cover size from AppConstants.COVER_IMAGE_SIZES or 'original'
+        :return: Image response or redirect
+        """
+        if size != 'original' and size not in AppConstants.COVER_IMAGE_SIZES:
+            abort(404)
+
+        book = BookService.get_book_by_id(book_id)
+        if not book:
+            abort(404)
+
+        image_hash = book.cover_image_hash
+        if not has_cover_image(image_hash):
+            if enqueue_cover_image_job(book):
+                notify_cover_workers()
+            response = redirect(book.cover_url_cached or AppConstants.DEFAULT_COVER_URL)
+            response.cache_control.no_cache = True
+            return response
+
+        path, mimetype = get_cover_image(image_hash, size)
+        versioned = request.args.get('v') == image_hash[:AppConstants.COVER_VERSION_LENGTH]
+
+        # Unversioned URLs are revalidated with the ETag on every use
+        response = send_file(path, mimetype=mimetype, etag=f"{image_hash}-{size}", conditional=True,
+                             max_age=app.config['COVER_IMAGE_MAX_AGE'] if versioned else None)
+        if versioned:
+            response.cache_control.immutable = True
+
+        return response
+
     @app.route("/api/book/<int:book_id>/refresh-cover", methods=["POST"])
     def refresh_book_cover_api(book_id: int):
         """
         API endpoint to refresh a book's cover.
+        Pass bypass_cache=1 to ignore cached lookup results.
         :param book_id: Book ID
         :return: JSON response with refreshed cover URL
         """
         try:
-            cover_url = refresh_book_cover(book_id)
+            bypass_cache = request.args.get('bypass_cache', '').lower() in ('1', 'true')
+            cover_url = refresh_book_cover(book_id, bypass_cache)
 
             if cover_url:
                 return jsonify({
@@ -422,17 +669,38 @@ def register_routes(app: Flask) -> None:
                     'error': 'Book not found'
                 }), 404
 
+        except RequestException as e:
+            return jsonify({
+                'success': False,
+                'error': f'Cover provider unavailable: {e}'
+            }), 503
         except Exception as e:
             return jsonify({
                 'success': False,
                 'error': str(e)
             }), 500
 
+    @app.route("/api/cache/stats")
+    def response_cache_stats_api():
+        """
+        API endpoint to get the response cache hit and miss counters.
+        :return: JSON response with cache statistics
+        """
+        cache = app.extensions.get('response_cache')
+        if cache is None:
+            return jsonify({'enabled': False})
 
-app = create_app()
+        return jsonify({
+            'enabled': True,
+            **cache.get_stats()
+        })
 
 
 if __name__ == "__main__":
+    app = create_app()
+    # With the reloader only its child process serves requests, so only it runs the workers
+    if 'cover_worker' not in app.extensions and (not app.debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'):
+        start_cover_workers(app)
     app.run(
         host=app.config['HOST'],
         port=app.config['PORT'],
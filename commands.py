@@ -0,0 +1,132 @@
+import click
+from flask import Flask, current_app
+from flask.cli import AppGroup
+
+from models.models import db
+from models.search_index import is_search_index_enabled, rebuild_search_index
+from services.cover_backfill import run_cover_backfill
+from services.cover_cache import purge_expired_lookups
+from services.cover_images import cache_missing_cover_images
+from services.cover_jobs import notify_cover_workers, process_next_cover_job, requeue_stale_jobs
+from services.import_service import IMPORT_FORMATS, guess_import_format, import_catalog
+from services.services import AuthorService
+
+search_cli = AppGroup('search', help='Manage the full-text search index.')
+authors_cli = AppGroup('authors', help='Maintain author data.')
+covers_cli = AppGroup('covers', help='Resolve and maintain book covers.')
+
+
+@search_cli.command('reindex')
+def reindex_command():
+    """
+    Rebuild the full-text and fuzzy search indexes from the books and authors tables.
+    """
+    if not is_search_index_enabled():
+        raise click.ClickException("FTS5 is not available in this SQLite build.")
+
+    indexed = rebuild_search_index(db.engine)
+    click.echo(f"Indexed {indexed} book{'s' if indexed != 1 else ''}.")
+
+
+@authors_cli.command('rebuild-stats')
+def rebuild_stats_command():
+    """
+    Recompute stored book counts and rating totals for every author.
+    """
+    updated = AuthorService.rebuild_author_stats()
+    click.echo(f"Rebuilt statistics for {updated} author{'s' if updated != 1 else ''}.")
+
+
+@covers_cli.command('process')
+def process_covers_command():
+    """
+    Drain the cover job queue in the foreground.
+    """
+    requeued = requeue_stale_jobs()
+    if requeued:
+        click.echo(f"Requeued {requeued} stale job{'s' if requeued != 1 else ''}.")
+
+    processed = 0
+    while process_next_cover_job():
+        processed += 1
+
+    click.echo(f"Processed {processed} cover job{'s' if processed != 1 else ''}.")
+
+
+@covers_cli.command('purge-cache')
+def purge_cache_command():
+    """
+    Delete expired entries from the cover lookup cache.
+    """
+    purged = purge_expired_lookups()
+    click.echo(f"Purged {purged} expired lookup{'s' if purged != 1 else ''}.")
+
+
+@covers_cli.command('cache-images')
+@click.option('--batch-size', default=100, show_default=True, help='Books per query.')
+def cache_images_command(batch_size: int):
+    """
+    Download resolved covers that have no local copy for the cover proxy yet.
+    """
+    cached, failed = cache_missing_cover_images(batch_size)
+    click.echo(f"Cached {cached} cover image{'s' if cached != 1 else ''}, {failed} failed.")
+
+
+@covers_cli.command('backfill')
+@click.option('--batch-size', default=500, show_default=True, help='Books per batch and commit.')
+@click.option('--workers', default=8, show_default=True, help='Concurrent lookup threads.')
+@click.option('--rps', default=10.0, show_default=True, help='Maximum provider requests per second.')
+@click.option('--restart', is_flag=True, help='Ignore the checkpoint and start from the first book.')
+def backfill_covers_command(batch_size: int, workers: int, rps: float, restart: bool):
+    """
+    Resolve covers for all books that have none or only the placeholder.
+    """
+    def report(stats):
+        click.echo(f"Processed {stats['processed']} books "
+                   f"({stats['resolved']} resolved, {stats['missing']} without cover) "
+                   f"up to id {stats['last_id']} - {stats['rate']:.1f} books/s")
+
+    stats = run_cover_backfill(current_app._get_current_object(), batch_size, workers, rps,
+                               restart, progress=report)
+
+    if stats['interrupted']:
+        raise click.ClickException(
+            "Cover provider is unavailable; stopped early. Run the command again to resume."
+        )
+
+    click.echo(f"Done: {stats['processed']} books in {stats['elapsed']:.1f}s "
+               f"({stats['rate']:.1f} books/s).")
+
+
+@click.command('import')
+@click.argument('source', type=click.File('r', encoding='utf-8'))
+@click.option('--format', 'import_format', type=click.Choice(IMPORT_FORMATS),
+              help='Input format (default: from the file extension).')
+@click.option('--batch-size', default=1000, show_default=True, help='Books per transaction.')
+@click.option('--enqueue-covers', is_flag=True, help='Queue a cover lookup job for every imported book.')
+def import_command(source, import_format: str, batch_size: int, enqueue_covers: bool):
+    """
+    Stream books and authors from a CSV or JSONL file (use - for stdin).
+    """
+    import_format = import_format or guess_import_format(source.name)
+    stats = import_catalog(source, import_format, batch_size, enqueue_covers)
+
+    for error in stats['errors']:
+        click.echo(error, err=True)
+
+    click.echo(f"Imported {stats['imported_books']} books and created {stats['created_authors']} authors; "
+               f"skipped {stats['skipped_duplicates']} duplicates, rejected {stats['failed_rows']} rows.")
+
+    if enqueue_covers:
+        notify_cover_workers()
+
+
+def register_commands(app: Flask) -> None:
+    """
+    Register all CLI command groups with the application.
+    :param app: Flask application instance
+    """
+    app.cli.add_command(search_cli)
+    app.cli.add_command(authors_cli)
+    app.cli.add_command(covers_cli)
+    app.cli.add_command(import_command)
@@ -14,6 +14,17 @@ class Config:
 
     SQLALCHEMY_DATABASE_URI = f'sqlite:///{DATABASE_PATH}'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'connect_args': {'timeout': 15}
+    }
+
+    # Applied to every new SQLite connection by init_db (None skips a pragma)
+    SQLITE_JOURNAL_MODE = 'WAL'
+    SQLITE_SYNCHRONOUS = 'NORMAL'
+    SQLITE_CACHE_SIZE = -32000
+    SQLITE_MMAP_SIZE = 128 * 1024 * 1024
+    SQLITE_TEMP_STORE = 'MEMORY'
+    SQLITE_FOREIGN_KEYS = True
 
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'secret-key'
 
@@ -21,6 +32,69 @@ class Config:
     HOST = os.environ.get('FLASK_HOST', '0.0.0.0')
     PORT = int(os.environ.get('FLASK_PORT', 5002))
 
+    COVER_WORKERS = int(os.environ.get('COVER_WORKERS', 2))
+    # create_app starts the workers itself, for WSGI servers; `python app.py` always starts them
+    COVER_WORKERS_AUTOSTART = os.environ.get('COVER_WORKERS_AUTOSTART', 'False').lower() == 'true'
+    COVER_WORKER_POLL_INTERVAL = 5
+    COVER_JOB_MAX_ATTEMPTS = 3
+    COVER_JOB_RETRY_DELAY = 60
+    COVER_JOB_STALE_SECONDS = 300
+
+    COVER_CACHE_TTL = 30 * 24 * 3600
+    COVER_CACHE_NEGATIVE_TTL = 24 * 3600
+    COVER_CACHE_LRU_SIZE = 2048
+
+    COVER_HTTP_POOL_SIZE = 10
+    COVER_HTTP_RETRIES = 2
+    COVER_HTTP_BACKOFF = 0.5
+    COVER_HTTP_BACKOFF_MAX = 8
+    COVER_BREAKER_FAILURE_THRESHOLD = 5
+    COVER_BREAKER_RESET_TIMEOUT = 30
+
+    COVER_BACKFILL_CHECKPOINT = os.path.join(INSTANCE_DIR, 'cover_backfill.json')
+
+    # Local cover proxy: downloaded images and their resized variants, named by content hash
+    COVER_IMAGE_DIR = os.path.join(INSTANCE_DIR, 'cover_images')
+    COVER_IMAGE_MAX_BYTES = 5 * 1024 * 1024
+    COVER_IMAGE_QUALITY = 85
+    COVER_IMAGE_MAX_AGE = 365 * 24 * 3600
+    # Download a cover right after the background lookup resolved it
+    COVER_IMAGE_PREFETCH = True
+
+    # 'memory', 'filesystem' (shared by worker processes), a backend factory or None to disable
+    RESPONSE_CACHE_BACKEND = os.environ.get('RESPONSE_CACHE_BACKEND', 'memory') or None
+    RESPONSE_CACHE_MAX_ENTRIES = 512
+    RESPONSE_CACHE_TTL = 3600
+    RESPONSE_CACHE_DIR = os.path.join(INSTANCE_DIR, 'response_cache')
+    RESPONSE_CACHE_STALE_WHILE_REVALIDATE = 0
+
+    # Per-request SQL, template and cover API timings: Server-Timing header and /metrics
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True').lower() == 'true'
+    SERVER_TIMING_ENABLED = os.environ.get('SERVER_TIMING_ENABLED', 'True').lower() == 'true'
+
+    # Statements slower than this are kept with their route and query plan, None disables
+    SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 100))
+    SLOW_QUERY_BUFFER_SIZE = 200
+    SLOW_QUERY_LOG_FILE = os.environ.get('SLOW_QUERY_LOG_FILE') or None
+    # /debug/* pages need this token (X-Debug-Token header or ?token=) unless DEBUG is on
+    DEBUG_TOKEN = os.environ.get('DEBUG_TOKEN') or None
+
+    # 'orjson' serializes API responses with orjson when it is installed, see OrjsonProvider for
+    # the float forms it writes differently from 'default'
+    JSON_PROVIDER = os.environ.get('JSON_PROVIDER', 'default')
+
+    # In-process typeahead index for /api/suggest, rebuilt when another process changed the catalog
+    SUGGEST_INDEX_ENABLED = os.environ.get('SUGGEST_INDEX_ENABLED', 'True').lower() == 'true'
+    SUGGEST_INDEX_CHECK_INTERVAL = 5
+
+    # gzip, or brotli when the brotli package is installed, negotiated via Accept-Encoding
+    COMPRESSION_ENABLED = True
+    COMPRESSION_LEVEL = 6
+    COMPRESSION_BROTLI_QUALITY = 5
+    COMPRESSION_MIN_SIZE = 500
+    COMPRESSION_STREAM_FLUSH_SIZE = 64 * 1024
+    COMPRESSION_MIMETYPES = {'text/html', 'text/plain', 'application/json', 'application/x-ndjson'}
+
     os.makedirs(INSTANCE_DIR, exist_ok=True)
 
 
@@ -32,6 +106,8 @@ class DevelopmentConfig(Config):
 class ProductionConfig(Config):
     """Production configuration."""
     DEBUG = False
+    SQLITE_CACHE_SIZE = -131072
+    SQLITE_MMAP_SIZE = 1024 * 1024 * 1024
     SECRET_KEY = os.environ.get('SECRET_KEY')
 
     if not SECRET_KEY:
@@ -29,6 +29,8 @@ def setup_test_config():
             SECRET_KEY = 'test-secret-key'
             WTF_CSRF_ENABLED = False
             DEBUG = True
+            COVER_WORKERS = 0
+            RESPONSE_CACHE_BACKEND = None
 
         # Add to config dictionary
         config.config['testing'] = TestConfig
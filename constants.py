@@ -22,14 +22,33 @@ class AppConstants:
     API_REQUEST_TIMEOUT = 10
     API_MAX_RESULTS = 1
 
+    # Cover proxy: sizes served by /covers/<book_id>/<size> as (width, height)
+    COVER_IMAGE_SIZES = {'thumb': (240, 360), 'large': (400, 600)}
+    DEFAULT_COVER_SIZE = 'thumb'
+    COVER_VERSION_LENGTH = 16
+    COVER_IMAGE_CHUNK_SIZE = 64 * 1024
+
     # Application settings
     DEFAULT_BOOKS_PER_PAGE = 20
+    MAX_BOOKS_PER_PAGE = 100
+    EXPORT_BATCH_SIZE = 1000
+    MAX_COVER_BATCH_SIZE = 100
     MAX_SEARCH_LENGTH = 100
+    DEFAULT_SUGGEST_LIMIT = 8
+    MAX_SUGGEST_LIMIT = 20
 
     # Template settings
     CURRENT_YEAR = datetime.now().year
 
 
+class CoverStatus:
+    """Lifecycle states of a book's cover lookup."""
+
+    PENDING = "pending"
+    RESOLVED = "resolved"
+    FAILED = "failed"
+
+
 class ValidationMessages:
     """Standardized validation error messages."""
 
@@ -49,4 +68,9 @@ class ValidationMessages:
 
     # General messages
     AUTHOR_SELECTION_REQUIRED = "Author selection is required"
-    INVALID_AUTHOR_SELECTION = "Invalid author selection"
\ No newline at end of file
+    INVALID_AUTHOR_SELECTION = "Invalid author selection"
+    INVALID_PAGE_CURSOR = "Invalid page cursor"
+    INVALID_BOOK_IDS = "Book IDs must be a comma-separated list of integers"
+    TOO_MANY_BOOK_IDS = f"At most {AppConstants.MAX_COVER_BATCH_SIZE} book IDs can be requested at once"
+    UNKNOWN_FIELDS = "Unknown fields requested"
+    UNKNOWN_EMBED = "Unknown embedded resources requested"
\ No newline at end of file
@@ -1,3 +1,3 @@
-from .models import Author, Book, db, init_db
+from .models import Author, Book, CatalogRevision, CoverJob, CoverLookup, db, init_db
 
-__all__ = ['db', 'Author', 'Book', 'init_db']
\ No newline at end of file
+__all__ = ['db', 'Author', 'Book', 'CatalogRevision', 'CoverJob', 'CoverLookup', 'init_db']
\ No newline at end of file
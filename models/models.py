@@ -1,12 +1,91 @@
-from typing import Optional
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
 
 from constants import AppConstants
+from flask import url_for
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, func, inspect, literal_column, select, text, tuple_, update
 from sqlalchemy.orm import backref
+from sqlalchemy.schema import CreateColumn, CreateIndex
+
+from .projection import Field, Projection
+from .search_index import (
+    FTS_TABLE,
+    RANK_SUBQUERY,
+    build_match_expression,
+    build_rank_subquery,
+    find_similar_books,
+    init_search_index,
+    is_search_index_enabled,
+)
 
 db = SQLAlchemy()
 
 
+def compute_average_rating(rated_count: int, rating_sum: float) -> Optional[float]:
+    """
+    Calculate an average rating from stored rating aggregates.
+    :param rated_count: Number of rated books
+    :param rating_sum: Sum of their ratings
+    :return: Average rating rounded to one decimal or None if no rated books
+    """
+    if rated_count:
+        return round(rating_sum / rated_count, 1)
+    return None
+
+
+def format_rating_stars(rating: Optional[float]) -> str:
+    """
+    Return a string representation of a rating as stars out of 5.
+    :param rating: Rating from 0 to 10 or None
+    :return: Star rating string or "Not rated"
+    """
+    if rating is None:
+        return "Not rated"
+
+    star_rating = rating / 2
+    full_stars = int(star_rating)
+    half_star = 1 if (star_rating - full_stars) >= 0.5 else 0
+    empty_stars = 5 - full_stars - half_star
+
+    return "★" * full_stars + ("☆" if half_star else "") + "☆" * empty_stars
+
+
+def build_cover_url(book_id: int, cover_url_cached: Optional[str], cover_image_hash: Optional[str],
+                    size: str = AppConstants.DEFAULT_COVER_SIZE) -> str:
+    """
+    Return the URL a page should load a book cover from: the local cover proxy once
+    the image has been downloaded, else the provider URL or the placeholder.
+    The proxy URL carries the image hash, so it changes whenever the image does.
+    :param book_id: Book ID
+    :param cover_url_cached: Provider cover URL or None
+    :param cover_image_hash: Hash of the downloaded image or None
+    :param size: Cover size name from AppConstants.COVER_IMAGE_SIZES
+    :return: Cover URL string
+    """
+    if cover_image_hash:
+        return url_for('book_cover_image', book_id=book_id, size=size,
+                       v=cover_image_hash[:AppConstants.COVER_VERSION_LENGTH])
+    return cover_url_cached or AppConstants.DEFAULT_COVER_URL
+
+
+def format_isbn(isbn: Optional[str]) -> str:
+    """
+    Return an ISBN formatted with hyphens.
+    :param isbn: Stored ISBN or None
+    :return: Formatted ISBN string or "Not available"
+    """
+    if not isbn:
+        return "Not available"
+
+    digits = isbn.replace('-', '')
+    if len(digits) == 13:
+        return f"{digits[:3]}-{digits[3]}-{digits[4:6]}-{digits[6:12]}-{digits[12]}"
+    elif len(digits) == 10:
+        return f"{digits[:1]}-{digits[1:6]}-{digits[6:9]}-{digits[9]}"
+    return isbn
+
+
 class Author(db.Model):
     """Author model representing book authors."""
 
@@ -16,6 +95,26 @@ class Author(db.Model):
     name = db.Column(db.String(100), nullable=False, index=True)
     birth_date = db.Column(db.Date, nullable=True)
     date_of_death = db.Column(db.Date, nullable=True)
+    book_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rated_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_sum = db.Column(db.Float, nullable=False, default=0.0, server_default='0')
+    revision = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    updated_at = db.Column(db.DateTime, nullable=True, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index("ix_authors_name_nocase_id", name.collate("NOCASE"), id),
+    )
+
+    # Keys of to_dict and the columns they are computed from, see api_projection
+    API_FIELDS = {
+        'id': Field(('id',)),
+        'name': Field(('name',)),
+        'birth_date': Field(('birth_date',), lambda value: value.isoformat() if value else None),
+        'date_of_death': Field(('date_of_death',), lambda value: value.isoformat() if value else None),
+        'book_count': Field(('book_count',)),
+        'average_rating': Field(('rated_count', 'rating_sum'), compute_average_rating),
+        'is_living': Field(('date_of_death',), lambda value: value is None),
+    }
 
     def __repr__(self) -> str:
         return f"<Author(id={self.id}, name='{self.name}')>"
@@ -34,21 +133,24 @@ class Author(db.Model):
     @property
     def average_rating(self) -> Optional[float]:
         """
-        Calculate the average rating of all books by this author.
+        Calculate the average rating of all books by this author from the stored aggregates.
         :return: Average rating or None if no rated books
         """
-        ratings = [book.rating for book in self.books if book.rating is not None]
-        if ratings:
-            return round(sum(ratings) / len(ratings), 1)
-        return None
+        return compute_average_rating(self.rated_count, self.rating_sum)
 
-    @property
-    def book_count(self) -> int:
+    @classmethod
+    def rebuild_aggregates_statement(cls):
         """
-        Return the number of books by this author.
-        :return: Number of books
+        Build an UPDATE that recomputes book_count, rated_count and rating_sum from the books table.
+        :return: Textual SQL statement
         """
-        return len(self.books)
+        return text("""
+            UPDATE authors SET
+                book_count = (SELECT count(*) FROM books WHERE books.author_id = authors.id),
+                rated_count = (SELECT count(rating) FROM books WHERE books.author_id = authors.id),
+                rating_sum = (SELECT coalesce(sum(rating), 0) FROM books
+                              WHERE books.author_id = authors.id)
+        """)
 
     @property
     def age_at_death(self) -> Optional[int]:
@@ -83,6 +185,15 @@ class Author(db.Model):
             'is_living': self.is_living
         }
 
+    @classmethod
+    def api_projection(cls, names: Optional[Sequence[str]] = None) -> Projection:
+        """
+        Select fields of the to_dict representation for queries that skip loading Author instances.
+        :param names: Names from API_FIELDS, all of them if None
+        :return: Projection of the author columns
+        """
+        return Projection(cls, cls.API_FIELDS, cls.API_FIELDS if names is None else names)
+
 
 class Book(db.Model):
     """Book model representing library books."""
@@ -91,14 +202,42 @@ class Book(db.Model):
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     isbn = db.Column(db.String(13), unique=True, nullable=True, index=True)
-    title = db.Column(db.String(200), nullable=False, index=True)
-    publication_year = db.Column(db.Integer, nullable=True, index=True)
+    title = db.Column(db.String(200), nullable=False)
+    publication_year = db.Column(db.Integer, nullable=True)
     author_id = db.Column(db.Integer, db.ForeignKey("authors.id", ondelete="CASCADE"), nullable=False)
     rating = db.Column(db.Float, nullable=True)
     cover_url_cached = db.Column(db.String(500), nullable=True)
+    cover_status = db.Column(db.String(10), nullable=True, index=True)
+    # SHA-256 of the cover image downloaded from cover_url_cached, see services.cover_images
+    cover_image_hash = db.Column(db.String(64), nullable=True)
+    revision = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    updated_at = db.Column(db.DateTime, nullable=True, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     author = db.relationship("Author", backref=backref("books", cascade="all, delete-orphan"))
 
+    # One index per sort order of search(), each ending in the ID tie-breaker so
+    # pages are read in index order without a temporary sort.
+    __table_args__ = (
+        db.Index("ix_books_title_nocase_id", title.collate("NOCASE"), id),
+        db.Index("ix_books_year_sort_id", func.coalesce(publication_year, literal_column('0')).desc(), id.desc()),
+        db.Index("ix_books_author_id_id", author_id, id),
+    )
+
+    SORT_KEY_LENGTHS = {'title': 2, 'author': 3, 'year': 2, 'relevance': 2}
+
+    # Keys of to_dict except the embedded author, and the columns they are computed from
+    API_FIELDS = {
+        'id': Field(('id',)),
+        'title': Field(('title',)),
+        'isbn': Field(('isbn',)),
+        'formatted_isbn': Field(('isbn',), format_isbn),
+        'publication_year': Field(('publication_year',)),
+        'author_id': Field(('author_id',)),
+        'rating': Field(('rating',)),
+        'rating_stars': Field(('rating',), format_rating_stars),
+        'cover_url': Field(('id', 'cover_url_cached', 'cover_image_hash'), build_cover_url),
+    }
+
     def __repr__(self) -> str:
         return (f"<Book(id={self.id}, title='{self.title}', "
                 f"author_id={self.author_id}, publication_year={self.publication_year}, "
@@ -114,15 +253,7 @@ class Book(db.Model):
         Return a string representation of the rating as stars out of 5.
         :return: Star rating string or "Not rated"
         """
-        if self.rating is None:
-            return "Not rated"
-
-        star_rating = self.rating / 2
-        full_stars = int(star_rating)
-        half_star = 1 if (star_rating - full_stars) >= 0.5 else 0
-        empty_stars = 5 - full_stars - half_star
-
-        return "★" * full_stars + ("☆" if half_star else "") + "☆" * empty_stars
+        return format_rating_stars(self.rating)
 
     @property
     def formatted_isbn(self) -> str:
@@ -130,23 +261,23 @@ class Book(db.Model):
         Return formatted ISBN with hyphens.
         :return: Formatted ISBN string or "Not available"
         """
-        if not self.isbn:
-            return "Not available"
-
-        isbn = self.isbn.replace('-', '')
-        if len(isbn) == 13:
-            return f"{isbn[:3]}-{isbn[3]}-{isbn[4:6]}-{isbn[6:12]}-{isbn[12]}"
-        elif len(isbn) == 10:
-            return f"{isbn[:1]}-{isbn[1:6]}-{isbn[6:9]}-{isbn[9]}"
-        return self.isbn
+        return format_isbn(self.isbn)
 
     @property
     def cover_url(self) -> str:
         """
-        Get book cover URL from cached value or placeholder.
+        Get book cover URL from the local cover proxy, the cached provider URL or placeholder.
         :return: Cover URL string
         """
-        return self.cover_url_cached or AppConstants.DEFAULT_COVER_URL
+        return self.cover_url_for()
+
+    def cover_url_for(self, size: str = AppConstants.DEFAULT_COVER_SIZE) -> str:
+        """
+        Get book cover URL for a cover size, see build_cover_url.
+        :param size: Cover size name from AppConstants.COVER_IMAGE_SIZES
+        :return: Cover URL string
+        """
+        return build_cover_url(self.id, self.cover_url_cached, self.cover_image_hash, size)
 
     def to_dict(self) -> dict:
         """
@@ -167,32 +298,375 @@ class Book(db.Model):
         }
 
     @classmethod
-    def search(cls, search_term: str, sort_by: str = 'title'):
+    def api_projection(cls, names: Optional[Sequence[str]] = None,
+                       author: Optional[Projection] = None) -> Projection:
         """
-        Search books by title, author name, or publication year.
+        Select fields of the to_dict representation for queries that skip loading Book instances.
+        :param names: Names from API_FIELDS, all of them if None
+        :param author: Projection of the embedded author, or None to leave the author out
+        :return: Projection of the book columns followed by the author columns
+        """
+        return Projection(cls, cls.API_FIELDS, cls.API_FIELDS if names is None else names,
+                          {'author': author} if author else None)
+
+    @classmethod
+    def sort_columns(cls, sort_by: str = 'title') -> Tuple:
+        """
+        Columns holding the keyset pagination values of a sort order, see sort_key.
+        The relevance score is a column of the ranking subquery joined by search.
+        :param sort_by: Field to sort by ('title', 'author', 'year', 'relevance')
+        :return: Tuple of column attributes ending with the book ID
+        """
+        if sort_by == 'author':
+            return Author.name, cls.author_id, cls.id
+        elif sort_by == 'year':
+            return cls.publication_year, cls.id
+        elif sort_by == 'relevance':
+            return literal_column(f'{RANK_SUBQUERY}.score'), cls.id
+        return cls.title, cls.id
+
+    @staticmethod
+    def resolve_sort(sort_by: str, search_term: str) -> str:
+        """
+        Get the sort order search will apply: relevance needs a search term the
+        full-text index can match and falls back to title otherwise.
+        :param sort_by: Requested sort field
         :param search_term: Term to search for
+        :return: Sort field
+        """
+        if sort_by == 'relevance' and not (is_search_index_enabled() and build_match_expression(search_term)):
+            return 'title'
+        return sort_by
+
+    def sort_key(self, sort_by: str = 'title') -> List[Any]:
+        """
+        Return the keyset pagination values of this book for a sort order.
+        The relevance score depends on the search, select it with sort_columns instead.
         :param sort_by: Field to sort by ('title', 'author', 'year')
-        :return: Query object with search and sort applied
+        :return: List of sort column values ending with the book ID
         """
-        query = cls.query
+        if sort_by == 'author':
+            return [self.author.name if self.author else None, self.author_id, self.id]
+        elif sort_by == 'year':
+            return [self.publication_year, self.id]
+        return [self.title, self.id]
 
-        if search_term and search_term.strip():
-            search_term = search_term.strip()
-            query = query.filter(
-                (cls.title.ilike(f'%{search_term}%')) |
-                (cls.author.has(Author.name.ilike(f'%{search_term}%'))) |
-                (cls.publication_year == search_term)
-            )
+    @classmethod
+    def bump_revisions(cls, book_ids: List[int]) -> None:
+        """
+        Increment the revisions of books and of their authors inside the caller's transaction.
+        Used by writes that change books outside of BookService, such as cover lookups.
+        :param book_ids: IDs of the changed books
+        """
+        if not book_ids:
+            return
+
+        db.session.execute(
+            update(cls).where(cls.id.in_(book_ids)).values(revision=cls.revision + 1)
+        )
+        db.session.execute(
+            update(Author)
+            .where(Author.id.in_(select(cls.author_id).where(cls.id.in_(book_ids))))
+            .values(revision=Author.revision + 1)
+        )
 
-        if sort_by == 'author':
-            query = query.join(Author).order_by(Author.name)
+    @classmethod
+    def search(cls, search_term: str, sort_by: str = 'title', after: Optional[List[Any]] = None,
+               fuzzy: bool = False, limit: Optional[int] = None):
+        """
+        Search books by title, author name, or publication year.
+        Uses the FTS5 index when available and falls back to ilike matching.
+        With fuzzy, books whose title or author name is similar to the search term
+        according to the trigram index match as well, so misspellings still find them.
+        The relevance sort orders by the bm25 score of the full-text index, followed by
+        the books only a fuzzy search found, most similar first (see resolve_sort).
+        :param search_term: Term to search for
+        :param sort_by: Field to sort by ('title', 'author', 'year', 'relevance')
+        :param after: Sort key of the last book on the previous page (see sort_key)
+        :param fuzzy: Also match books with similar words
+        :param limit: Number of books the caller will fetch, bounds the relevance ranking to one page
+        :return: Query object with search and sort applied
+        """
+        query = cls.query
+        search_term = (search_term or '').strip()
+        sort_by = cls.resolve_sort(sort_by, search_term)
+        match_expression = build_match_expression(search_term)
+        similar = []
+
+        if search_term:
+            if is_search_index_enabled() and match_expression:
+                matching_ids = text(
+                    f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match"
+                ).bindparams(match=match_expression)
+                condition = cls.id.in_(matching_ids)
+            else:
+                condition = (
+                    (cls.title.ilike(f'%{search_term}%')) |
+                    (cls.author.has(Author.name.ilike(f'%{search_term}%'))) |
+                    (cls.publication_year == search_term)
+                )
+
+            if fuzzy:
+                similar = find_similar_books(db.session, search_term)
+                if similar:
+                    condition = condition | cls.id.in_([book_id for book_id, _ in similar])
+
+            # Joining the ranking already limits the books to the same matches
+            if sort_by != 'relevance':
+                query = query.filter(condition)
+
+        if sort_by == 'relevance':
+            ranked = build_rank_subquery(match_expression, similar, after, limit)
+            query = query.join(ranked, ranked.c.book_id == cls.id).order_by(ranked.c.score, cls.id)
+        elif sort_by == 'author':
+            author_name = Author.name.collate('NOCASE')
+            query = query.join(Author).order_by(author_name, Author.id, cls.id)
+            # The lower bound lets SQLite drive the join from the author name index
+            # even before ANALYZE has collected statistics.
+            query = query.filter(author_name >= (after[0] if after else ''))
+            if after:
+                query = query.filter(tuple_(author_name, Author.id, cls.id) > tuple_(*after))
         elif sort_by == 'year':
-            query = query.order_by(cls.publication_year.desc())
+            year = cls.year_sort_expression()
+            query = query.order_by(year.desc(), cls.id.desc())
+            if after:
+                year_after = after[0] if after[0] is not None else 0
+                query = query.filter(year <= year_after,
+                                     tuple_(year, cls.id) < tuple_(year_after, after[1]))
         else:
-            query = query.order_by(cls.title)
+            title = cls.title.collate('NOCASE')
+            query = query.order_by(title, cls.id)
+            if after:
+                query = query.filter(title >= after[0], tuple_(title, cls.id) > tuple_(*after))
 
         return query
 
+    @classmethod
+    def search_rows(cls, projection: Projection, search_term: str, sort_by: str = 'title',
+                    after: Optional[List[Any]] = None, fuzzy: bool = False, limit: Optional[int] = None):
+        """
+        Like search, but select only the projection's columns as plain rows, followed
+        by the sort_columns of the sort order. Authors are joined only if embedded.
+        :param projection: Book projection from api_projection
+        :param search_term: Term to search for
+        :param sort_by: Field to sort by ('title', 'author', 'year', 'relevance')
+        :param after: Sort key of the last book on the previous page (see sort_key)
+        :param fuzzy: Also match books with similar words
+        :param limit: Number of rows the caller will fetch, see search
+        :return: Query object returning rows
+        """
+        sort_by = cls.resolve_sort(sort_by, search_term)
+        query = cls.search(search_term, sort_by, after, fuzzy, limit)
+        # The author sort already joins the authors table
+        if 'author' in projection.embeds and sort_by != 'author':
+            query = query.outerjoin(Author, cls.author_id == Author.id)
+        return query.with_entities(*projection.columns(), *cls.sort_columns(sort_by))
+
+    @staticmethod
+    def year_sort_expression():
+        """
+        Build the expression the year sort orders by: the publication year, with books
+        without a year mapped to 0 so they sort last in descending order.
+        :return: SQLAlchemy expression
+        """
+        return func.coalesce(Book.publication_year, literal_column('0'))
+
+
+class CoverJob(db.Model):
+    """Persistent queue entry for a cover lookup or cover image download that runs in the background."""
+
+    __tablename__ = "cover_jobs"
+
+    QUEUED = "queued"
+    RUNNING = "running"
+
+    # A lookup resolves the provider cover URL, an image job downloads it for the cover proxy
+    LOOKUP = "lookup"
+    IMAGE = "image"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    book_id = db.Column(db.Integer, db.ForeignKey("books.id", ondelete="CASCADE"),
+                        nullable=False, unique=True)
+    kind = db.Column(db.String(10), nullable=False, default=LOOKUP, server_default=LOOKUP)
+    status = db.Column(db.String(10), nullable=False, default=QUEUED, index=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.String(500), nullable=True)
+    available_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    claimed_at = db.Column(db.DateTime, nullable=True)
+
+    book = db.relationship("Book")
+
+    def __repr__(self) -> str:
+        return (f"<CoverJob(id={self.id}, book_id={self.book_id}, kind='{self.kind}', "
+                f"status='{self.status}', attempts={self.attempts})>")
+
+
+class CoverLookup(db.Model):
+    """Cached result of a cover provider lookup, including misses."""
+
+    __tablename__ = "cover_lookups"
+
+    lookup_key = db.Column(db.String(300), primary_key=True)
+    cover_url = db.Column(db.String(500), nullable=True)
+    fetched_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def __repr__(self) -> str:
+        return f"<CoverLookup(lookup_key='{self.lookup_key}', cover_url='{self.cover_url}')>"
+
+
+class CatalogRevision(db.Model):
+    """
+    Single-row counter that every catalog write increments.
+    The label revision only moves with writes that add, rename or delete books or authors.
+    """
+
+    __tablename__ = "catalog_revision"
+
+    id = db.Column(db.Integer, primary_key=True)
+    revision = db.Column(db.Integer, nullable=False, default=0)
+    label_revision = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    @classmethod
+    def bump(cls) -> None:
+        """
+        Increment the catalog revision inside the caller's transaction.
+        """
+        db.session.execute(
+            update(cls).where(cls.id == 1).values(revision=cls.revision + 1, updated_at=datetime.utcnow())
+        )
+
+    @classmethod
+    def bump_labels(cls) -> Optional[int]:
+        """
+        Increment the catalog and label revisions inside the caller's transaction.
+        Used instead of bump() by writes that change book titles or author names.
+        :return: New label revision, None if the counter row is missing
+        """
+        db.session.execute(
+            update(cls).where(cls.id == 1)
+            .values(revision=cls.revision + 1, label_revision=cls.label_revision + 1,
+                    updated_at=datetime.utcnow())
+        )
+        # Read back in the same transaction, which holds the write lock, rather than
+        # with RETURNING, which needs SQLite 3.35
+        return db.session.execute(select(cls.label_revision).where(cls.id == 1)).scalar()
+
+    @classmethod
+    def current(cls) -> int:
+        """
+        Read the committed catalog revision.
+        :return: Current revision number
+        """
+        return db.session.execute(select(cls.revision).where(cls.id == 1)).scalar() or 0
+
+    @classmethod
+    def current_labels(cls) -> int:
+        """
+        Read the committed label revision.
+        :return: Current label revision number
+        """
+        return db.session.execute(select(cls.label_revision).where(cls.id == 1)).scalar() or 0
+
+    @classmethod
+    def current_state(cls) -> Tuple[int, Optional[datetime]]:
+        """
+        Read the committed catalog revision and the time of the last change.
+        :return: Tuple of revision number and last change time
+        """
+        row = db.session.execute(select(cls.revision, cls.updated_at).where(cls.id == 1)).first()
+        return (row.revision, row.updated_at) if row else (0, None)
+
+    @classmethod
+    def ensure_row(cls) -> None:
+        """
+        Create the counter row if it does not exist yet.
+        """
+        if db.session.get(cls, 1) is None:
+            db.session.add(cls(id=1, revision=0))
+            db.session.commit()
+
+
+# Replaced by ix_books_title_nocase_id and ix_books_year_sort_id, which also
+# serve the keyset pagination; keeping them would only slow down writes
+RETIRED_INDEXES = ('ix_books_title', 'ix_books_publication_year')
+
+
+def upgrade_schema(engine) -> List[str]:
+    """
+    Add columns and indexes that were introduced after an existing database was created,
+    and drop indexes the models no longer declare.
+    :param engine: SQLAlchemy engine bound to the library database
+    :return: Added columns as 'table.column' strings
+    """
+    added = []
+    inspector = inspect(engine)
+
+    with engine.begin() as connection:
+        for index_name in RETIRED_INDEXES:
+            connection.execute(text(f"DROP INDEX IF EXISTS {index_name}"))
+
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_spec = CreateColumn(column).compile(dialect=engine.dialect)
+                    connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column_spec}"))
+                    added.append(f"{table.name}.{column.name}")
+
+            # Expression indexes are not reflected, so let SQLite skip existing ones
+            for index in table.indexes:
+                connection.execute(CreateIndex(index, if_not_exists=True))
+
+    return added
+
+
+def build_sqlite_pragmas(config) -> List[str]:
+    """
+    Build the PRAGMA statements for the SQLite settings of a configuration.
+    :param config: Flask config mapping
+    :return: List of PRAGMA statements
+    """
+    pragmas = []
+
+    if config.get('SQLITE_JOURNAL_MODE'):
+        pragmas.append(f"PRAGMA journal_mode = {config['SQLITE_JOURNAL_MODE'].upper()}")
+    if config.get('SQLITE_SYNCHRONOUS'):
+        pragmas.append(f"PRAGMA synchronous = {config['SQLITE_SYNCHRONOUS'].upper()}")
+    if config.get('SQLITE_CACHE_SIZE') is not None:
+        pragmas.append(f"PRAGMA cache_size = {int(config['SQLITE_CACHE_SIZE'])}")
+    if config.get('SQLITE_MMAP_SIZE') is not None:
+        pragmas.append(f"PRAGMA mmap_size = {int(config['SQLITE_MMAP_SIZE'])}")
+    if config.get('SQLITE_TEMP_STORE'):
+        pragmas.append(f"PRAGMA temp_store = {config['SQLITE_TEMP_STORE'].upper()}")
+    if config.get('SQLITE_FOREIGN_KEYS') is not None:
+        pragmas.append(f"PRAGMA foreign_keys = {'ON' if config['SQLITE_FOREIGN_KEYS'] else 'OFF'}")
+
+    return pragmas
+
+
+def register_sqlite_pragmas(engine, config) -> None:
+    """
+    Apply the configured SQLite pragmas to every new connection of an engine.
+    :param engine: SQLAlchemy engine
+    :param config: Flask config mapping
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+
+    pragmas = build_sqlite_pragmas(config)
+
+    @event.listens_for(engine, "connect")
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
 
 def init_db(app):
     """
@@ -202,4 +676,14 @@ def init_db(app):
     db.init_app(app)
 
     with app.app_context():
-        db.create_all()
\ No newline at end of file
+        register_sqlite_pragmas(db.engine, app.config)
+        db.create_all()
+        added_columns = upgrade_schema(db.engine)
+
+        if 'authors.book_count' in added_columns:
+            db.session.execute(Author.rebuild_aggregates_statement())
+            db.session.commit()
+
+        CatalogRevision.ensure_row()
+
+        init_search_index(db.engine)
\ No newline at end of file
@@ -0,0 +1,82 @@
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+
+class Field(NamedTuple):
+    """One key of a model's API representation and the columns it is computed from."""
+
+    columns: Tuple[str, ...]
+    build: Optional[Callable[..., Any]] = None
+
+
+class Projection:
+    """
+    A selection of API fields of a model, with the columns needed to compute them.
+
+    Queries select columns() as plain rows; build() turns a row into the API
+    dictionary. Only the columns of requested fields are selected and only their
+    values are computed. Embedded projections of related models follow the
+    model's own columns in the row.
+    """
+
+    def __init__(self, model, fields: Dict[str, Field], names: Sequence[str],
+                 embeds: Optional[Dict[str, 'Projection']] = None):
+        """
+        :param model: Mapped model class the columns belong to
+        :param fields: All API fields of the model by name
+        :param names: Names of the selected fields
+        :param embeds: Projections of related models by API key
+        """
+        # The primary key is always selected so a missing related row can be told apart
+        column_names = ['id']
+        for name in names:
+            for column_name in fields[name].columns:
+                if column_name not in column_names:
+                    column_names.append(column_name)
+
+        self.model = model
+        self.names = tuple(names)
+        self.column_names = tuple(column_names)
+        self.embeds = embeds or {}
+        self._builders = [
+            (name, fields[name].build, tuple(column_names.index(column) for column in fields[name].columns))
+            for name in names
+        ]
+
+    @property
+    def width(self) -> int:
+        """
+        Number of row values the projection and its embeds occupy.
+        :return: Column count
+        """
+        return len(self.column_names) + sum(embed.width for embed in self.embeds.values())
+
+    def columns(self) -> List:
+        """
+        Columns to select, embedded projections included, in row order.
+        :return: List of column attributes
+        """
+        columns = [getattr(self.model, name) for name in self.column_names]
+        for embed in self.embeds.values():
+            columns.extend(embed.columns())
+        return columns
+
+    def build(self, row: Sequence[Any], offset: int = 0) -> Dict[str, Any]:
+        """
+        Build the API dictionary of the selected fields from a row.
+        :param row: Row selected with columns(), possibly followed by further values
+        :param offset: Position of the first column of this projection in the row
+        :return: Dictionary with one entry per selected field and embed
+        """
+        values = {}
+        for name, build, indexes in self._builders:
+            if build is None:
+                values[name] = row[offset + indexes[0]]
+            else:
+                values[name] = build(*(row[offset + index] for index in indexes))
+
+        position = offset + len(self.column_names)
+        for key, embed in self.embeds.items():
+            values[key] = embed.build(row, position) if row[position] is not None else None
+            position += embed.width
+
+        return values
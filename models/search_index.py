@@ -0,0 +1,473 @@
+import re
+import unicodedata
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from markupsafe import Markup, escape
+from sqlalchemy import Float, Integer, bindparam, text
+from sqlalchemy.exc import OperationalError
+
+FTS_TABLE = "books_fts"
+TRIGRAM_TABLE = "books_trigram"
+
+# Fuzzy search: trigram matches fetched per query, and the similarity a book needs to be kept
+FUZZY_CANDIDATE_LIMIT = 200
+FUZZY_MIN_SIMILARITY = 0.3
+FUZZY_MAX_TRIGRAMS = 32
+
+# bm25 column weights for the relevance sort: a title match counts more than an author or year match
+FTS_RANK_WEIGHTS = (10.0, 5.0, 1.0)
+RANK_SUBQUERY = "search_rank"
+
+# highlight() wraps matches in these control characters, replaced by <mark> after escaping
+_HIGHLIGHT_START = '\x02'
+_HIGHLIGHT_END = '\x03'
+
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+_fts_enabled = False
+_trigram_enabled = False
+
+_CREATE_TABLE = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+    title,
+    author_name,
+    publication_year,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+)
+"""
+
+_CREATE_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS books_fts_after_insert AFTER INSERT ON books BEGIN
+        INSERT INTO {FTS_TABLE} (rowid, title, author_name, publication_year)
+        VALUES (new.id, new.title,
+                (SELECT name FROM authors WHERE id = new.author_id),
+                new.publication_year);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS books_fts_after_delete AFTER DELETE ON books BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS books_fts_after_update
+    AFTER UPDATE OF title, author_id, publication_year ON books BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+        INSERT INTO {FTS_TABLE} (rowid, title, author_name, publication_year)
+        VALUES (new.id, new.title,
+                (SELECT name FROM authors WHERE id = new.author_id),
+                new.publication_year);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS authors_fts_after_update
+    AFTER UPDATE OF name ON authors BEGIN
+        UPDATE {FTS_TABLE} SET author_name = new.name
+        WHERE rowid IN (SELECT id FROM books WHERE author_id = new.id);
+    END
+    """,
+]
+
+
+# Same columns as the FTS table, tokenized into case-insensitive trigrams
+# so that a misspelled word still shares most of its trigrams with the right one.
+_CREATE_TRIGRAM_TABLE = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {TRIGRAM_TABLE} USING fts5(
+    title,
+    author_name,
+    tokenize = 'trigram'
+)
+"""
+
+_CREATE_TRIGRAM_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS books_trigram_after_insert AFTER INSERT ON books BEGIN
+        INSERT INTO {TRIGRAM_TABLE} (rowid, title, author_name)
+        VALUES (new.id, new.title, (SELECT name FROM authors WHERE id = new.author_id));
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS books_trigram_after_delete AFTER DELETE ON books BEGIN
+        DELETE FROM {TRIGRAM_TABLE} WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS books_trigram_after_update
+    AFTER UPDATE OF title, author_id ON books BEGIN
+        DELETE FROM {TRIGRAM_TABLE} WHERE rowid = old.id;
+        INSERT INTO {TRIGRAM_TABLE} (rowid, title, author_name)
+        VALUES (new.id, new.title, (SELECT name FROM authors WHERE id = new.author_id));
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS authors_trigram_after_update
+    AFTER UPDATE OF name ON authors BEGIN
+        UPDATE {TRIGRAM_TABLE} SET author_name = new.name
+        WHERE rowid IN (SELECT id FROM books WHERE author_id = new.id);
+    END
+    """,
+]
+
+
+def init_search_index(engine) -> bool:
+    """
+    Create the FTS5 search table and its sync triggers if SQLite supports them.
+    :param engine: SQLAlchemy engine bound to the library database
+    :return: True if the full-text index is available, False otherwise
+    """
+    global _fts_enabled
+
+    if engine.dialect.name != 'sqlite':
+        _fts_enabled = False
+        return False
+
+    try:
+        with engine.begin() as connection:
+            exists = connection.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {'name': FTS_TABLE}
+            ).first() is not None
+
+            connection.execute(text(_CREATE_TABLE))
+            for trigger in _CREATE_TRIGGERS:
+                connection.execute(text(trigger))
+
+            if not exists:
+                _populate(connection)
+
+        _fts_enabled = True
+    except OperationalError:
+        _fts_enabled = False
+
+    _init_trigram_index(engine)
+    return _fts_enabled
+
+
+def _init_trigram_index(engine) -> None:
+    """
+    Create the trigram table for fuzzy search and its sync triggers.
+    The trigram tokenizer needs SQLite 3.34; without it fuzzy search is disabled.
+    :param engine: SQLAlchemy engine bound to the library database
+    """
+    global _trigram_enabled
+
+    if not _fts_enabled:
+        _trigram_enabled = False
+        return
+
+    try:
+        with engine.begin() as connection:
+            exists = connection.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {'name': TRIGRAM_TABLE}
+            ).first() is not None
+
+            connection.execute(text(_CREATE_TRIGRAM_TABLE))
+            for trigger in _CREATE_TRIGRAM_TRIGGERS:
+                connection.execute(text(trigger))
+
+            if not exists:
+                _populate_trigrams(connection)
+
+        _trigram_enabled = True
+    except OperationalError:
+        _trigram_enabled = False
+
+
+def rebuild_search_index(engine) -> int:
+    """
+    Rebuild the full-text index from the books and authors tables.
+    :param engine: SQLAlchemy engine bound to the library database
+    :return: Number of indexed books
+    """
+    with engine.begin() as connection:
+        connection.execute(text(f"DELETE FROM {FTS_TABLE}"))
+        _populate(connection)
+        if _trigram_enabled:
+            connection.execute(text(f"DELETE FROM {TRIGRAM_TABLE}"))
+            _populate_trigrams(connection)
+        return connection.execute(text(f"SELECT count(*) FROM {FTS_TABLE}")).scalar()
+
+
+def _populate(connection) -> None:
+    """
+    Copy all existing books into the full-text index.
+    :param connection: Open database connection
+    """
+    connection.execute(text(f"""
+        INSERT INTO {FTS_TABLE} (rowid, title, author_name, publication_year)
+        SELECT books.id, books.title, authors.name, books.publication_year
+        FROM books LEFT JOIN authors ON authors.id = books.author_id
+    """))
+
+
+def _populate_trigrams(connection) -> None:
+    """
+    Copy all existing books into the trigram index.
+    :param connection: Open database connection
+    """
+    connection.execute(text(f"""
+        INSERT INTO {TRIGRAM_TABLE} (rowid, title, author_name)
+        SELECT books.id, books.title, authors.name
+        FROM books LEFT JOIN authors ON authors.id = books.author_id
+    """))
+
+
+def is_search_index_enabled() -> bool:
+    """
+    Check whether the full-text index can be used for searching.
+    :return: True if FTS5 is available and initialized
+    """
+    return _fts_enabled
+
+
+def build_match_expression(search_term: str) -> Optional[str]:
+    """
+    Convert free user input into a safe FTS5 MATCH expression.
+    Every word becomes a quoted prefix term and all terms must match.
+    :param search_term: Raw search input
+    :return: MATCH expression or None if the input has no searchable words
+    """
+    tokens = _TOKEN_PATTERN.findall(search_term or '')
+    if not tokens:
+        return None
+
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def is_fuzzy_search_enabled() -> bool:
+    """
+    Check whether the trigram index can be used for fuzzy searching.
+    :return: True if the trigram table is available and initialized
+    """
+    return _trigram_enabled
+
+
+def _fold_words(value: Optional[str]) -> List[str]:
+    """
+    Split text into lowercase words without accents.
+    :param value: Text to split
+    :return: List of words
+    """
+    decomposed = unicodedata.normalize('NFKD', value or '')
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return _TOKEN_PATTERN.findall(stripped.casefold())
+
+
+def _padded_trigrams(word: str) -> Set[str]:
+    """
+    Get the trigrams of a word padded like pg_trgm, so short words and word starts count too.
+    :param word: Folded word
+    :return: Set of trigrams
+    """
+    padded = f"  {word} "
+    return {padded[position:position + 3] for position in range(len(padded) - 2)}
+
+
+def word_similarity(query_word: str, word: str) -> float:
+    """
+    Trigram similarity of two folded words: shared trigrams divided by all distinct trigrams.
+    :param query_word: Word typed by the user
+    :param word: Word of a title or author name
+    :return: Similarity between 0 and 1
+    """
+    query_trigrams = _padded_trigrams(query_word)
+    trigrams = _padded_trigrams(word)
+    return len(query_trigrams & trigrams) / len(query_trigrams | trigrams)
+
+
+def text_similarity(search_term: str, *values: Optional[str]) -> float:
+    """
+    Score how well texts match a possibly misspelled search: every query word is
+    compared with its most similar word of the texts and the results are averaged.
+    :param search_term: Raw search input
+    :param values: Texts to match, such as title and author name
+    :return: Similarity between 0 and 1
+    """
+    query_words = _fold_words(search_term)
+    words = [word for value in values for word in _fold_words(value)]
+    if not query_words or not words:
+        return 0.0
+
+    return sum(max(word_similarity(query_word, word) for word in words)
+               for query_word in query_words) / len(query_words)
+
+
+def build_trigram_expression(search_term: str) -> Optional[str]:
+    """
+    Convert user input into an FTS5 MATCH expression for the trigram table that
+    matches rows sharing any trigram with the input's words.
+    :param search_term: Raw search input
+    :return: MATCH expression or None if no word has three characters
+    """
+    trigrams = []
+    for word in _TOKEN_PATTERN.findall((search_term or '').lower()):
+        for position in range(len(word) - 2):
+            trigram = word[position:position + 3]
+            if trigram not in trigrams:
+                trigrams.append(trigram)
+
+    if not trigrams:
+        return None
+
+    return ' OR '.join(f'"{trigram}"' for trigram in trigrams[:FUZZY_MAX_TRIGRAMS])
+
+
+def find_similar_books(connection, search_term: str) -> List[Tuple[int, float]]:
+    """
+    Find books whose title or author name resembles the search despite typos.
+    The trigram table supplies the best FUZZY_CANDIDATE_LIMIT candidates by bm25,
+    which are then ranked by word similarity and cut off at FUZZY_MIN_SIMILARITY.
+    :param connection: Connection or session to query
+    :param search_term: Raw search input
+    :return: List of (book ID, similarity), most similar first
+    """
+    match_expression = build_trigram_expression(search_term)
+    if not _trigram_enabled or not match_expression:
+        return []
+
+    candidates = connection.execute(
+        text(f"SELECT rowid, title, author_name FROM {TRIGRAM_TABLE} "
+             f"WHERE {TRIGRAM_TABLE} MATCH :match ORDER BY rank LIMIT :limit"),
+        {'match': match_expression, 'limit': FUZZY_CANDIDATE_LIMIT}
+    ).all()
+
+    scored = [(book_id, text_similarity(search_term, title, author_name))
+              for book_id, title, author_name in candidates]
+    scored = [(book_id, score) for book_id, score in scored if score >= FUZZY_MIN_SIMILARITY]
+    scored.sort(key=lambda item: (-item[1], item[0]))
+    return scored
+
+
+def build_rank_subquery(match_expression: str, similar: Sequence[Tuple[int, float]] = (),
+                        after: Optional[Sequence] = None, limit: Optional[int] = None):
+    """
+    Build a subquery of the books matching an FTS5 expression with their bm25 score, best first.
+    The keyset condition is checked while FTS5 reads the matches, and with a limit the
+    ranking keeps only the best page of them in a bounded sort instead of sorting them all.
+    Lower scores are better and equal scores come in book ID order.
+    Books a fuzzy search found only by similarity follow every full-text match,
+    most similar first: bm25 scores are negative and such a book scores 1 - similarity.
+    :param match_expression: MATCH expression for the full-text table
+    :param similar: (book ID, similarity) pairs from find_similar_books
+    :param after: Score and book ID of the last book on the previous page
+    :param limit: Page size, bounds the sort of the full-text matches
+    :return: Subquery named RANK_SUBQUERY with book_id and score columns
+    """
+    arguments = ', '.join(str(weight) for weight in FTS_RANK_WEIGHTS)
+    sql = (f"SELECT rowid AS book_id, rank AS score FROM {FTS_TABLE} "
+           f"WHERE {FTS_TABLE} MATCH :rank_match AND rank MATCH :rank_function")
+    parameters = {'rank_match': match_expression, 'rank_function': f"bm25({arguments})"}
+    if after:
+        sql += " AND (rank > :after_score OR (rank = :after_score AND rowid > :after_id))"
+        parameters.update(after_score=after[0], after_id=after[1])
+    # FTS5 does not promise an order for equal ranks, so the book ID breaks ties
+    # the same way as the keyset condition above
+    sql += " ORDER BY rank, rowid"
+    if limit:
+        sql += " LIMIT :rank_limit"
+        parameters['rank_limit'] = limit
+
+    if after:
+        similar = [(book_id, similarity) for book_id, similarity in similar
+                   if (1.0 - similarity, book_id) > tuple(after)]
+    if similar:
+        rows = []
+        for position, (book_id, similarity) in enumerate(similar):
+            rows.append(f"(:similar_id_{position}, :similar_score_{position})")
+            parameters[f'similar_id_{position}'] = book_id
+            parameters[f'similar_score_{position}'] = 1.0 - similarity
+        # A similar book that also matches the full-text index keeps its bm25 score. The
+        # match list is built once, a correlated MATCH per similar book costs far more.
+        sql = (f"SELECT * FROM ({sql}) UNION ALL SELECT column1, column2 FROM (VALUES {', '.join(rows)}) "
+               f"WHERE column1 NOT IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :rank_match)")
+
+    return (
+        text(sql)
+        .bindparams(**parameters)
+        .columns(book_id=Integer, score=Float)
+        .subquery(RANK_SUBQUERY)
+    )
+
+
+def _render_highlight(value: Optional[str]) -> Optional[str]:
+    """
+    Turn highlight() output into HTML: the text is escaped and only the matches become <mark> elements.
+    :param value: Column text with highlight markers
+    :return: Safe HTML or None for a missing value
+    """
+    if value is None:
+        return None
+
+    html = []
+    for part in value.split(_HIGHLIGHT_START):
+        match, _, rest = part.rpartition(_HIGHLIGHT_END)
+        if match:
+            html.append(Markup('<mark>%s</mark>') % match.replace(_HIGHLIGHT_END, ''))
+        html.append(escape(rest))
+    return str(Markup('').join(html))
+
+
+def _highlight_similar_words(search_term: str, value: Optional[str]) -> Optional[str]:
+    """
+    Render text as HTML with the words similar to a word of the search in <mark> elements.
+    :param search_term: Raw search input
+    :param value: Title or author name
+    :return: Safe HTML or None for a missing value
+    """
+    if value is None:
+        return None
+
+    query_words = _fold_words(search_term)
+    html = []
+    position = 0
+    for match in _TOKEN_PATTERN.finditer(value):
+        words = _fold_words(match.group())
+        if words and any(word_similarity(query_word, words[0]) >= FUZZY_MIN_SIMILARITY
+                         for query_word in query_words):
+            html.append(escape(value[position:match.start()]))
+            html.append(Markup('<mark>%s</mark>') % match.group())
+            position = match.end()
+    html.append(escape(value[position:]))
+    return str(Markup('').join(html))
+
+
+def find_highlights(connection, search_term: str, book_ids: Sequence[int],
+                    fuzzy: bool = False) -> Dict[int, Dict[str, Optional[str]]]:
+    """
+    Mark the parts of titles and author names that match a search.
+    With fuzzy, books the word index does not match get their similar words marked.
+    :param connection: Connection or session to query
+    :param search_term: Raw search input
+    :param book_ids: IDs of the books to highlight, usually one page
+    :param fuzzy: Mark similar words of books without word matches
+    :return: Dictionary of book ID to HTML-safe 'title' and 'author' with <mark> around matches
+    """
+    match_expression = build_match_expression(search_term)
+    if not _fts_enabled or not match_expression or not book_ids:
+        return {}
+
+    rows = connection.execute(
+        text(f"SELECT rowid, highlight({FTS_TABLE}, 0, :start, :end), highlight({FTS_TABLE}, 1, :start, :end) "
+             f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match AND rowid IN :ids")
+        .bindparams(bindparam('ids', expanding=True)),
+        {'match': match_expression, 'ids': list(book_ids), 'start': _HIGHLIGHT_START, 'end': _HIGHLIGHT_END}
+    ).all()
+    highlights = {book_id: {'title': _render_highlight(title), 'author': _render_highlight(author_name)}
+                  for book_id, title, author_name in rows}
+
+    missing = [book_id for book_id in book_ids if book_id not in highlights]
+    if fuzzy and missing:
+        # highlight() on the trigram table repeats text when matches overlap, so words are compared here
+        rows = connection.execute(
+            text(f"SELECT rowid, title, author_name FROM {FTS_TABLE} WHERE rowid IN :ids")
+            .bindparams(bindparam('ids', expanding=True)),
+            {'ids': missing}
+        ).all()
+        for book_id, title, author_name in rows:
+            highlights[book_id] = {'title': _highlight_similar_words(search_term, title),
+                                   'author': _highlight_similar_words(search_term, author_name)}
+
+    return highlights
@@ -0,0 +1,147 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+from flask import Flask, current_app
+from sqlalchemy import bindparam, delete, or_, select, update
+
+from constants import AppConstants, CoverStatus
+from models.models import Book, CatalogRevision, CoverJob, db
+from services.cover_service import GOOGLE_BOOKS_PROVIDER, get_book_cover_url
+from services.http_client import RateLimiter, get_provider_client
+
+
+def load_checkpoint(path: str) -> int:
+    """
+    Read the last processed book ID of an interrupted backfill.
+    :param path: Checkpoint file path
+    :return: Last processed book ID or 0 if there is no checkpoint
+    """
+    try:
+        with open(path, encoding='utf-8') as checkpoint:
+            return int(json.load(checkpoint).get('last_id', 0))
+    except (OSError, ValueError, TypeError, AttributeError):
+        return 0
+
+
+def save_checkpoint(path: str, last_id: int) -> None:
+    """
+    Atomically record the last processed book ID.
+    :param path: Checkpoint file path
+    :param last_id: Last processed book ID
+    """
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as checkpoint:
+        json.dump({'last_id': last_id}, checkpoint)
+    os.replace(temp_path, path)
+
+
+def fetch_backfill_batch(after_id: int, batch_size: int) -> List[Tuple[int, Optional[str], str]]:
+    """
+    Get the next batch of books without a real cover, ordered by ID.
+    :param after_id: Only books with a greater ID are returned
+    :param batch_size: Maximum number of books
+    :return: List of (id, isbn, title) tuples
+    """
+    rows = db.session.execute(
+        select(Book.id, Book.isbn, Book.title)
+        .where(Book.id > after_id,
+               or_(Book.cover_url_cached.is_(None),
+                   Book.cover_url_cached == AppConstants.DEFAULT_COVER_URL))
+        .order_by(Book.id)
+        .limit(batch_size)
+    ).all()
+    return [tuple(row) for row in rows]
+
+
+def run_cover_backfill(app: Flask, batch_size: int = 500, workers: int = 8,
+                       requests_per_second: float = 10.0, restart: bool = False,
+                       progress: Callable[[Dict[str, float]], None] = None) -> Dict[str, float]:
+    """
+    Resolve covers for every book that still has none, resuming from the last checkpoint.
+    Lookups run on a bounded thread pool behind a rate limit that only applies to them,
+    and results are written with one executemany UPDATE and commit per batch. Cover jobs
+    of the books written are deleted in the same transaction.
+    :param app: Flask application instance (worker threads push their own app context)
+    :param batch_size: Books per batch and per commit
+    :param workers: Number of lookup threads
+    :param requests_per_second: Upper bound on provider requests per second
+    :param restart: Ignore the checkpoint and start from the first book
+    :param progress: Callback receiving the running statistics after every batch
+    :return: Final statistics
+    """
+    checkpoint_path = current_app.config['COVER_BACKFILL_CHECKPOINT']
+    last_id = 0 if restart else load_checkpoint(checkpoint_path)
+
+    client = get_provider_client(GOOGLE_BOOKS_PROVIDER)
+    rate_limiter = RateLimiter(requests_per_second, burst=workers)
+
+    stats = {'processed': 0, 'resolved': 0, 'missing': 0, 'elapsed': 0.0, 'rate': 0.0,
+             'last_id': last_id, 'interrupted': False}
+    started_at = time.monotonic()
+
+    def resolve(row: Tuple[int, Optional[str], str]) -> Tuple[int, Optional[str]]:
+        book_id, isbn, title = row
+        with app.app_context(), client.rate_limited(rate_limiter):
+            try:
+                return book_id, get_book_cover_url(isbn, title)
+            except requests.RequestException:
+                # Left unresolved, the batch is looked up again when the backfill resumes
+                return book_id, None
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='cover-backfill') as pool:
+        while True:
+            batch = fetch_backfill_batch(last_id, batch_size)
+            db.session.commit()
+            if not batch:
+                break
+
+            results = list(pool.map(resolve, batch))
+            provider_down = any(cover_url is None for _, cover_url in results)
+
+            updates = []
+            for book_id, cover_url in results:
+                if cover_url is None:
+                    continue
+                found = cover_url != AppConstants.DEFAULT_COVER_URL
+                updates.append({
+                    'id': book_id,
+                    'cover_url_cached': cover_url,
+                    'cover_image_hash': None,
+                    'cover_status': CoverStatus.RESOLVED if found else CoverStatus.FAILED
+                })
+                stats['resolved' if found else 'missing'] += 1
+
+            if updates:
+                db.session.execute(update(Book), updates)
+                # Queued lookups are done now; a worker still running one loses its
+                # claim and discards its result
+                jobs = CoverJob.__table__
+                db.session.execute(delete(jobs).where(jobs.c.book_id == bindparam('book_id')),
+                                   [{'book_id': row['id']} for row in updates])
+                Book.bump_revisions([row['id'] for row in updates])
+                CatalogRevision.bump()
+            db.session.commit()
+
+            stats['processed'] += len(updates)
+            stats['elapsed'] = time.monotonic() - started_at
+            stats['rate'] = stats['processed'] / stats['elapsed'] if stats['elapsed'] else 0.0
+
+            if provider_down:
+                stats['interrupted'] = True
+                break
+
+            last_id = batch[-1][0]
+            stats['last_id'] = last_id
+            save_checkpoint(checkpoint_path, last_id)
+
+            if progress:
+                progress(stats)
+
+    if not stats['interrupted'] and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    return stats
@@ -0,0 +1,181 @@
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Callable, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models.models import CoverLookup, db
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Small thread-safe LRU mapping with per-entry expiry."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        """
+        Get a value if it is present and not expired.
+        :param key: Cache key
+        :return: Cached value or the _MISSING sentinel
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+
+            value, expires_at = entry
+            if expires_at <= datetime.utcnow():
+                del self._entries[key]
+                return _MISSING
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value, expires_at: datetime) -> None:
+        """
+        Store a value and evict the least recently used entries beyond max_size.
+        :param key: Cache key
+        :param value: Value to store
+        :param expires_at: Expiry time (UTC)
+        """
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """
+        Remove all entries.
+        """
+        with self._lock:
+            self._entries.clear()
+
+
+_memory_cache: Optional[LRUCache] = None
+_memory_cache_lock = threading.Lock()
+
+
+def isbn_cache_key(isbn: str) -> str:
+    """
+    Build the cache key for an ISBN lookup.
+    :param isbn: Clean ISBN (digits only)
+    :return: Cache key
+    """
+    return f"isbn:{isbn}"
+
+
+def title_cache_key(title: str) -> str:
+    """
+    Build the cache key for a title lookup, ignoring case, punctuation and spacing.
+    :param title: Book title
+    :return: Cache key
+    """
+    normalized = ' '.join(re.findall(r"\w+", title.lower()))
+    return f"title:{normalized}"[:300]
+
+
+def cached_cover_lookup(key: str, fetch: Callable[[], Optional[str]],
+                        bypass_cache: bool = False) -> Optional[str]:
+    """
+    Resolve a cover through the in-process LRU, then the cover_lookups table, then the provider.
+    Found covers are kept for COVER_CACHE_TTL and misses for COVER_CACHE_NEGATIVE_TTL.
+    Exceptions raised by fetch are not cached and propagate to the caller.
+    :param key: Cache key from isbn_cache_key or title_cache_key
+    :param fetch: Callable that queries the provider and returns a cover URL or None
+    :param bypass_cache: Skip cached results and always query the provider
+    :return: Cover URL or None if the provider has no cover
+    """
+    if not bypass_cache:
+        found, cover_url = _read_cached(key)
+        if found:
+            return cover_url
+
+    cover_url = fetch()
+    _store(key, cover_url)
+    return cover_url
+
+
+def purge_expired_lookups() -> int:
+    """
+    Delete expired rows from the cover_lookups table.
+    :return: Number of deleted rows
+    """
+    with db.engine.begin() as connection:
+        result = connection.execute(
+            delete(CoverLookup).where(CoverLookup.expires_at <= datetime.utcnow())
+        )
+        return result.rowcount
+
+
+def _get_memory_cache() -> LRUCache:
+    """
+    Get the process-wide LRU, creating it from the app config on first use.
+    :return: LRU cache instance
+    """
+    global _memory_cache
+
+    if _memory_cache is None:
+        with _memory_cache_lock:
+            if _memory_cache is None:
+                _memory_cache = LRUCache(current_app.config['COVER_CACHE_LRU_SIZE'])
+
+    return _memory_cache
+
+
+def _read_cached(key: str) -> Tuple[bool, Optional[str]]:
+    """
+    Look a key up in the LRU and then in the database.
+    :param key: Cache key
+    :return: Tuple of (found, cover URL)
+    """
+    memory_cache = _get_memory_cache()
+    value = memory_cache.get(key)
+    if value is not _MISSING:
+        return True, value
+
+    with db.engine.connect() as connection:
+        row = connection.execute(
+            select(CoverLookup.cover_url, CoverLookup.expires_at)
+            .where(CoverLookup.lookup_key == key, CoverLookup.expires_at > datetime.utcnow())
+        ).first()
+
+    if row is None:
+        return False, None
+
+    memory_cache.set(key, row.cover_url, row.expires_at)
+    return True, row.cover_url
+
+
+def _store(key: str, cover_url: Optional[str]) -> None:
+    """
+    Write a lookup result to the database and the LRU.
+    Uses its own connection so the caller's session transaction is left untouched.
+    :param key: Cache key
+    :param cover_url: Cover URL or None for a miss
+    """
+    ttl = current_app.config['COVER_CACHE_TTL' if cover_url else 'COVER_CACHE_NEGATIVE_TTL']
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=ttl)
+
+    statement = sqlite_insert(CoverLookup).values(
+        lookup_key=key, cover_url=cover_url, fetched_at=now, expires_at=expires_at
+    )
+    statement = statement.on_conflict_do_update(
+        index_elements=[CoverLookup.lookup_key],
+        set_={'cover_url': cover_url, 'fetched_at': now, 'expires_at': expires_at}
+    )
+
+    with db.engine.begin() as connection:
+        connection.execute(statement)
+
+    _get_memory_cache().set(key, cover_url, expires_at)
@@ -0,0 +1,256 @@
+import hashlib
+import io
+import logging
+import os
+import tempfile
+from typing import Optional, Tuple
+
+import requests
+from flask import current_app
+from sqlalchemy import select, update
+from sqlalchemy.exc import SQLAlchemyError
+
+from constants import AppConstants
+from models.models import Book, db
+from services.http_client import get_provider_client
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+COVER_IMAGE_PROVIDER = 'cover_images'
+
+_SIGNATURES = (
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+)
+
+
+def sniff_image_type(data: bytes) -> Optional[str]:
+    """
+    Detect the image format from the leading bytes.
+    :param data: Image bytes, at least the first 12
+    :return: Mimetype or None if the data is not a supported image
+    """
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    for signature, mimetype in _SIGNATURES:
+        if data.startswith(signature):
+            return mimetype
+    return None
+
+
+def cover_image_path(image_hash: str, size: Optional[str] = None) -> str:
+    """
+    Get the file of a downloaded cover image or of one of its resized variants.
+    Files are named after the hash of the original, two levels deep.
+    :param image_hash: SHA-256 of the original image
+    :param size: Size name from AppConstants.COVER_IMAGE_SIZES, None for the original
+    :return: Absolute file path
+    """
+    name = image_hash if size is None else f"{image_hash}-{size}.jpg"
+    return os.path.join(current_app.config['COVER_IMAGE_DIR'], image_hash[:2], name)
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    """
+    Write a file so that concurrent readers never see a partial image.
+    :param path: Target path
+    :param data: File content
+    """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    handle, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(handle, 'wb') as temp_file:
+            temp_file.write(data)
+        os.replace(temp_path, path)
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def download_cover_image(url: str) -> str:
+    """
+    Download a cover image and store it under its content hash.
+    :param url: Provider image URL
+    :return: SHA-256 of the image
+    :raises requests.RequestException: If the download fails
+    :raises ValueError: If the response is not a supported image or too large
+    """
+    max_bytes = current_app.config['COVER_IMAGE_MAX_BYTES']
+    response = get_provider_client(COVER_IMAGE_PROVIDER).get(url, timeout=AppConstants.API_REQUEST_TIMEOUT,
+                                                             stream=True)
+    with response:
+        response.raise_for_status()
+
+        content_length = response.headers.get('Content-Length', '')
+        if content_length.isdigit() and int(content_length) > max_bytes:
+            raise ValueError(f"Cover image too large: {content_length} bytes")
+        data = _read_limited(response, max_bytes)
+
+    if not sniff_image_type(data[:12]):
+        raise ValueError("Cover response is not a supported image")
+
+    image_hash = hashlib.sha256(data).hexdigest()
+    path = cover_image_path(image_hash)
+    if not os.path.exists(path):
+        _write_atomic(path, data)
+    return image_hash
+
+
+def _read_limited(response: requests.Response, max_bytes: int) -> bytes:
+    """
+    Read a streamed response body, stopping as soon as it exceeds a size limit.
+    :param response: Response opened with stream=True
+    :param max_bytes: Largest accepted body size
+    :return: Body bytes
+    :raises ValueError: If the body is larger than max_bytes
+    """
+    chunks = []
+    received = 0
+    for chunk in response.iter_content(AppConstants.COVER_IMAGE_CHUNK_SIZE):
+        received += len(chunk)
+        if received > max_bytes:
+            raise ValueError(f"Cover image larger than {max_bytes} bytes")
+        chunks.append(chunk)
+    return b''.join(chunks)
+
+
+def has_cover_image(image_hash: Optional[str]) -> bool:
+    """
+    Check whether the original of a downloaded cover is stored locally.
+    :param image_hash: Image hash recorded on a book or None
+    :return: True if the cover proxy can serve the image
+    """
+    return bool(image_hash) and os.path.exists(cover_image_path(image_hash))
+
+
+def cache_book_cover_image(book_id: int) -> Optional[str]:
+    """
+    Download a book's cover unless a local copy exists and record its hash on the book.
+    The hash is only stored if the provider URL did not change during the download.
+    Only the book's revision changes: listings keep working with the provider URL, so a
+    derived image is no reason to invalidate every cached page of the catalog.
+    :param book_id: Book ID
+    :return: Image hash, or None if the book has no provider cover
+    :raises requests.RequestException: If the download fails
+    :raises ValueError: If the response is not a supported image
+    :raises SQLAlchemyError: If the database update fails
+    """
+    row = db.session.execute(
+        select(Book.cover_url_cached, Book.cover_image_hash).where(Book.id == book_id)
+    ).first()
+    db.session.commit()
+
+    if not row or not row.cover_url_cached or row.cover_url_cached == AppConstants.DEFAULT_COVER_URL:
+        return None
+    if has_cover_image(row.cover_image_hash):
+        return row.cover_image_hash
+
+    image_hash = download_cover_image(row.cover_url_cached)
+
+    result = db.session.execute(
+        update(Book)
+        .where(Book.id == book_id, Book.cover_url_cached == row.cover_url_cached)
+        .values(cover_image_hash=image_hash)
+    )
+    if result.rowcount:
+        # cover_url of the book now points at the proxy
+        Book.bump_revisions([book_id])
+    db.session.commit()
+
+    return image_hash
+
+
+def get_cover_image(image_hash: str, size: str) -> Tuple[str, str]:
+    """
+    Get the file of a cover in a size, resizing the original on first use.
+    Without Pillow the original image is served for every size.
+    :param image_hash: SHA-256 of the original image
+    :param size: Size name from AppConstants.COVER_IMAGE_SIZES or 'original'
+    :return: Tuple of file path and mimetype
+    :raises FileNotFoundError: If the original is not stored
+    """
+    original = cover_image_path(image_hash)
+    if size == 'original' or Image is None:
+        with open(original, 'rb') as image_file:
+            return original, sniff_image_type(image_file.read(12)) or 'application/octet-stream'
+
+    path = cover_image_path(image_hash, size)
+    if not os.path.exists(path):
+        try:
+            _write_atomic(path, _resize(original, AppConstants.COVER_IMAGE_SIZES[size]))
+        except (OSError, Image.DecompressionBombError) as e:
+            logger.warning("Could not resize cover image %s: %s", image_hash, e)
+            return get_cover_image(image_hash, 'original')
+    return path, 'image/jpeg'
+
+
+def _resize(path: str, bounds: Tuple[int, int]) -> bytes:
+    """
+    Shrink an image to fit the bounds, keeping its aspect ratio, and encode it as JPEG.
+    :param path: Original image file
+    :param bounds: Maximum width and height
+    :return: JPEG bytes
+    """
+    with Image.open(path) as image:
+        image.thumbnail(bounds)
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        output = io.BytesIO()
+        image.save(output, 'JPEG', quality=current_app.config['COVER_IMAGE_QUALITY'], optimize=True)
+        return output.getvalue()
+
+
+def cache_cover_image_safely(book_id: int) -> Optional[str]:
+    """
+    Like cache_book_cover_image, but log failures instead of raising them.
+    :param book_id: Book ID
+    :return: Image hash or None if there is none or the download failed
+    """
+    try:
+        return cache_book_cover_image(book_id)
+    except (requests.RequestException, ValueError, OSError, SQLAlchemyError) as e:
+        db.session.rollback()
+        logger.warning("Could not cache cover image of book %s: %s", book_id, e)
+        return None
+
+
+def cache_missing_cover_images(batch_size: int = 100) -> Tuple[int, int]:
+    """
+    Download the covers of all books that have a provider cover but no local copy yet.
+    :param batch_size: Book IDs fetched per query
+    :return: Tuple of cached and failed downloads
+    """
+    cached = failed = 0
+    last_id = 0
+
+    while True:
+        book_ids = db.session.scalars(
+            select(Book.id)
+            .where(Book.id > last_id,
+                   Book.cover_image_hash.is_(None),
+                   Book.cover_url_cached.is_not(None),
+                   Book.cover_url_cached != AppConstants.DEFAULT_COVER_URL)
+            .order_by(Book.id)
+            .limit(batch_size)
+        ).all()
+        db.session.commit()
+        if not book_ids:
+            break
+
+        for book_id in book_ids:
+            if cache_cover_image_safely(book_id):
+                cached += 1
+            else:
+                failed += 1
+        last_id = book_ids[-1]
+
+    return cached, failed
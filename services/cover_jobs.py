@@ -0,0 +1,330 @@
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+import requests
+from flask import Flask, current_app
+from sqlalchemy import delete, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from constants import AppConstants, CoverStatus
+from models.models import Book, CatalogRevision, CoverJob, db
+from services.cover_images import cache_book_cover_image, cache_cover_image_safely
+from services.cover_service import get_book_cover_url
+from services.http_client import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_cover_job(book: Book) -> None:
+    """
+    Queue a cover lookup for a book as part of the caller's transaction.
+    :param book: Book instance (may not be flushed yet)
+    """
+    book.cover_status = CoverStatus.PENDING
+
+    job = CoverJob.query.filter_by(book_id=book.id).first() if book.id else None
+    if job:
+        job.kind = CoverJob.LOOKUP
+        job.status = CoverJob.QUEUED
+        job.attempts = 0
+        job.last_error = None
+        job.available_at = datetime.utcnow()
+    else:
+        db.session.add(CoverJob(book=book))
+
+
+def enqueue_cover_image_job(book: Book) -> bool:
+    """
+    Queue the download of a book's provider cover for the cover proxy.
+    Nothing is queued if the book has no provider cover or already has a job, which
+    includes a failed download waiting for its retry.
+    :param book: Book instance
+    :return: True if a job was queued, the caller should then notify the workers
+    """
+    if not book.cover_url_cached or book.cover_url_cached == AppConstants.DEFAULT_COVER_URL:
+        return False
+    if db.session.query(CoverJob.id).filter_by(book_id=book.id).first():
+        db.session.commit()
+        return False
+
+    # Concurrent requests for the same cover queue it once
+    result = db.session.execute(
+        sqlite_insert(CoverJob.__table__)
+        .values(book_id=book.id, kind=CoverJob.IMAGE)
+        .on_conflict_do_nothing(index_elements=['book_id'])
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+
+def notify_cover_workers() -> None:
+    """
+    Wake the background cover workers after new jobs were committed.
+    """
+    worker = current_app.extensions.get('cover_worker')
+    if worker:
+        worker.notify()
+
+
+def process_next_cover_job() -> bool:
+    """
+    Claim and resolve the oldest available cover job.
+    :return: True if a job was processed, False if the queue is empty
+    """
+    job_id = _claim_next_job()
+    if job_id is None:
+        return False
+
+    job = db.session.get(CoverJob, job_id)
+    book = db.session.get(Book, job.book_id)
+
+    if not book:
+        db.session.delete(job)
+        db.session.commit()
+        return True
+
+    isbn, title, claimed_at = book.isbn, book.title, job.claimed_at
+    kind = job.kind
+    db.session.commit()
+
+    if kind == CoverJob.IMAGE:
+        _download_cover_image(job_id, book.id, claimed_at)
+        return True
+
+    try:
+        cover_url = get_book_cover_url(isbn, title)
+
+        # An edit during the lookup requeues the job for the new ISBN, so the result is stale
+        if not _release_claim(job_id, claimed_at):
+            db.session.rollback()
+            return True
+
+        if book.cover_url_cached != cover_url:
+            book.cover_image_hash = None
+        book.cover_url_cached = cover_url
+        book.cover_status = (CoverStatus.FAILED if cover_url == AppConstants.DEFAULT_COVER_URL
+                             else CoverStatus.RESOLVED)
+        Book.bump_revisions([book.id])
+        CatalogRevision.bump()
+        db.session.commit()
+
+    except CircuitOpenError as e:
+        # The provider was not even asked, so the lookup does not use up an attempt
+        db.session.rollback()
+        _retry_or_fail(job_id, claimed_at, str(e), count_attempt=False)
+        return True
+    except Exception as e:
+        db.session.rollback()
+        _retry_or_fail(job_id, claimed_at, str(e))
+        return True
+
+    if current_app.config.get('COVER_IMAGE_PREFETCH') and cover_url != AppConstants.DEFAULT_COVER_URL:
+        cache_cover_image_safely(book.id)
+
+    return True
+
+
+def _download_cover_image(job_id: int, book_id: int, claimed_at: datetime) -> None:
+    """
+    Run a claimed image job: download the book's cover for the cover proxy.
+    :param job_id: Cover job ID
+    :param book_id: Book ID
+    :param claimed_at: Claim time read when the job was claimed
+    """
+    try:
+        cache_book_cover_image(book_id)
+    except CircuitOpenError as e:
+        db.session.rollback()
+        _retry_or_fail(job_id, claimed_at, str(e), count_attempt=False)
+        return
+    except (requests.RequestException, ValueError, OSError, SQLAlchemyError) as e:
+        db.session.rollback()
+        _retry_or_fail(job_id, claimed_at, str(e))
+        return
+
+    _release_claim(job_id, claimed_at)
+    db.session.commit()
+
+
+def requeue_stale_jobs() -> int:
+    """
+    Return jobs left running by a crashed worker to the queue.
+    :return: Number of requeued jobs
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=current_app.config['COVER_JOB_STALE_SECONDS'])
+    result = db.session.execute(
+        update(CoverJob)
+        .where(CoverJob.status == CoverJob.RUNNING, CoverJob.claimed_at < cutoff)
+        .values(status=CoverJob.QUEUED, claimed_at=None)
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def _claim_next_job() -> Optional[int]:
+    """
+    Atomically mark the oldest available job as running.
+    The conditional UPDATE lets several workers and processes share one queue.
+    :return: Claimed job ID or None if no job is available
+    """
+    while True:
+        job_id = db.session.query(CoverJob.id).filter(
+            CoverJob.status == CoverJob.QUEUED,
+            CoverJob.available_at <= datetime.utcnow()
+        ).order_by(CoverJob.id).limit(1).scalar()
+
+        if job_id is None:
+            db.session.commit()
+            return None
+
+        result = db.session.execute(
+            update(CoverJob)
+            .where(CoverJob.id == job_id, CoverJob.status == CoverJob.QUEUED)
+            .values(status=CoverJob.RUNNING, attempts=CoverJob.attempts + 1,
+                    claimed_at=datetime.utcnow())
+        )
+        db.session.commit()
+
+        if result.rowcount == 1:
+            return job_id
+
+
+def _release_claim(job_id: int, claimed_at: datetime) -> bool:
+    """
+    Delete a finished job inside the caller's transaction if it still holds the worker's claim.
+    :param job_id: Cover job ID
+    :param claimed_at: Claim time read when the job was claimed
+    :return: False if the job was requeued, reclaimed or deleted in the meantime
+    """
+    result = db.session.execute(
+        delete(CoverJob)
+        .where(CoverJob.id == job_id, CoverJob.status == CoverJob.RUNNING, CoverJob.claimed_at == claimed_at)
+        .execution_options(synchronize_session='fetch')
+    )
+    return result.rowcount == 1
+
+
+def _retry_or_fail(job_id: int, claimed_at: datetime, error: str, count_attempt: bool = True) -> None:
+    """
+    Schedule a failed job for another attempt or give up on it.
+    :param job_id: Cover job ID
+    :param claimed_at: Claim time read when the job was claimed
+    :param error: Error description
+    :param count_attempt: False to hand back the claim's attempt and retry once the circuit may close
+    """
+    job = db.session.get(CoverJob, job_id)
+    if not job or job.status != CoverJob.RUNNING or job.claimed_at != claimed_at:
+        # Requeued by an edit or claimed by another worker, which now owns the job
+        db.session.commit()
+        return
+
+    if not count_attempt:
+        job.status = CoverJob.QUEUED
+        job.attempts -= 1
+        job.last_error = error[:500]
+        job.available_at = datetime.utcnow() + timedelta(
+            seconds=current_app.config['COVER_BREAKER_RESET_TIMEOUT']
+        )
+    elif job.attempts >= current_app.config['COVER_JOB_MAX_ATTEMPTS'] and job.kind == CoverJob.IMAGE:
+        # The row records the failed download, so views do not queue it again until it
+        # is retried after the negative cache TTL; the book keeps its provider URL
+        job.status = CoverJob.QUEUED
+        job.last_error = error[:500]
+        job.available_at = datetime.utcnow() + timedelta(
+            seconds=current_app.config['COVER_CACHE_NEGATIVE_TTL']
+        )
+    elif job.attempts >= current_app.config['COVER_JOB_MAX_ATTEMPTS']:
+        book = db.session.get(Book, job.book_id)
+        if book:
+            book.cover_status = CoverStatus.FAILED
+            Book.bump_revisions([book.id])
+            CatalogRevision.bump()
+        db.session.delete(job)
+    else:
+        job.status = CoverJob.QUEUED
+        job.last_error = error[:500]
+        job.available_at = datetime.utcnow() + timedelta(
+            seconds=current_app.config['COVER_JOB_RETRY_DELAY'] * job.attempts
+        )
+
+    db.session.commit()
+
+
+class CoverJobWorker:
+    """Pool of daemon threads that drain the cover job queue in the background."""
+
+    def __init__(self, app: Flask, workers: int, poll_interval: float):
+        self.app = app
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        """
+        Requeue stale jobs and start the worker threads.
+        """
+        with self.app.app_context():
+            try:
+                requeue_stale_jobs()
+            except SQLAlchemyError:
+                logger.exception("Could not requeue stale cover jobs")
+
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"cover-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def notify(self) -> None:
+        """
+        Wake idle workers so new jobs are picked up immediately.
+        """
+        self._wakeup.set()
+
+    def stop(self, timeout: float = None) -> None:
+        """
+        Ask the worker threads to exit and wait for them.
+        :param timeout: Seconds to wait for each thread
+        """
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _run(self) -> None:
+        """
+        Worker loop: process jobs until the queue is empty, then sleep until notified.
+        """
+        while not self._stopping.is_set():
+            self._wakeup.clear()
+
+            with self.app.app_context():
+                try:
+                    while not self._stopping.is_set() and process_next_cover_job():
+                        pass
+                except SQLAlchemyError:
+                    db.session.rollback()
+                    logger.exception("Cover worker failed to process a job")
+
+            self._wakeup.wait(self.poll_interval)
+
+
+def start_cover_workers(app: Flask) -> Optional[CoverJobWorker]:
+    """
+    Start the background cover workers configured for the application.
+    :param app: Flask application instance
+    :return: Running worker pool or None if disabled
+    """
+    workers = app.config.get('COVER_WORKERS', 0)
+    if workers <= 0:
+        return None
+
+    worker = CoverJobWorker(app, workers, app.config['COVER_WORKER_POLL_INTERVAL'])
+    app.extensions['cover_worker'] = worker
+    worker.start()
+    return worker
@@ -4,16 +4,23 @@ from typing import Optional
 import requests
 from sqlalchemy.exc import SQLAlchemyError
 
-from constants import AppConstants
-from models.models import Book, db
+from constants import AppConstants, CoverStatus
+from models.models import Book, CatalogRevision, db
+from services.cover_cache import cached_cover_lookup, isbn_cache_key, title_cache_key
+from services.http_client import CircuitOpenError, get_provider_client
+from utils.instrumentation import cover_api_call
 
+GOOGLE_BOOKS_PROVIDER = 'google_books'
 
-def get_book_cover_url(isbn: str, title: str = None) -> str:
+
+def get_book_cover_url(isbn: str, title: str = None, bypass_cache: bool = False) -> str:
     """
     Get book cover URL using Google Books API.
     :param isbn: Book ISBN (can contain hyphens)
     :param title: Book title (used as fallback search)
+    :param bypass_cache: Query the API even if a cached result exists
     :return: Cover URL from Google Books or placeholder
+    :raises requests.RequestException: If the provider could not be reached
     """
     api_key = os.environ.get('GOOGLE_BOOKS_API_KEY')
     if not api_key:
@@ -23,36 +30,80 @@ def get_book_cover_url(isbn: str, title: str = None) -> str:
 
     if clean_isbn and len(clean_isbn) in [AppConstants.ISBN_10_LENGTH,
                                           AppConstants.ISBN_13_LENGTH]:
-        cover_url = get_google_books_cover(clean_isbn)
+        cover_url = get_google_books_cover(clean_isbn, bypass_cache)
         if cover_url:
             return cover_url
 
     if title:
-        cover_url = get_google_books_cover_by_title(title)
+        cover_url = get_google_books_cover_by_title(title, bypass_cache)
         if cover_url:
             return cover_url
 
     return AppConstants.DEFAULT_COVER_URL
 
 
-def get_google_books_cover(isbn: str) -> Optional[str]:
+def get_google_books_cover(isbn: str, bypass_cache: bool = False) -> Optional[str]:
     """
     Get book cover from Google Books API using ISBN.
     :param isbn: Clean ISBN (digits only)
+    :param bypass_cache: Query the API even if a cached result exists
+    :return: Cover URL or None if not found
+    :raises requests.RequestException: If the provider could not be reached
+    """
+    try:
+        return cached_cover_lookup(
+            isbn_cache_key(isbn),
+            lambda: _query_google_books(f'isbn:{isbn}'),
+            bypass_cache
+        )
+    except (ValueError, KeyError):
+        return None
+
+
+def get_google_books_cover_by_title(title: str, bypass_cache: bool = False) -> Optional[str]:
+    """
+    Get book cover from Google Books API using title search.
+    :param title: Book title
+    :param bypass_cache: Query the API even if a cached result exists
     :return: Cover URL or None if not found
+    :raises requests.RequestException: If the provider could not be reached
     """
     try:
-        params = {
-            'q': f'isbn:{isbn}',
-            'key': os.environ.get('GOOGLE_BOOKS_API_KEY'),
-            'maxResults': AppConstants.API_MAX_RESULTS
-        }
-
-        response = requests.get(AppConstants.GOOGLE_BOOKS_API_URL, params=params,
-                                timeout=AppConstants.API_REQUEST_TIMEOUT)
+        return cached_cover_lookup(
+            title_cache_key(title),
+            lambda: _query_google_books(f'intitle:"{title}"'),
+            bypass_cache
+        )
+    except (ValueError, KeyError):
+        return None
+
+
+def _query_google_books(query: str) -> Optional[str]:
+    """
+    Run a Google Books volume search and pick the largest available cover image.
+    :param query: Google Books search query
+    :return: Cover URL or None if the API has no cover for the query
+    :raises requests.RequestException: If the request fails or the provider circuit is open
+    :raises ValueError: If the response is not valid JSON
+    """
+    params = {
+        'q': query,
+        'key': os.environ.get('GOOGLE_BOOKS_API_KEY'),
+        'maxResults': AppConstants.API_MAX_RESULTS
+    }
+
+    with cover_api_call() as call:
+        try:
+            response = get_provider_client(GOOGLE_BOOKS_PROVIDER).get(
+                AppConstants.GOOGLE_BOOKS_API_URL, params=params, timeout=AppConstants.API_REQUEST_TIMEOUT
+            )
+        except CircuitOpenError:
+            call.outcome = 'circuit_open'
+            raise
         response.raise_for_status()
 
         data = response.json()
+        call.outcome = 'not_found'
 
         if data.get('totalItems', 0) > 0:
             book = data['items'][0]
@@ -64,69 +115,39 @@ def get_google_books_cover(isbn: str) -> Optional[str]:
                     cover_url = image_links[size]
                     if cover_url.startswith('http://'):
                         cover_url = cover_url.replace('http://', 'https://')
+                    call.outcome = 'found'
                     return cover_url
 
-        return None
-
-    except (requests.RequestException, ValueError, KeyError):
-        return None
+    return None
 
 
-def refresh_book_cover(book_id: int) -> Optional[str]:
+def refresh_book_cover(book_id: int, bypass_cache: bool = False) -> Optional[str]:
     """
     Refresh a book's cover by fetching it again and updating the database.
     :param book_id: Book ID
+    :param bypass_cache: Query the API even if a cached result exists
     :return: New cover URL or None if book not found
+    :raises requests.RequestException: If the provider could not be reached
     """
     try:
-        from models.models import Book, db
-
         book = Book.query.get(book_id)
         if not book:
             return None
 
-        new_cover_url = get_book_cover_url(book.isbn, book.title)
+        new_cover_url = get_book_cover_url(book.isbn, book.title, bypass_cache)
+        if book.cover_url_cached != new_cover_url:
+            book.cover_image_hash = None
         book.cover_url_cached = new_cover_url
+        book.cover_status = (CoverStatus.FAILED if new_cover_url == AppConstants.DEFAULT_COVER_URL
+                             else CoverStatus.RESOLVED)
+        Book.bump_revisions([book.id])
+        CatalogRevision.bump()
         db.session.commit()
 
         return new_cover_url
 
+    except requests.RequestException:
+        db.session.rollback()
+        raise
     except Exception:
         return None
-
-
-def get_google_books_cover_by_title(title: str) -> Optional[str]:
-    """
-    Get book cover from Google Books API using title search.
-    :param title: Book title
-    :return: Cover URL or None if not found
-    """
-    try:
-        params = {
-            'q': f'intitle:"{title}"',
-            'key': os.environ.get('GOOGLE_BOOKS_API_KEY'),
-            'maxResults': AppConstants.API_MAX_RESULTS
-        }
-
-        response = requests.get(AppConstants.GOOGLE_BOOKS_API_URL, params=params,
-                                timeout=AppConstants.API_REQUEST_TIMEOUT)
-        response.raise_for_status()
-
-        data = response.json()
-
-        if data.get('totalItems', 0) > 0:
-            book = data['items'][0]
-            volume_info = book.get('volumeInfo', {})
-            image_links = volume_info.get('imageLinks', {})
-
-            for size in ['large', 'medium', 'thumbnail']:
-                if size in image_links:
-                    cover_url = image_links[size]
-                    if cover_url.startswith('http://'):
-                        cover_url = cover_url.replace('http://', 'https://')
-                    return cover_url
-
-        return None
-
-    except (requests.RequestException, ValueError, KeyError):
-        return None
\ No newline at end of file
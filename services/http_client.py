@@ -0,0 +1,235 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+import requests
+from flask import current_app
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class CircuitOpenError(requests.RequestException):
+    """Raised instead of calling a provider whose circuit breaker is open."""
+    pass
+
+
+class CircuitBreaker:
+    """Thread-safe circuit breaker that stops calls to an unhealthy upstream."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """
+        Check whether a call may go out. After reset_timeout one trial call is let through.
+        :return: True if the call is allowed
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return True
+
+            return False
+
+    def record_success(self) -> None:
+        """
+        Close the circuit after a healthy response.
+        """
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+
+    def record_failure(self) -> None:
+        """
+        Count a failed call and open the circuit once the threshold is reached.
+        """
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+class RateLimiter:
+    """Thread-safe token bucket limiting calls to a number per second."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self._tokens = float(self.capacity)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """
+        Block until a call is allowed.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+
+                wait = (1 - self._tokens) / self.rate
+
+            time.sleep(wait)
+
+
+class ProviderClient:
+    """Pooled keep-alive HTTP client for one upstream provider with retries and a circuit breaker."""
+
+    def __init__(self, name: str, pool_size: int, retries: int, backoff: float,
+                 backoff_max: float, breaker: CircuitBreaker):
+        self.name = name
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.breaker = breaker
+        # Rate limits apply to the calling thread only, see rate_limited
+        self._local = threading.local()
+
+        # urllib3's connection pool is thread-safe and the session keeps no
+        # per-request state here, so one session is shared by all threads.
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=False)
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def get(self, url: str, params: Optional[dict] = None, timeout: float = None,
+            stream: bool = False) -> requests.Response:
+        """
+        Send a GET request, retrying connection errors, timeouts, 429 and 5xx responses.
+        :param url: Request URL
+        :param params: Query parameters
+        :param timeout: Timeout per attempt in seconds
+        :param stream: Leave the body unread, the caller must close the response
+        :return: Final response
+        :raises CircuitOpenError: If the provider is currently considered unhealthy
+        :raises requests.RequestException: If every attempt failed
+        """
+        if not self.breaker.allow_request():
+            raise CircuitOpenError(f"Circuit open for provider '{self.name}'")
+
+        healthy = False
+        try:
+            for attempt in range(self.retries + 1):
+                retry_after = None
+
+                rate_limiter = getattr(self._local, 'rate_limiter', None)
+                if rate_limiter:
+                    rate_limiter.acquire()
+
+                try:
+                    response = self.session.get(url, params=params, timeout=timeout, stream=stream)
+                except (requests.ConnectionError, requests.Timeout):
+                    if attempt >= self.retries:
+                        raise
+                else:
+                    if response.status_code not in RETRY_STATUSES:
+                        healthy = True
+                        return response
+
+                    if attempt >= self.retries:
+                        return response
+
+                    retry_after = response.headers.get('Retry-After')
+                    response.close()
+
+                time.sleep(self._backoff_delay(attempt, retry_after))
+        finally:
+            # Every other outcome, including exceptions such as ChunkedEncodingError or
+            # TooManyRedirects, is a failure, so a half-open trial can never leave the
+            # circuit stuck without a recorded result
+            if healthy:
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+
+    @contextmanager
+    def rate_limited(self, rate_limiter: RateLimiter) -> Iterator[None]:
+        """
+        Throttle the calls the current thread makes inside the block, e.g. a bulk job's
+        lookups, while other threads such as the cover workers keep their own pace.
+        :param rate_limiter: Rate limiter shared by the threads of the job
+        :return: Context manager
+        """
+        previous = getattr(self._local, 'rate_limiter', None)
+        self._local.rate_limiter = rate_limiter
+        try:
+            yield
+        finally:
+            self._local.rate_limiter = previous
+
+    def _backoff_delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """
+        Compute the wait before the next attempt using exponential backoff with full jitter.
+        :param attempt: Zero-based number of the failed attempt
+        :param retry_after: Retry-After header value, if the server sent one
+        :return: Delay in seconds
+        """
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.backoff_max)
+
+        return random.uniform(0, min(self.backoff_max, self.backoff * (2 ** attempt)))
+
+
+_clients: Dict[str, ProviderClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_provider_client(name: str) -> ProviderClient:
+    """
+    Get the shared client for a provider, creating it from the app config on first use.
+    :param name: Provider name, e.g. 'google_books'
+    :return: Provider client
+    """
+    client = _clients.get(name)
+    if client is not None:
+        return client
+
+    with _clients_lock:
+        client = _clients.get(name)
+        if client is None:
+            config = current_app.config
+            breaker = CircuitBreaker(config['COVER_BREAKER_FAILURE_THRESHOLD'],
+                                     config['COVER_BREAKER_RESET_TIMEOUT'])
+            client = ProviderClient(
+                name,
+                pool_size=config['COVER_HTTP_POOL_SIZE'],
+                retries=config['COVER_HTTP_RETRIES'],
+                backoff=config['COVER_HTTP_BACKOFF'],
+                backoff_max=config['COVER_HTTP_BACKOFF_MAX'],
+                breaker=breaker
+            )
+            _clients[name] = client
+
+    return client
+
+
+def reset_provider_clients() -> None:
+    """
+    Close and forget all provider clients, e.g. after configuration changes.
+    """
+    with _clients_lock:
+        for client in _clients.values():
+            client.session.close()
+        _clients.clear()
@@ -0,0 +1,301 @@
+import csv
+import json
+import os
+from collections import defaultdict
+from typing import Any, Dict, IO, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import bindparam, func, insert, select
+from sqlalchemy.exc import SQLAlchemyError
+
+from constants import CoverStatus
+from models.models import Author, Book, CatalogRevision, CoverJob, db
+from services.services import ServiceError
+from utils.validators import AuthorValidator, BookValidator, ValidationError, validate_author_data
+
+IMPORT_FORMATS = ('csv', 'jsonl')
+MAX_REPORTED_ERRORS = 100
+
+_SQL_IN_CHUNK = 500
+
+
+def iter_csv_rows(stream: IO[str]) -> Iterator[Dict[str, Any]]:
+    """
+    Read catalog rows from a CSV text stream with a header line.
+    :param stream: Text stream
+    :return: Iterator of row dictionaries
+    """
+    return csv.DictReader(stream)
+
+
+def iter_jsonl_rows(stream: IO[str]) -> Iterator[Dict[str, Any]]:
+    """
+    Read catalog rows from a JSON Lines text stream, one object per line.
+    Malformed lines are returned as rows with an '_error' key.
+    :param stream: Text stream
+    :return: Iterator of row dictionaries
+    """
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield {'_error': "Invalid JSON"}
+            continue
+
+        if not isinstance(row, dict):
+            yield {'_error': "Expected a JSON object"}
+            continue
+
+        yield {key: str(value) if value is not None else None for key, value in row.items()}
+
+
+def guess_import_format(filename: str) -> str:
+    """
+    Derive the import format from a file name, defaulting to CSV.
+    :param filename: File name
+    :return: 'csv' or 'jsonl'
+    """
+    extension = os.path.splitext(filename or '')[1].lower()
+    return 'jsonl' if extension in ('.jsonl', '.ndjson') else 'csv'
+
+
+def iter_import_rows(stream: IO[str], import_format: str) -> Iterator[Dict[str, Any]]:
+    """
+    Read catalog rows in the given format.
+    :param stream: Text stream
+    :param import_format: 'csv' or 'jsonl'
+    :return: Iterator of row dictionaries
+    :raises ValidationError: If the format is not supported
+    """
+    if import_format == 'csv':
+        return iter_csv_rows(stream)
+    elif import_format == 'jsonl':
+        return iter_jsonl_rows(stream)
+    raise ValidationError(f"Unsupported import format '{import_format}'. Use csv or jsonl.")
+
+
+class CatalogImporter:
+    """
+    Streams catalog rows into the database in batched executemany transactions.
+
+    Each row describes one book and its author by name. Rows go through the same
+    validation as the add forms. ISBNs and author names are deduplicated against
+    sets preloaded from the database. Cover lookups are deferred: with enqueue_covers
+    books are stored as 'pending' with a job for the workers, otherwise without a
+    cover status, like books added before the job queue, for 'flask covers backfill'.
+
+    Expected columns: title, isbn, publication_year, rating, author,
+    author_birthdate, author_date_of_death.
+    """
+
+    def __init__(self, batch_size: int = 1000, enqueue_covers: bool = False):
+        self.batch_size = batch_size
+        self.enqueue_covers = enqueue_covers
+        self.stats = {
+            'imported_books': 0,
+            'created_authors': 0,
+            'skipped_duplicates': 0,
+            'failed_rows': 0,
+            'errors': []
+        }
+        self._known_isbns = set()
+        self._author_ids: Dict[str, int] = {}
+        self._pending_books: List[Tuple[str, Dict[str, Any]]] = []
+        self._pending_authors: Dict[str, Dict[str, Any]] = {}
+
+    def run(self, rows: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Import all rows and return the import statistics.
+        :param rows: Iterable of row dictionaries
+        :return: Dictionary with counts and the first error messages
+        :raises ServiceError: If a batch cannot be written
+        """
+        self._preload()
+
+        for line_number, row in enumerate(rows, start=1):
+            try:
+                self._add_row(row)
+            except ValidationError as e:
+                self._record_error(line_number, str(e))
+
+            if len(self._pending_books) >= self.batch_size:
+                self._flush()
+
+        self._flush()
+        return self.stats
+
+    def _preload(self) -> None:
+        """
+        Load existing ISBNs and author names so duplicates are detected without queries.
+        """
+        self._known_isbns = set(
+            db.session.execute(select(Book.isbn).where(Book.isbn.is_not(None))).scalars()
+        )
+        self._author_ids = {
+            name: author_id
+            for author_id, name in db.session.execute(select(Author.id, Author.name))
+        }
+
+    def _add_row(self, row: Dict[str, Any]) -> None:
+        """
+        Validate a row and buffer its book and, if new, its author.
+        :param row: Row dictionary
+        :raises ValidationError: If the row is invalid
+        """
+        if row.get('_error'):
+            raise ValidationError(row['_error'])
+
+        author_name = AuthorValidator.validate_name(row.get('author') or row.get('author_name') or '')
+
+        new_author = None
+        if author_name not in self._author_ids and author_name not in self._pending_authors:
+            new_author = validate_author_data({
+                'name': author_name,
+                'birthdate': row.get('author_birthdate'),
+                'date_of_death': row.get('author_date_of_death')
+            })
+
+        # Books reference their author by name until the batch is written, as
+        # authors created by the import have no ID before that
+        book_data = {
+            'title': BookValidator.validate_title(row.get('title') or ''),
+            'isbn': BookValidator.validate_isbn(row.get('isbn')),
+            'publication_year': BookValidator.validate_publication_year(row.get('publication_year')),
+            'rating': BookValidator.validate_rating(row.get('rating'))
+        }
+
+        if book_data['isbn']:
+            if book_data['isbn'] in self._known_isbns:
+                self.stats['skipped_duplicates'] += 1
+                return
+            self._known_isbns.add(book_data['isbn'])
+
+        if new_author:
+            self._pending_authors[author_name] = new_author
+        self._pending_books.append((author_name, book_data))
+
+    def _flush(self) -> None:
+        """
+        Write the buffered authors, books and author aggregates in one transaction.
+        """
+        if not self._pending_books:
+            self._pending_authors.clear()
+            return
+
+        try:
+            created_authors = self._insert_authors()
+            book_ids = self._insert_books()
+
+            if self.enqueue_covers and book_ids:
+                db.session.execute(insert(CoverJob.__table__), [{'book_id': book_id} for book_id in book_ids])
+
+            self._update_author_stats()
+            CatalogRevision.bump_labels()
+            db.session.commit()
+
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            raise ServiceError(f"Error importing catalog: {str(e)}")
+
+        self.stats['created_authors'] += created_authors
+        self.stats['imported_books'] += len(self._pending_books)
+        self._pending_books = []
+
+    def _insert_authors(self) -> int:
+        """
+        Insert the authors first seen in this batch and learn their IDs.
+        :return: Number of created authors
+        """
+        new_authors = [data for name, data in self._pending_authors.items()
+                       if name not in self._author_ids]
+        self._pending_authors.clear()
+
+        if not new_authors:
+            return 0
+
+        db.session.execute(insert(Author.__table__), new_authors)
+
+        names = [author['name'] for author in new_authors]
+        for start in range(0, len(names), _SQL_IN_CHUNK):
+            chunk = names[start:start + _SQL_IN_CHUNK]
+            for author_id, name in db.session.execute(
+                    select(Author.id, Author.name).where(Author.name.in_(chunk))):
+                self._author_ids[name] = author_id
+
+        return len(new_authors)
+
+    def _insert_books(self) -> Optional[List[int]]:
+        """
+        Insert the buffered books with their authors resolved.
+        :return: IDs of the inserted books when cover jobs are enqueued, otherwise None
+        """
+        cover_status = CoverStatus.PENDING if self.enqueue_covers else None
+        rows = [dict(book_data, author_id=self._author_ids[author_name], cover_status=cover_status)
+                for author_name, book_data in self._pending_books]
+
+        # Core inserts keep one executemany per batch; ORM bulk inserts would
+        # split the batch whenever a row leaves a different column empty.
+        books = Book.__table__
+        if not self.enqueue_covers:
+            db.session.execute(insert(books), rows)
+            return None
+
+        # SQLite rejects this transaction if another writer commits between reading the
+        # highest ID and inserting, so the IDs above it are this batch's. Unlike
+        # RETURNING this works before SQLite 3.35.
+        last_id = db.session.execute(select(func.max(books.c.id))).scalar() or 0
+        db.session.execute(insert(books), rows)
+        return list(db.session.execute(
+            select(books.c.id).where(books.c.id > last_id).order_by(books.c.id)
+        ).scalars())
+
+    def _update_author_stats(self) -> None:
+        """
+        Add the batch's book counts and ratings to the stored author aggregates.
+        """
+        deltas = defaultdict(lambda: {'books': 0, 'rated': 0, 'rating': 0.0})
+        for author_name, book_data in self._pending_books:
+            delta = deltas[self._author_ids[author_name]]
+            delta['books'] += 1
+            if book_data['rating'] is not None:
+                delta['rated'] += 1
+                delta['rating'] += book_data['rating']
+
+        authors = Author.__table__
+        statement = authors.update().where(authors.c.id == bindparam('author_id')).values(
+            book_count=authors.c.book_count + bindparam('books'),
+            rated_count=authors.c.rated_count + bindparam('rated'),
+            rating_sum=authors.c.rating_sum + bindparam('rating'),
+            revision=authors.c.revision + 1
+        )
+        db.session.execute(statement, [dict(delta, author_id=author_id)
+                                       for author_id, delta in deltas.items()])
+
+    def _record_error(self, line_number: int, message: str) -> None:
+        """
+        Count a rejected row and keep its message if the report is not full yet.
+        :param line_number: 1-based row number in the input
+        :param message: Validation error message
+        """
+        self.stats['failed_rows'] += 1
+        if len(self.stats['errors']) < MAX_REPORTED_ERRORS:
+            self.stats['errors'].append(f"Row {line_number}: {message}")
+
+
+def import_catalog(stream: IO[str], import_format: str, batch_size: int = 1000,
+                   enqueue_covers: bool = False) -> Dict[str, Any]:
+    """
+    Import books and authors from a CSV or JSONL text stream.
+    :param stream: Text stream
+    :param import_format: 'csv' or 'jsonl'
+    :param batch_size: Books per transaction
+    :param enqueue_covers: Queue a cover job for every imported book
+    :return: Import statistics
+    :raises ValidationError: If the format is not supported
+    :raises ServiceError: If a batch cannot be written
+    """
+    rows = iter_import_rows(stream, import_format)
+    return CatalogImporter(batch_size, enqueue_covers).run(rows)
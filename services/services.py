@@ -1,9 +1,16 @@
-from typing import Any, Dict, List, Optional
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
+from sqlalchemy import Row, select, update
 from sqlalchemy.exc import SQLAlchemyError
 
-from models.models import Author, Book, db
-from services.cover_service import get_book_cover_url
+from constants import AppConstants, ValidationMessages
+from models.models import Author, Book, CatalogRevision, build_cover_url, db
+from models.projection import Projection
+from models.search_index import find_highlights
+from services.cover_jobs import enqueue_cover_job, notify_cover_workers
+from services.suggest_index import AUTHOR, get_suggest_index, record_suggest_changes, suggest
+from utils.helpers import decode_cursor, encode_cursor
 from utils.validators import ValidationError, validate_author_data, validate_book_data
 
 
@@ -23,6 +30,171 @@ class BookService:
         except SQLAlchemyError as e:
             raise ServiceError(f"Error retrieving books: {str(e)}")
 
+    @staticmethod
+    def iter_books(projection: Projection, search_query: str = '', sort_by: str = 'title',
+                   batch_size: int = AppConstants.EXPORT_BATCH_SIZE, fuzzy: bool = False) -> Iterator[Row]:
+        """
+        Iterate over all matching books as rows for projection.build, fetching them in batches.
+        :param projection: Book projection from get_book_projection
+        :param search_query: Search term
+        :param sort_by: Sort field ('title', 'author', 'year', 'relevance')
+        :param batch_size: Number of rows loaded per batch
+        :param fuzzy: Also match books with words similar to the search term
+        :return: Iterator of book rows
+        :raises ServiceError: If database operation fails
+        """
+        try:
+            query = Book.search_rows(projection, search_query, sort_by, fuzzy=fuzzy)
+            yield from query.yield_per(batch_size)
+        except SQLAlchemyError as e:
+            raise ServiceError(f"Error retrieving books: {str(e)}")
+
+    @staticmethod
+    def get_books_page(search_query: str = '', sort_by: str = 'title', cursor: Optional[str] = None,
+                       per_page: int = AppConstants.DEFAULT_BOOKS_PER_PAGE, fuzzy: bool = False) -> Dict[str, Any]:
+        """
+        Get one page of books using keyset pagination on the sort column and ID.
+        :param search_query: Search term
+        :param sort_by: Sort field ('title', 'author', 'year', 'relevance')
+        :param cursor: Opaque cursor returned with the previous page
+        :param per_page: Maximum number of books on the page
+        :param fuzzy: Also match books with words similar to the search term
+        :return: Dictionary with the page of books and the next cursor
+        :raises ValidationError: If the cursor is invalid for this sort
+        :raises ServiceError: If database operation fails
+        """
+        sort_by = Book.resolve_sort(sort_by, search_query)
+        after = BookService._decode_page_cursor(cursor, sort_by)
+
+        try:
+            query = Book.search(search_query, sort_by, after=after, fuzzy=fuzzy, limit=per_page + 1)
+            if sort_by == 'relevance':
+                # The score is not a book attribute, so it is selected next to each book
+                rows = query.add_columns(*Book.sort_columns(sort_by)).limit(per_page + 1).all()
+                books = [row[0] for row in rows]
+                sort_keys = [list(row[1:]) for row in rows]
+            else:
+                books = query.limit(per_page + 1).all()
+                sort_keys = None
+        except SQLAlchemyError as e:
+            raise ServiceError(f"Error retrieving books: {str(e)}")
+
+        next_cursor = None
+        if len(books) > per_page:
+            books = books[:per_page]
+            last_key = sort_keys[per_page - 1] if sort_keys else books[-1].sort_key(sort_by)
+            next_cursor = encode_cursor([sort_by] + last_key)
+
+        return {
+            'books': books,
+            'next_cursor': next_cursor
+        }
+
+    @staticmethod
+    def get_book_dicts_page(projection: Projection, search_query: str = '', sort_by: str = 'title',
+                            cursor: Optional[str] = None,
+                            per_page: int = AppConstants.DEFAULT_BOOKS_PER_PAGE,
+                            fuzzy: bool = False, highlights: bool = True) -> Dict[str, Any]:
+        """
+        Get one page of books like get_books_page, as dictionaries of the projected fields.
+        Selects plain rows in one query instead of loading Book and Author instances.
+        When searching with highlights, every book gets highlights: its title and author name
+        as HTML with the matching parts in <mark> elements, or None if the index has no match.
+        :param projection: Book projection from get_book_projection
+        :param search_query: Search term
+        :param sort_by: Sort field ('title', 'author', 'year', 'relevance')
+        :param cursor: Opaque cursor returned with the previous page
+        :param per_page: Maximum number of books on the page
+        :param fuzzy: Also match books with words similar to the search term
+        :param highlights: Add the highlights key to search results
+        :return: Dictionary with the page of book dictionaries and the next cursor
+        :raises ValidationError: If the cursor is invalid for this sort
+        :raises ServiceError: If database operation fails
+        """
+        sort_by = Book.resolve_sort(sort_by, search_query)
+        after = BookService._decode_page_cursor(cursor, sort_by)
+
+        try:
+            rows = Book.search_rows(projection, search_query, sort_by, after=after,
+                                    fuzzy=fuzzy, limit=per_page + 1).limit(per_page + 1).all()
+
+            matches = None
+            if highlights and search_query.strip():
+                # The book ID is always the first column of a projection
+                matches = find_highlights(db.session, search_query, [row[0] for row in rows[:per_page]], fuzzy)
+        except SQLAlchemyError as e:
+            raise ServiceError(f"Error retrieving books: {str(e)}")
+
+        next_cursor = None
+        if len(rows) > per_page:
+            rows = rows[:per_page]
+            # The sort_columns follow the projection at the end of each row
+            next_cursor = encode_cursor([sort_by] + list(rows[-1][projection.width:]))
+
+        books = [projection.build(row) for row in rows]
+        if matches is not None:
+            for book, row in zip(books, rows):
+                book['highlights'] = matches.get(row[0])
+
+        return {
+            'books': books,
+            'next_cursor': next_cursor
+        }
+
+    @staticmethod
+    def get_book_projection(fields: Optional[List[str]] = None,
+                            embed: Optional[List[str]] = None) -> Projection:
+        """
+        Build the projection of a sparse fieldset request on the book API.
+        Without fields and embed the full to_dict representation is selected. Fields may
+        name book keys, 'author' for the whole author or 'author.<key>' for single author
+        keys; embed=['author'] adds the author, embed=[] leaves it out. 'highlights' is
+        accepted but selects no columns, see get_book_dicts_page.
+        :param fields: Requested field names or None for all
+        :param embed: Requested embedded resources or None for the default
+        :return: Book projection
+        :raises ValidationError: If an unknown field or embed is requested
+        """
+        _check_embed(embed, {'author'})
+
+        if fields is None:
+            book_fields, author_fields = None, None
+            embed_author = embed is None or 'author' in embed
+        else:
+            book_fields = [name for name in fields
+                           if name not in ('author', 'highlights') and not name.startswith('author.')]
+            author_fields = [name[len('author.'):] for name in fields if name.startswith('author.')]
+            embed_author = 'author' in fields or bool(author_fields) or 'author' in (embed or [])
+            _check_fields(book_fields, Book.API_FIELDS)
+            _check_fields(author_fields, Author.API_FIELDS)
+            if 'author' in fields or not author_fields:
+                author_fields = None
+
+        author = Author.api_projection(author_fields) if embed_author else None
+        return Book.api_projection(book_fields, author)
+
+    @staticmethod
+    def _decode_page_cursor(cursor: Optional[str], sort_by: str) -> Optional[List[Any]]:
+        """
+        Decode a page cursor into the sort key of the last book on the previous page.
+        :param cursor: Opaque cursor or None for the first page
+        :param sort_by: Sort field the cursor must have been created for
+        :return: Sort key values or None for the first page
+        :raises ValidationError: If the cursor is invalid for this sort
+        """
+        if not cursor:
+            return None
+
+        values = decode_cursor(cursor)
+        if not values or values[0] != sort_by or len(values) != Book.SORT_KEY_LENGTHS[sort_by] + 1:
+            raise ValidationError(ValidationMessages.INVALID_PAGE_CURSOR)
+
+        # The values are bound against the sort columns, so only scalars fit and the last one is a book ID
+        *keys, book_id = values[1:]
+        if not _is_cursor_id(book_id) or not all(_is_cursor_scalar(key) for key in keys):
+            raise ValidationError(ValidationMessages.INVALID_PAGE_CURSOR)
+        return values[1:]
+
     @staticmethod
     def get_book_by_id(book_id: int) -> Optional[Book]:
         """
@@ -35,10 +207,62 @@ class BookService:
         except SQLAlchemyError as e:
             raise ServiceError(f"Error retrieving book: {str(e)}")
 
+    @staticmethod
+    def get_covers(book_ids: List[int]) -> Dict[int, Dict[str, Optional[str]]]:
+        """
+        Get the cover URLs and lookup statuses of many books in one primary key lookup.
+        :param book_ids: Book IDs, at most MAX_COVER_BATCH_SIZE
+        :return: Dictionary of cover URL and cover status by book ID; unknown IDs are left out
+        :raises ValidationError: If too many IDs are requested
+        :raises ServiceError: If database operation fails
+        """
+        if len(book_ids) > AppConstants.MAX_COVER_BATCH_SIZE:
+            raise ValidationError(ValidationMessages.TOO_MANY_BOOK_IDS)
+
+        try:
+            rows = db.session.execute(
+                select(Book.id, Book.cover_url_cached, Book.cover_image_hash, Book.cover_status)
+                .where(Book.id.in_(book_ids))
+            ).all()
+        except SQLAlchemyError as e:
+            raise ServiceError(f"Error retrieving covers: {str(e)}")
+
+        return {
+            book_id: {
+                'cover_url': build_cover_url(book_id, cover_url_cached, cover_image_hash),
+                'cover_status': cover_status
+            }
+            for book_id, cover_url_cached, cover_image_hash, cover_status in rows
+        }
+
+    @staticmethod
+    def get_book_version(book_id: int) -> Optional[Tuple[str, Optional[datetime]]]:
+        """
+        Get a version tag and last change time for a book page without loading the book.
+        The tag combines the book and author revisions because the page shows both.
+        :param book_id: Book ID
+        :return: Tuple of version tag and last change time, or None if the book does not exist
+        """
+        try:
+            row = db.session.execute(
+                select(Book.revision, Book.updated_at, Author.revision, Author.updated_at)
+                .join(Author, Author.id == Book.author_id)
+                .where(Book.id == book_id)
+            ).first()
+        except SQLAlchemyError as e:
+            raise ServiceError(f"Error retrieving book: {str(e)}")
+
+        if row is None:
+            return None
+
+        book_revision, book_updated_at, author_revision, author_updated_at = row
+        changed = [value for value in (book_updated_at, author_updated_at) if value]
+        return f"book-{book_id}-{book_revision}.{author_revision}", max(changed, default=None)
+
     @staticmethod
     def create_book(form_data: Dict[str, Any]) -> Book:
         """
-        Create a new book with cover URL fetched directly.
+        Create a new book and queue its cover lookup for the background workers.
         :param form_data: Form data dictionary
         :return: Created book instance
         :raises ValidationError: If validation fails
@@ -56,19 +280,21 @@ class BookService:
                 if existing_book:
                     raise ValidationError("A book with this ISBN already exists")
 
-            cover_url = get_book_cover_url(validated_data['isbn'], validated_data['title'])
-
             book = Book(
                 title=validated_data['title'],
                 isbn=validated_data['isbn'],
                 publication_year=validated_data['publication_year'],
                 author_id=validated_data['author_id'],
-                rating=validated_data['rating'],
-                cover_url_cached=cover_url
+                rating=validated_data['rating']
             )
 
             db.session.add(book)
+            enqueue_cover_job(book)
+            BookService._adjust_author_stats(book.author_id, 1, None, book.rating)
+            revision = CatalogRevision.bump_labels()
             db.session.commit()
+            notify_cover_workers()
+            record_suggest_changes(revision, books={book.id: book.title})
 
             return book
 
@@ -84,7 +310,7 @@ class BookService:
     @staticmethod
     def update_book(book_id: int, form_data: Dict[str, Any]) -> Book:
         """
-        Update an existing book with new cover URL if ISBN changed.
+        Update an existing book and queue a new cover lookup if the ISBN changed.
         :param book_id: Book ID
         :param form_data: Form data dictionary
         :return: Updated book instance
@@ -108,18 +334,32 @@ class BookService:
                     raise ValidationError("A book with this ISBN already exists")
 
             isbn_changed = validated_data['isbn'] != book.isbn
+            old_author_id = book.author_id
+            old_rating = book.rating
 
             book.title = validated_data['title']
             book.isbn = validated_data['isbn']
             book.publication_year = validated_data['publication_year']
             book.author_id = validated_data['author_id']
             book.rating = validated_data['rating']
+            book.revision = Book.revision + 1
 
             if isbn_changed:
-                book.cover_url_cached = get_book_cover_url(book.isbn, book.title)
+                enqueue_cover_job(book)
+
+            if book.author_id != old_author_id:
+                BookService._adjust_author_stats(old_author_id, -1, old_rating, None)
+                BookService._adjust_author_stats(book.author_id, 1, None, book.rating)
+            else:
+                BookService._adjust_author_stats(book.author_id, 0, old_rating, book.rating)
 
+            revision = CatalogRevision.bump_labels()
             db.session.commit()
 
+            if isbn_changed:
+                notify_cover_workers()
+            record_suggest_changes(revision, books={book.id: book.title})
+
             return book
 
         except ValidationError:
@@ -149,7 +389,11 @@ class BookService:
             if not (1.0 <= rating <= 10.0):
                 raise ValidationError("Rating must be between 1 and 10")
 
+            old_rating = book.rating
             book.rating = round(rating, 1)
+            book.revision = Book.revision + 1
+            BookService._adjust_author_stats(book.author_id, 0, old_rating, book.rating)
+            CatalogRevision.bump()
             db.session.commit()
 
             return book
@@ -178,18 +422,23 @@ class BookService:
             author_deleted = False
             author_name = None
 
-            if author:
-                author_book_count = Book.query.filter_by(author_id=author.id).count()
-                if author_book_count == 1:
-                    author_name = author.name
-                    author_deleted = True
+            # Count the books themselves: deleting the author cascades to all of them,
+            # so a drifted book_count must never decide it
+            if author and Book.query.filter_by(author_id=author.id).limit(2).count() == 1:
+                author_name = author.name
+                author_deleted = True
 
             db.session.delete(book)
 
             if author_deleted and author:
                 db.session.delete(author)
+            elif author:
+                BookService._adjust_author_stats(author.id, -1, book.rating, None)
 
+            revision = CatalogRevision.bump_labels()
             db.session.commit()
+            record_suggest_changes(revision, books={book_id: None},
+                                   authors={author.id: None} if author_deleted else None)
 
             return {
                 'book_title': book_title,
@@ -201,6 +450,32 @@ class BookService:
             db.session.rollback()
             raise ServiceError(f"Error deleting book: {str(e)}")
 
+    @staticmethod
+    def _adjust_author_stats(author_id: int, book_delta: int,
+                             old_rating: Optional[float], new_rating: Optional[float]) -> None:
+        """
+        Apply an incremental change to an author's stored book aggregates and
+        increment the author's revision, since the author page lists their books.
+        Runs inside the caller's transaction so it commits or rolls back with the book change.
+        :param author_id: Author ID
+        :param book_delta: Change in the author's number of books
+        :param old_rating: Rating being removed from the aggregates, if any
+        :param new_rating: Rating being added to the aggregates, if any
+        """
+        rated_delta = (new_rating is not None) - (old_rating is not None)
+        rating_delta = (new_rating or 0.0) - (old_rating or 0.0)
+
+        db.session.execute(
+            update(Author)
+            .where(Author.id == author_id)
+            .values(
+                book_count=Author.book_count + book_delta,
+                rated_count=Author.rated_count + rated_delta,
+                rating_sum=Author.rating_sum + rating_delta,
+                revision=Author.revision + 1
+            )
+        )
+
 
 class AuthorService:
     """Service class for author-related operations."""
@@ -216,6 +491,98 @@ class AuthorService:
         except SQLAlchemyError as e:
             raise ServiceError(f"Error retrieving authors: {str(e)}")
 
+    @staticmethod
+    def lookup_authors(query: str, limit: int = AppConstants.DEFAULT_SUGGEST_LIMIT) -> List[Dict[str, Any]]:
+        """
+        Find authors for the author picker of the book forms.
+        Served from the (id, name) entries of the suggestion index, which match any word
+        of a name; without the index, names starting with the query are read from the name index.
+        :param query: Typed text
+        :param limit: Maximum number of authors
+        :return: List of dictionaries with id and name
+        :raises ServiceError: If database operation fails
+        """
+        if get_suggest_index() is not None:
+            return [{'id': author_id, 'name': name} for _, author_id, name in suggest(query, limit, (AUTHOR,))]
+
+        query = query.strip()
+        if not query:
+            return []
+
+        name = Author.name.collate('NOCASE')
+        try:
+            rows = db.session.execute(
+                select(Author.id, Author.name)
+                .where(name >= query, name < query + '\U0010ffff')
+                .order_by(name, Author.id)
+                .limit(limit)
+            ).all()
+        except SQLAlchemyError as e:
+            raise ServiceError(f"Error retrieving authors: {str(e)}")
+
+        return [{'id': row.id, 'name': row.name} for row in rows]
+
+    @staticmethod
+    def find_author_id(name: Optional[str]) -> Optional[int]:
+        """
+        Get the ID of the author with exactly this name, for forms submitted without the picker's ID.
+        :param name: Author name as typed
+        :return: Author ID or None if no author has the name
+        :raises ServiceError: If database operation fails
+        """
+        if not name or not name.strip():
+            return None
+
+        try:
+            return db.session.execute(select(Author.id).where(Author.name == name.strip())).scalar()
+        except SQLAlchemyError as e:
+            raise ServiceError(f"Error retrieving author: {str(e)}")
+
+    @staticmethod
+    def get_author_dicts(projection: Projection) -> List[Dict[str, Any]]:
+        """
+        Get all authors ordered by name as dictionaries of the projected fields.
+        :param projection: Author projection from get_author_projection
+        :return: List of author dictionaries
+        :raises ServiceError: If database operation fails
+        """
+        try:
+            rows = db.session.execute(select(*projection.columns()).order_by(Author.name)).all()
+        except SQLAlchemyError as e:
+            raise ServiceError(f"Error retrieving authors: {str(e)}")
+
+        return [projection.build(row) for row in rows]
+
+    @staticmethod
+    def iter_authors(projection: Projection, batch_size: int = AppConstants.EXPORT_BATCH_SIZE) -> Iterator[Row]:
+        """
+        Iterate over all authors ordered by name as rows for projection.build, fetching them in batches.
+        :param projection: Author projection from get_author_projection
+        :param batch_size: Number of rows loaded per batch
+        :return: Iterator of author rows
+        :raises ServiceError: If database operation fails
+        """
+        query = Author.query.order_by(Author.name).with_entities(*projection.columns())
+        try:
+            yield from query.yield_per(batch_size)
+        except SQLAlchemyError as e:
+            raise ServiceError(f"Error retrieving authors: {str(e)}")
+
+    @staticmethod
+    def get_author_projection(fields: Optional[List[str]] = None,
+                              embed: Optional[List[str]] = None) -> Projection:
+        """
+        Build the projection of a sparse fieldset request on the author API.
+        Authors embed no other resources, so embed must be empty if given.
+        :param fields: Requested field names or None for all
+        :param embed: Requested embedded resources or None
+        :return: Author projection
+        :raises ValidationError: If an unknown field or embed is requested
+        """
+        _check_embed(embed, set())
+        _check_fields(fields, Author.API_FIELDS)
+        return Author.api_projection(fields)
+
     @staticmethod
     def get_author_by_id(author_id: int) -> Optional[Author]:
         """
@@ -228,6 +595,25 @@ class AuthorService:
         except SQLAlchemyError as e:
             raise ServiceError(f"Error retrieving author: {str(e)}")
 
+    @staticmethod
+    def get_author_version(author_id: int) -> Optional[Tuple[str, Optional[datetime]]]:
+        """
+        Get a version tag and last change time for an author page without loading the author.
+        :param author_id: Author ID
+        :return: Tuple of version tag and last change time, or None if the author does not exist
+        """
+        try:
+            row = db.session.execute(
+                select(Author.revision, Author.updated_at).where(Author.id == author_id)
+            ).first()
+        except SQLAlchemyError as e:
+            raise ServiceError(f"Error retrieving author: {str(e)}")
+
+        if row is None:
+            return None
+
+        return f"author-{author_id}-{row.revision}", row.updated_at
+
     @staticmethod
     def create_author(form_data: Dict[str, Any]) -> Author:
         """
@@ -251,7 +637,9 @@ class AuthorService:
             )
 
             db.session.add(author)
+            revision = CatalogRevision.bump_labels()
             db.session.commit()
+            record_suggest_changes(revision, authors={author.id: author.name})
 
             return author
 
@@ -286,8 +674,11 @@ class AuthorService:
             author.name = validated_data['name']
             author.birth_date = validated_data['birth_date']
             author.date_of_death = validated_data['date_of_death']
+            author.revision = Author.revision + 1
 
+            revision = CatalogRevision.bump_labels()
             db.session.commit()
+            record_suggest_changes(revision, authors={author.id: author.name})
 
             return author
 
@@ -313,9 +704,12 @@ class AuthorService:
             author_name = author.name
             book_count = len(author.books)
             book_titles = [book.title for book in author.books]
+            book_ids = [book.id for book in author.books]
 
             db.session.delete(author)
+            revision = CatalogRevision.bump_labels()
             db.session.commit()
+            record_suggest_changes(revision, books=dict.fromkeys(book_ids), authors={author_id: None})
 
             return {
                 'author_name': author_name,
@@ -327,6 +721,24 @@ class AuthorService:
             db.session.rollback()
             raise ServiceError(f"Error deleting author: {str(e)}")
 
+    @staticmethod
+    def rebuild_author_stats() -> int:
+        """
+        Recompute every author's stored book aggregates from the books table.
+        :return: Number of authors updated
+        :raises ServiceError: If database operation fails
+        """
+        try:
+            result = db.session.execute(Author.rebuild_aggregates_statement())
+            db.session.execute(update(Author).values(revision=Author.revision + 1))
+            CatalogRevision.bump()
+            db.session.commit()
+            return result.rowcount
+
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            raise ServiceError(f"Error rebuilding author statistics: {str(e)}")
+
     @staticmethod
     def get_author_with_books(author_id: int) -> Optional[Author]:
         """
@@ -351,6 +763,65 @@ class AuthorService:
             raise ServiceError(f"Error retrieving author with books: {str(e)}")
 
 
+class CatalogService:
+    """Service class for catalog-wide state."""
+
+    @staticmethod
+    def get_catalog_version() -> Tuple[str, Optional[datetime]]:
+        """
+        Get a version tag and last change time covering all books and authors.
+        :return: Tuple of version tag and last change time
+        """
+        try:
+            revision, updated_at = CatalogRevision.current_state()
+        except SQLAlchemyError as e:
+            raise ServiceError(f"Error retrieving catalog revision: {str(e)}")
+
+        return f"catalog-{revision}", updated_at
+
+
 class ServiceError(Exception):
     """Custom exception for service layer errors."""
-    pass
\ No newline at end of file
+    pass
+
+
+def _check_fields(fields: Optional[List[str]], available: Dict[str, Any]) -> None:
+    """
+    Reject requested fields a resource does not have.
+    :param fields: Requested field names or None
+    :param available: Fields of the resource by name
+    :raises ValidationError: If a field is unknown
+    """
+    unknown = [name for name in fields or [] if name not in available]
+    if unknown:
+        raise ValidationError(f"{ValidationMessages.UNKNOWN_FIELDS}: {', '.join(unknown)}")
+
+
+def _check_embed(embed: Optional[List[str]], available: set) -> None:
+    """
+    Reject requested embedded resources a resource does not offer.
+    :param embed: Requested embedded resources or None
+    :param available: Names of the embeddable resources
+    :raises ValidationError: If an embed is unknown
+    """
+    unknown = [name for name in embed or [] if name not in available]
+    if unknown:
+        raise ValidationError(f"{ValidationMessages.UNKNOWN_EMBED}: {', '.join(unknown)}")
+
+
+def _is_cursor_id(value: Any) -> bool:
+    """
+    Check that a cursor value can be bound as a book ID.
+    :param value: Decoded cursor value
+    :return: True for integers, bool excluded
+    """
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _is_cursor_scalar(value: Any) -> bool:
+    """
+    Check that a cursor value can be bound against a sort column.
+    :param value: Decoded cursor value
+    :return: True for strings, numbers and None, bool excluded
+    """
+    return value is None or isinstance(value, str) or (isinstance(value, (int, float)) and not isinstance(value, bool))
@@ -0,0 +1,287 @@
+import logging
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from heapq import merge
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from flask import Flask, current_app
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+
+from models.models import Author, Book, CatalogRevision, db
+
+logger = logging.getLogger(__name__)
+
+BOOK = 'book'
+AUTHOR = 'author'
+KINDS = (BOOK, AUTHOR)
+
+_WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def normalize_suggest_text(text: str) -> str:
+    """
+    Normalize text for prefix matching: no accents, case-folded, words separated by single spaces.
+    :param text: Title, name or typed query
+    :return: Normalized text, empty if it has no words
+    """
+    text = text or ''
+    if not text.isascii():
+        decomposed = unicodedata.normalize('NFKD', text)
+        text = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return ' '.join(_WORD_PATTERN.findall(text.casefold()))
+
+
+def _scan(keys: List[Tuple[str, str, int]], prefix: str) -> Iterator[Tuple[str, str, int]]:
+    """
+    Iterate over the entries of a sorted array whose key starts with a prefix.
+    :param keys: Sorted (key, kind, id) array
+    :param prefix: Normalized prefix
+    :return: Iterator of matching entries in key order
+    """
+    for position in range(bisect_left(keys, (prefix,)), len(keys)):
+        entry = keys[position]
+        if not entry[0].startswith(prefix):
+            return
+        yield entry
+
+
+class SuggestIndex:
+    """
+    In-process prefix index over book titles and author names.
+
+    Every entry is stored in two sorted arrays of (key, kind, id) tuples per kind:
+    the whole normalized text, and the text from each later word on, so "pot" finds
+    "Harry Potter". A lookup is a binary search followed by a scan of at most
+    the matching keys, and matches at the start of a text rank first. Keeping the
+    kinds apart lets a lookup of authors skip the books entirely.
+
+    The index knows the label revision it reflects, which only title and name
+    writes move (see CatalogRevision.bump_labels). Those writes of this process are
+    applied incrementally; one of another process leaves a gap in the revisions,
+    which refresh_if_stale() repairs with a rebuild. Ratings, covers and other
+    catalog writes never touch the index.
+    """
+
+    def __init__(self):
+        self._labels: Dict[Tuple[str, int], str] = {}
+        self._starts: Dict[str, List[Tuple[str, str, int]]] = {kind: [] for kind in KINDS}
+        self._words: Dict[str, List[Tuple[str, str, int]]] = {kind: [] for kind in KINDS}
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self.revision: Optional[int] = None
+        self.checked_at = 0.0
+
+    @staticmethod
+    def _keys(label: str) -> Tuple[str, List[str]]:
+        """
+        Get the whole-text key and the word keys of a label.
+        :param label: Title or name
+        :return: Tuple of the normalized text and its suffixes starting at the second and later words
+        """
+        normalized = normalize_suggest_text(label)
+        words = normalized.split(' ')
+        return normalized, [' '.join(words[position:]) for position in range(1, len(words))]
+
+    def _add(self, kind: str, item_id: int, label: str) -> None:
+        """
+        Insert an entry's keys, keeping the arrays sorted. Caller holds the lock.
+        :param kind: BOOK or AUTHOR
+        :param item_id: Book or author ID
+        :param label: Title or name
+        """
+        start, words = self._keys(label)
+        if not start:
+            return
+        self._labels[(kind, item_id)] = label
+        insort(self._starts[kind], (start, kind, item_id))
+        for key in words:
+            insort(self._words[kind], (key, kind, item_id))
+
+    def _remove(self, kind: str, item_id: int) -> None:
+        """
+        Delete an entry's keys if it is indexed. Caller holds the lock.
+        :param kind: BOOK or AUTHOR
+        :param item_id: Book or author ID
+        """
+        label = self._labels.pop((kind, item_id), None)
+        if label is None:
+            return
+        start, words = self._keys(label)
+        for keys, key in [(self._starts[kind], start)] + [(self._words[kind], word) for word in words]:
+            entry = (key, kind, item_id)
+            position = bisect_left(keys, entry)
+            if position < len(keys) and keys[position] == entry:
+                del keys[position]
+
+    def load(self, books: Iterable[Tuple[int, str]], authors: Iterable[Tuple[int, str]], revision: int) -> None:
+        """
+        Replace the whole index.
+        :param books: (id, title) of every book
+        :param authors: (id, name) of every author
+        :param revision: Label revision the rows were read at
+        """
+        labels = {}
+        starts = {kind: [] for kind in KINDS}
+        words = {kind: [] for kind in KINDS}
+        for kind, rows in ((BOOK, books), (AUTHOR, authors)):
+            for item_id, label in rows:
+                start, word_keys = self._keys(label)
+                if not start:
+                    continue
+                labels[(kind, item_id)] = label
+                starts[kind].append((start, kind, item_id))
+                words[kind].extend((key, kind, item_id) for key in word_keys)
+            starts[kind].sort()
+            words[kind].sort()
+
+        with self._lock:
+            self._labels, self._starts, self._words = labels, starts, words
+            self.revision = revision
+
+    def apply(self, revision: Optional[int], books: Optional[Dict[int, Optional[str]]] = None,
+              authors: Optional[Dict[int, Optional[str]]] = None) -> None:
+        """
+        Apply a committed title or name write.
+        :param revision: Label revision the write produced
+        :param books: New title by book ID, None for deleted books
+        :param authors: New name by author ID, None for deleted authors
+        """
+        with self._lock:
+            for kind, changes in ((BOOK, books), (AUTHOR, authors)):
+                for item_id, label in (changes or {}).items():
+                    self._remove(kind, item_id)
+                    if label is not None:
+                        self._add(kind, item_id, label)
+
+            # Otherwise another process wrote in between and the index stays stale until the next rebuild
+            if revision is not None and self.revision is not None and revision == self.revision + 1:
+                self.revision = revision
+
+    def search(self, query: str, limit: int, kinds: Sequence[str] = KINDS) -> List[Tuple[str, int, str]]:
+        """
+        Find titles and names with a word starting with the query.
+        :param query: Typed text
+        :param limit: Maximum number of matches
+        :param kinds: Kinds of entries to search, BOOK and/or AUTHOR
+        :return: List of (kind, id, label), matches at the start of the text first, then alphabetical
+        """
+        prefix = normalize_suggest_text(query)
+        if not prefix or limit <= 0:
+            return []
+
+        matches = []
+        seen = set()
+        with self._lock:
+            for arrays in (self._starts, self._words):
+                for key, kind, item_id in merge(*(_scan(arrays[kind], prefix) for kind in kinds)):
+                    if (kind, item_id) in seen:
+                        continue
+                    seen.add((kind, item_id))
+                    matches.append((kind, item_id, self._labels[(kind, item_id)]))
+                    if len(matches) >= limit:
+                        return matches
+        return matches
+
+    def rebuild(self) -> int:
+        """
+        Reload the index from the database.
+        :return: Number of indexed books and authors
+        """
+        revision = CatalogRevision.current_labels()
+        books = db.session.execute(select(Book.id, Book.title)).all()
+        authors = db.session.execute(select(Author.id, Author.name)).all()
+        db.session.commit()
+
+        self.load(books, authors, revision)
+        self.checked_at = time.monotonic()
+        return len(self)
+
+    def refresh_if_stale(self, interval: float) -> bool:
+        """
+        Rebuild the index if the label revision moved past it, checking at most once per interval.
+        Only one thread checks and rebuilds at a time; the others keep searching the
+        current index meanwhile instead of waiting or rebuilding it again.
+        :param interval: Seconds between two revision checks
+        :return: True if the index was rebuilt
+        """
+        if time.monotonic() - self.checked_at < interval:
+            return False
+        if not self._refresh_lock.acquire(blocking=False):
+            return False
+
+        try:
+            # Another thread may have checked between the first test and the acquire
+            now = time.monotonic()
+            if now - self.checked_at < interval:
+                return False
+            self.checked_at = now
+
+            revision = CatalogRevision.current_labels()
+            db.session.commit()
+            if revision == self.revision:
+                return False
+
+            self.rebuild()
+            return True
+        finally:
+            self._refresh_lock.release()
+
+    def __len__(self) -> int:
+        return len(self._labels)
+
+
+def get_suggest_index() -> Optional[SuggestIndex]:
+    """
+    Get the suggestion index of the current app.
+    :return: Index or None if SUGGEST_INDEX_ENABLED is off
+    """
+    return current_app.extensions.get('suggest_index')
+
+
+def record_suggest_changes(revision: Optional[int], books: Optional[Dict[int, Optional[str]]] = None,
+                           authors: Optional[Dict[int, Optional[str]]] = None) -> None:
+    """
+    Update the suggestion index after a committed write, if the index is enabled.
+    :param revision: Label revision returned by CatalogRevision.bump_labels()
+    :param books: New title by book ID, None for deleted books
+    :param authors: New name by author ID, None for deleted authors
+    """
+    index = get_suggest_index()
+    if index is not None:
+        index.apply(revision, books, authors)
+
+
+def suggest(query: str, limit: int, kinds: Sequence[str] = KINDS) -> List[Tuple[str, int, str]]:
+    """
+    Find suggestions in the index, first rebuilding it if another process changed titles or names.
+    If the revision check fails the current index is used.
+    :param query: Typed text
+    :param limit: Maximum number of suggestions
+    :param kinds: Kinds of entries to search, BOOK and/or AUTHOR
+    :return: List of (kind, id, label)
+    """
+    index = get_suggest_index()
+    try:
+        index.refresh_if_stale(current_app.config['SUGGEST_INDEX_CHECK_INTERVAL'])
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        logger.warning("Could not refresh the suggestion index: %s", e)
+    return index.search(query, limit, kinds)
+
+
+def init_suggest_index(app: Flask) -> None:
+    """
+    Build the suggestion index if SUGGEST_INDEX_ENABLED is on.
+    :param app: Flask application instance
+    """
+    if not app.config.get('SUGGEST_INDEX_ENABLED'):
+        return
+
+    index = SuggestIndex()
+    with app.app_context():
+        index.rebuild()
+    app.extensions['suggest_index'] = index
@@ -0,0 +1,58 @@
+// Search-as-you-type author picker for the book forms. The name field suggests authors
+// from the lookup API in its datalist; the hidden author_id follows the chosen name.
+// Without JavaScript the server resolves the typed name instead.
+(function () {
+    const INPUT_DELAY_MS = 120;
+
+    const nameInput = document.getElementById('author_name');
+    const idInput = document.getElementById('author_id');
+    const list = document.getElementById(nameInput.getAttribute('list'));
+    const lookupUrl = nameInput.dataset.lookupUrl;
+
+    // Author names are unique, so a chosen name identifies the author
+    const authorIds = new Map();
+    if (idInput.value) {
+        authorIds.set(nameInput.value, idInput.value);
+    }
+
+    let inputTimer = null;
+    let pending = null;
+
+    function selectAuthor() {
+        idInput.value = authorIds.get(nameInput.value) || '';
+    }
+
+    function showAuthors(authors) {
+        list.replaceChildren(...authors.map(author => {
+            authorIds.set(author.name, String(author.id));
+            const option = document.createElement('option');
+            option.value = author.name;
+            return option;
+        }));
+        selectAuthor();
+    }
+
+    function fetchAuthors() {
+        const query = nameInput.value.trim();
+        if (pending) {
+            pending.abort();
+        }
+        if (!query) {
+            showAuthors([]);
+            return;
+        }
+
+        pending = new AbortController();
+        fetch(lookupUrl + '?q=' + encodeURIComponent(query),
+              {headers: {'Accept': 'application/json'}, signal: pending.signal})
+            .then(response => response.ok ? response.json() : Promise.reject(response.status))
+            .then(data => showAuthors(data.authors))
+            .catch(() => {});
+    }
+
+    nameInput.addEventListener('input', () => {
+        selectAuthor();
+        clearTimeout(inputTimer);
+        inputTimer = setTimeout(fetchAuthors, INPUT_DELAY_MS);
+    });
+})();
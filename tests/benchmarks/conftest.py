@@ -0,0 +1,179 @@
+"""
+Fixtures for the benchmark suite.
+
+The benchmarks only run when BENCHMARK_SIZES lists the catalog sizes to seed,
+for example BENCHMARK_SIZES=10000,100000,1000000. Further settings:
+
+BENCHMARK_BASELINE          JSON file with reference timings (default: instance/benchmark_baseline.json)
+BENCHMARK_THRESHOLD         Allowed slowdown against the baseline, 0.25 = 25% (default)
+BENCHMARK_MIN_DELTA         Slowdowns below this many seconds are noise (default: 0.001)
+BENCHMARK_REPEAT            Timed runs per measurement, the fastest is kept (default: 7)
+BENCHMARK_UPDATE_BASELINE   Set to 1 to overwrite the baseline with this run's timings
+
+Measurements without a baseline entry are added to the baseline file.
+"""
+
+import json
+import os
+import random
+import time
+
+import pytest
+from sqlalchemy import text
+
+import config
+from app import create_app
+from models.models import Author, db
+
+DEFAULT_BASELINE_PATH = os.path.join(config.INSTANCE_DIR, 'benchmark_baseline.json')
+
+FIRST_NAMES = ['Ada', 'Boris', 'Clara', 'Dmitri', 'Elena', 'Farid', 'Greta', 'Hiro', 'Ines', 'Jonas']
+LAST_NAMES = ['Austen', 'Borges', 'Calvino', 'Dickens', 'Eco', 'Fontane', 'Gogol', 'Hesse', 'Ibsen', 'Joyce']
+TITLE_WORDS = ['River', 'Shadow', 'Garden', 'Winter', 'Letters', 'Empire', 'Silence', 'Harbor', 'Mirror', 'Night']
+
+SEED_BATCH_SIZE = 10000
+
+
+def _sizes():
+    """Parse the catalog sizes to benchmark from BENCHMARK_SIZES."""
+    value = os.environ.get('BENCHMARK_SIZES', '')
+    return [int(size) for size in value.split(',') if size.strip()]
+
+
+class BenchmarkRecorder:
+    """Collects best-of-N timings and compares them against the stored baseline."""
+
+    def __init__(self, baseline_path, threshold, min_delta, repeat, update_baseline):
+        self.baseline_path = baseline_path
+        self.threshold = threshold
+        self.min_delta = min_delta
+        self.repeat = repeat
+        self.update_baseline = update_baseline
+        self.results = {}
+
+        try:
+            with open(baseline_path, encoding='utf-8') as baseline_file:
+                self.baseline = json.load(baseline_file)
+        except FileNotFoundError:
+            self.baseline = {}
+
+    def measure(self, name, operation, setup=None):
+        """
+        Time an operation and fail if it regressed beyond the threshold.
+        :param name: Unique measurement name
+        :param operation: Callable to time, receives the setup result if a setup is given
+        :param setup: Optional untimed callable run before every repetition
+        :return: Fastest duration in seconds
+        """
+        timings = []
+        for _ in range(self.repeat + 1):
+            argument = setup() if setup else None
+            started = time.perf_counter()
+            operation(argument) if setup else operation()
+            timings.append(time.perf_counter() - started)
+
+        # The first run warms caches and is not counted. Like timeit, keep the
+        # fastest run: slower ones mostly measure interference from the machine.
+        best = min(timings[1:])
+        self.results[name] = best
+
+        reference = self.baseline.get(name)
+        if reference and not self.update_baseline:
+            limit = max(reference * (1 + self.threshold), reference + self.min_delta)
+            assert best <= limit, (
+                f"{name} took {best * 1000:.2f} ms, baseline {reference * 1000:.2f} ms "
+                f"(+{self.threshold:.0%} allowed)"
+            )
+
+        return best
+
+    def save(self):
+        """
+        Write new measurements, or all of them when updating, to the baseline file.
+        """
+        if not self.results:
+            return
+
+        baseline = dict(self.baseline)
+        for name, duration in self.results.items():
+            if self.update_baseline or name not in baseline:
+                baseline[name] = duration
+
+        with open(self.baseline_path, 'w', encoding='utf-8') as baseline_file:
+            json.dump(baseline, baseline_file, indent=2, sort_keys=True)
+            baseline_file.write('\n')
+
+
+@pytest.fixture(scope='session')
+def benchmark():
+    """Session-wide benchmark recorder that writes the baseline at the end"""
+    if not _sizes():
+        pytest.skip("Set BENCHMARK_SIZES (e.g. 10000,100000,1000000) to run the benchmarks")
+
+    recorder = BenchmarkRecorder(
+        os.environ.get('BENCHMARK_BASELINE', DEFAULT_BASELINE_PATH),
+        float(os.environ.get('BENCHMARK_THRESHOLD', 0.25)),
+        float(os.environ.get('BENCHMARK_MIN_DELTA', 0.001)),
+        int(os.environ.get('BENCHMARK_REPEAT', 7)),
+        os.environ.get('BENCHMARK_UPDATE_BASELINE') == '1'
+    )
+    yield recorder
+    recorder.save()
+
+
+def seed_catalog(book_count):
+    """
+    Bulk insert book_count books written by book_count // 10 authors.
+    Runs in the current app context with executemany batches.
+    :param book_count: Number of books to create
+    """
+    rng = random.Random(book_count)
+    author_count = max(1, book_count // 10)
+    connection = db.session.connection()
+
+    for start in range(0, author_count, SEED_BATCH_SIZE):
+        connection.execute(
+            text("INSERT INTO authors (name, birth_date) VALUES (:name, :birth_date)"),
+            [{'name': f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {number}",
+              'birth_date': f"{rng.randint(1700, 1990)}-01-01"}
+             for number in range(start, min(start + SEED_BATCH_SIZE, author_count))]
+        )
+
+    for start in range(0, book_count, SEED_BATCH_SIZE):
+        connection.execute(
+            text("INSERT INTO books (title, isbn, publication_year, author_id, rating, revision) "
+                 "VALUES (:title, :isbn, :year, :author_id, :rating, 1)"),
+            [{'title': f"{rng.choice(TITLE_WORDS)} of the {rng.choice(TITLE_WORDS)} {number}",
+              'isbn': f"{9780000000000 + number}",
+              'year': rng.choice([None, rng.randint(1800, 2024)]),
+              'author_id': rng.randint(1, author_count),
+              'rating': rng.choice([None, round(rng.uniform(1, 10), 1)])}
+             for number in range(start, min(start + SEED_BATCH_SIZE, book_count))]
+        )
+
+    connection.execute(Author.rebuild_aggregates_statement())
+    db.session.commit()
+
+
+@pytest.fixture(scope='module', params=_sizes() or [0], ids=lambda size: f"{size}_books")
+def large_dataset(request, benchmark, tmp_path_factory):
+    """Application bound to a temporary SQLite file seeded with the requested number of books"""
+    size = request.param
+    database_path = tmp_path_factory.mktemp('benchmark') / f"library_{size}.sqlite"
+
+    class BenchmarkConfig(config.Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{database_path}'
+        SECRET_KEY = 'benchmark-secret-key'
+        COVER_WORKERS = 0
+        RESPONSE_CACHE_BACKEND = None
+
+    config.config['benchmark'] = BenchmarkConfig
+    app = create_app('benchmark')
+
+    with app.app_context():
+        seed_catalog(size)
+        yield app, size
+
+        db.session.remove()
+        db.engine.dispose()
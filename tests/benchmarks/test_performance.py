@@ -0,0 +1,111 @@
+"""
+Benchmarks for the catalog read and delete paths on seeded large datasets.
+See conftest.py in this directory for how to run them and manage the baseline.
+"""
+
+import pytest
+from sqlalchemy import select
+
+from models.models import Author, Book, db
+from services.services import AuthorService, BookService
+
+SORTS = ['title', 'author', 'year']
+SEARCH_TERMS = ['', 'river', 'borges', '1984']
+
+
+def middle_id(model):
+    """Return the ID in the middle of a table's ID range."""
+    return db.session.query(db.func.max(model.id)).scalar() // 2 or 1
+
+
+def id_picker(model):
+    """Return a function yielding successive existing IDs, starting in the middle of the table."""
+    last_id = middle_id(model) - 1
+
+    def next_id():
+        nonlocal last_id
+        last_id = db.session.execute(
+            select(model.id).where(model.id > last_id).order_by(model.id).limit(1)
+        ).scalar_one()
+        return last_id
+
+    return next_id
+
+
+def fetch_page(client, url, **query):
+    """Request a page and check that it rendered."""
+    response = client.get(url, query_string=query)
+    assert response.status_code == 200
+    return response
+
+
+@pytest.mark.parametrize('sort_by', SORTS)
+@pytest.mark.parametrize('search_term', SEARCH_TERMS)
+def test_search_large_dataset(large_dataset, benchmark, sort_by, search_term):
+    """Time the first and a later page of every Book.search sort and search combination"""
+    app, size = large_dataset
+    name = f"search[{size}][{sort_by}][{search_term or 'all'}]"
+
+    first_page = Book.search(search_term, sort_by).limit(21).all()
+    benchmark.measure(f"{name}[first]", lambda: Book.search(search_term, sort_by).limit(21).all())
+
+    if first_page:
+        after = first_page[-1].sort_key(sort_by)
+        benchmark.measure(f"{name}[next]",
+                          lambda: Book.search(search_term, sort_by, after=after).limit(21).all())
+
+
+@pytest.mark.parametrize('sort_by', SORTS)
+def test_homepage_performance(large_dataset, benchmark, sort_by):
+    """Time rendering the homepage for each sort and for a search"""
+    app, size = large_dataset
+    client = app.test_client()
+
+    benchmark.measure(f"homepage[{size}][{sort_by}]", lambda: fetch_page(client, '/', sort=sort_by))
+    benchmark.measure(f"homepage[{size}][{sort_by}][search]",
+                      lambda: fetch_page(client, '/', sort=sort_by, search='river'))
+
+
+def test_api_books_performance(large_dataset, benchmark):
+    """Time the first and a following /api/books page"""
+    app, size = large_dataset
+    client = app.test_client()
+
+    cursor = fetch_page(client, '/api/books').json['next_cursor']
+    benchmark.measure(f"api_books[{size}][first]", lambda: fetch_page(client, '/api/books'))
+    benchmark.measure(f"api_books[{size}][next]", lambda: fetch_page(client, '/api/books', cursor=cursor))
+    benchmark.measure(f"api_books[{size}][limit100]", lambda: fetch_page(client, '/api/books', limit=100))
+
+
+def test_api_authors_performance(large_dataset, benchmark):
+    """Time serializing all authors"""
+    app, size = large_dataset
+    client = app.test_client()
+
+    benchmark.measure(f"api_authors[{size}]", lambda: fetch_page(client, '/api/authors'))
+
+
+def test_detail_pages_performance(large_dataset, benchmark):
+    """Time the book and author detail pages"""
+    app, size = large_dataset
+    client = app.test_client()
+    book_id, author_id = middle_id(Book), middle_id(Author)
+
+    benchmark.measure(f"book_detail[{size}]", lambda: fetch_page(client, f'/book/{book_id}'))
+    benchmark.measure(f"author_detail[{size}]", lambda: fetch_page(client, f'/author/{author_id}'))
+
+
+def test_delete_book_performance(large_dataset, benchmark):
+    """Time deleting books from the middle of the catalog"""
+    app, size = large_dataset
+    next_book = id_picker(Book)
+
+    benchmark.measure(f"delete_book[{size}]", BookService.delete_book, setup=next_book)
+
+
+def test_delete_author_performance(large_dataset, benchmark):
+    """Time deleting authors together with their books"""
+    app, size = large_dataset
+    next_author = id_picker(Author)
+
+    benchmark.measure(f"delete_author[{size}]", AuthorService.delete_author, setup=next_author)
@@ -0,0 +1,142 @@
+"""
+Query plan regression tests for Book.search.
+
+Every sort order must be served by an index: browsing pages walk the sort index,
+keyset pages seek into it, and no variant may combine a full table scan with a
+temporary B-tree sort.
+"""
+
+import pytest
+
+import models.models
+from models.models import Author, Book, db
+from models.search_index import RANK_SUBQUERY
+
+SORTS = ['title', 'author', 'year']
+
+AFTER_KEYS = {
+    'title': ['Emma', 5],
+    'author': ['Austen', 2, 5],
+    'year': [1813, 5],
+}
+
+SORT_INDEXES = {
+    'title': 'ix_books_title_nocase_id',
+    'author': 'ix_authors_name_nocase_id',
+    'year': 'ix_books_year_sort_id',
+}
+
+
+def explain(query):
+    """Return the detail column of EXPLAIN QUERY PLAN for a query, with its real parameters."""
+    compiled = query.limit(21).statement.compile(dialect=db.engine.dialect)
+    parameters = tuple(compiled.params[name] for name in compiled.positiontup)
+    rows = db.session.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", parameters)
+    return [row[3] for row in rows]
+
+
+def full_scans(plan):
+    """Return plan steps that read a whole table without an index."""
+    return [step for step in plan
+            if step.startswith('SCAN ') and 'USING' not in step and 'VIRTUAL TABLE' not in step]
+
+
+def uses_temp_sort(plan):
+    """Check whether the plan sorts rows in a temporary B-tree."""
+    return any('USE TEMP B-TREE' in step for step in plan)
+
+
+@pytest.fixture
+def fallback_search(monkeypatch):
+    """Search without the FTS5 index, as on SQLite builds that lack it."""
+    monkeypatch.setattr(models.models, 'is_search_index_enabled', lambda: False)
+
+
+@pytest.mark.parametrize('sort_by', SORTS)
+def test_browse_walks_sort_index(app, sort_by):
+    """Test that the first page is read in index order without sorting"""
+    plan = explain(Book.search('', sort_by))
+
+    assert not uses_temp_sort(plan), plan
+    assert not full_scans(plan), plan
+    assert SORT_INDEXES[sort_by] in plan[0], plan
+
+
+@pytest.mark.parametrize('sort_by', SORTS)
+def test_keyset_page_seeks_into_sort_index(app, sort_by):
+    """Test that later pages start with an index range search"""
+    plan = explain(Book.search('', sort_by, after=AFTER_KEYS[sort_by]))
+
+    assert not uses_temp_sort(plan), plan
+    assert plan[0].startswith('SEARCH'), plan
+    assert SORT_INDEXES[sort_by] in plan[0], plan
+
+
+@pytest.mark.parametrize('sort_by', SORTS)
+@pytest.mark.parametrize('search_term', ['austen', 'pride prej', '1813'])
+@pytest.mark.parametrize('paged', [False, True])
+def test_full_text_search_avoids_scan_and_sort(app, sort_by, search_term, paged):
+    """Test that full-text searches never scan the books table and then sort it"""
+    after = AFTER_KEYS[sort_by] if paged else None
+    plan = explain(Book.search(search_term, sort_by, after=after))
+
+    assert not (full_scans(plan) and uses_temp_sort(plan)), plan
+
+
+@pytest.mark.parametrize('sort_by', SORTS)
+@pytest.mark.parametrize('paged', [False, True])
+def test_fallback_search_follows_sort_index(app, fallback_search, sort_by, paged):
+    """Test that the ilike fallback filters rows while walking the sort index"""
+    after = AFTER_KEYS[sort_by] if paged else None
+    plan = explain(Book.search('austen', sort_by, after=after))
+
+    assert not uses_temp_sort(plan), plan
+    assert not full_scans(plan), plan
+
+
+@pytest.mark.parametrize('sort_by', SORTS)
+@pytest.mark.parametrize('paged', [False, True])
+@pytest.mark.parametrize('embed_author', [False, True])
+def test_row_projection_keeps_sort_index(app, sort_by, paged, embed_author):
+    """Test that selecting API rows, with or without the author joined, does not add a sort or scan"""
+    after = AFTER_KEYS[sort_by] if paged else None
+    projection = Book.api_projection(['id', 'title'], Author.api_projection() if embed_author else None)
+    plan = explain(Book.search_rows(projection, '', sort_by, after=after))
+
+    assert not uses_temp_sort(plan), plan
+    assert not full_scans(plan), plan
+    assert SORT_INDEXES[sort_by] in plan[0], plan
+
+
+@pytest.mark.parametrize('search_term', ['austen', 'pride prej'])
+@pytest.mark.parametrize('paged', [False, True])
+def test_relevance_sort_is_driven_by_full_text_index(app, search_term, paged):
+    """Test that the relevance sort reads matches and scores from the FTS5 index and looks books up by key"""
+    if not models.models.is_search_index_enabled():
+        pytest.skip("FTS5 is not available")
+
+    after = [-1.0, 5] if paged else None
+    plan = explain(Book.search(search_term, 'relevance', after=after, limit=21))
+
+    # Ordering equal scores by book ID needs sorts: one bounded by the limit inside the
+    # ranking, and one of the page of rows the materialized ranking holds
+    assert plan[0] == f'MATERIALIZE {RANK_SUBQUERY}', plan
+    assert any('books_fts VIRTUAL TABLE' in step for step in plan), plan
+    assert any('books USING INTEGER PRIMARY KEY' in step for step in plan), plan
+    assert full_scans(plan) == [f'SCAN {RANK_SUBQUERY}'], plan
+
+
+def test_upgrade_drops_retired_sort_indexes(app):
+    """Test that the single-column indexes replaced by the sort indexes are dropped from older databases"""
+    db.session.execute(db.text("CREATE INDEX ix_books_title ON books (title)"))
+    db.session.execute(db.text("CREATE INDEX ix_books_publication_year ON books (publication_year)"))
+    db.session.commit()
+
+    models.models.upgrade_schema(db.engine)
+
+    # Expression indexes are not reflected, so read them from the schema table
+    index_names = set(db.session.execute(
+        db.text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'books'")
+    ).scalars())
+    assert not index_names & set(models.models.RETIRED_INDEXES)
+    assert {'ix_books_title_nocase_id', 'ix_books_year_sort_id'} <= index_names
@@ -0,0 +1,795 @@
+"""
+Regression tests for the service layer.
+"""
+
+import hashlib
+import io
+import json
+import threading
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+import requests
+from sqlalchemy import create_engine, event, update
+
+from constants import AppConstants, CoverStatus
+from models.models import (Author, Book, CatalogRevision, CoverJob, CoverLookup, build_sqlite_pragmas, db,
+                           register_sqlite_pragmas)
+from models.search_index import is_fuzzy_search_enabled, is_search_index_enabled
+from services import cover_backfill, cover_cache, cover_images, cover_jobs, cover_service
+from services.http_client import CircuitBreaker, CircuitOpenError, ProviderClient
+from services.import_service import import_catalog
+from services.services import AuthorService, BookService
+from services.suggest_index import get_suggest_index, suggest
+from utils.helpers import encode_cursor
+from utils.instrumentation import cover_api_call
+from utils.json_provider import OrjsonProvider
+from utils.response_cache import CacheEntry, FileCacheBackend, init_response_cache
+
+
+@pytest.mark.parametrize('cursor_values', [
+    ['title', {'a': 1}, 3],
+    ['title', 'Emma', '3'],
+    ['title', 'Emma', True],
+    ['author', ['Austen'], 2, 5],
+    ['year', 1813, 5.5],
+])
+def test_tampered_page_cursor_is_rejected(client, sample_book, cursor_values):
+    """Test that cursor values of the wrong type are a client error instead of reaching the database"""
+    sort_by = cursor_values[0]
+    response = client.get('/api/books', query_string={'sort': sort_by, 'cursor': encode_cursor(cursor_values)})
+
+    assert response.status_code == 400
+    assert 'SELECT' not in response.get_data(as_text=True)
+
+
+def test_valid_page_cursor_is_accepted(client, sample_book):
+    """Test that a cursor created by the API itself still pages"""
+    response = client.get('/api/books', query_string={'sort': 'title', 'cursor': encode_cursor(['title', 'A', 0])})
+
+    assert response.status_code == 200
+    assert [book['title'] for book in response.get_json()['books']] == ['Pride and Prejudice']
+
+
+def test_suggest_index_survives_writes_that_keep_labels(app, monkeypatch):
+    """Test that ratings and cover updates leave the suggestion index alone, while title writes are applied in place"""
+    index = get_suggest_index()
+    if index is None:
+        pytest.skip("SUGGEST_INDEX_ENABLED is off")
+    app.config['SUGGEST_INDEX_CHECK_INTERVAL'] = 0
+
+    author = AuthorService.create_author({'name': 'Jane Austen', 'birthdate': '1775-12-16'})
+    book = BookService.create_book({'title': 'Pride and Prejudice', 'author_id': str(author.id)})
+
+    rebuilds = []
+    rebuild = index.rebuild
+    monkeypatch.setattr(index, 'rebuild', lambda: rebuilds.append(1) or rebuild())
+
+    revision = CatalogRevision.current()
+    BookService.rate_book(book.id, 8.5)
+    app.config['COVER_IMAGE_PREFETCH'] = False
+    monkeypatch.setattr(cover_jobs, 'get_book_cover_url', lambda isbn, title: 'https://covers.example/1.jpg')
+    assert cover_jobs.process_next_cover_job()
+    assert CatalogRevision.current() == revision + 2
+
+    assert [item[2] for item in suggest('pri', 5)] == ['Pride and Prejudice']
+    assert AuthorService.lookup_authors('aus') == [{'id': author.id, 'name': 'Jane Austen'}]
+    assert not rebuilds
+
+    # A title write the index did not see, as from another process, is repaired by a rebuild
+    CatalogRevision.bump_labels()
+    db.session.commit()
+    suggest('pri', 5)
+    assert len(rebuilds) == 1
+
+
+def test_suggest_index_rebuilds_once_for_concurrent_requests(app, monkeypatch):
+    """Test that only one thread rebuilds a stale index while the others search the current one"""
+    index = get_suggest_index()
+    if index is None:
+        pytest.skip("SUGGEST_INDEX_ENABLED is off")
+    app.config['SUGGEST_INDEX_CHECK_INTERVAL'] = 0
+
+    revision = CatalogRevision.bump_labels()
+    db.session.commit()
+    assert revision == CatalogRevision.current_labels()
+
+    started, release = threading.Event(), threading.Event()
+    rebuilds = []
+
+    def slow_rebuild():
+        rebuilds.append(1)
+        started.set()
+        release.wait(5)
+        index.revision = revision
+        return len(index)
+
+    monkeypatch.setattr(index, 'rebuild', slow_rebuild)
+
+    def refresh():
+        with app.app_context():
+            index.refresh_if_stale(0)
+
+    rebuilder = threading.Thread(target=refresh)
+    rebuilder.start()
+    assert started.wait(5)
+
+    # The index is stale and being rebuilt: this request neither waits nor rebuilds
+    assert not index.refresh_if_stale(0)
+    release.set()
+    rebuilder.join(5)
+
+    assert len(rebuilds) == 1
+    assert not index.refresh_if_stale(0)
+
+
+@pytest.mark.parametrize('search_term', ['1813', 'pride'])
+def test_fuzzy_relevance_search_keeps_full_text_matches(client, sample_author, search_term):
+    """Test that books matching only the full-text index, such as by year, stay in a fuzzy relevance search"""
+    if not is_fuzzy_search_enabled():
+        pytest.skip("The trigram index is not available")
+
+    for title, isbn, year in [('Pride and Prejudice', '9780141439518', 1813),
+                              ('1812 Overture', '9780000000002', 1880),
+                              ('Prido Bay', '9780000000019', 1900)]:
+        BookService.create_book({'title': title, 'isbn': isbn, 'publication_year': str(year),
+                                 'author_id': str(sample_author.id)})
+
+    response = client.get('/api/books', query_string={'search': search_term, 'fuzzy': '1', 'sort': 'relevance'})
+    titles = [book['title'] for book in response.get_json()['books']]
+
+    # The full-text match ranks before books that are only similar to the search
+    assert titles[0] == 'Pride and Prejudice'
+    assert len(titles) == len(set(titles)) > 1
+
+
+@pytest.mark.parametrize('fuzzy', ['0', '1'])
+def test_relevance_pages_of_equal_scores_do_not_overlap(client, sample_author, fuzzy):
+    """Test that books with the same relevance score are paged in book ID order, each exactly once"""
+    if not is_search_index_enabled():
+        pytest.skip("FTS5 is not available")
+
+    book_ids = [BookService.create_book({'title': 'Emma', 'author_id': str(sample_author.id)}).id
+                for _ in range(7)]
+
+    seen = []
+    query = {'search': 'emma', 'sort': 'relevance', 'fuzzy': fuzzy, 'limit': '3'}
+    while True:
+        page = client.get('/api/books', query_string=query).get_json()
+        seen.extend(book['id'] for book in page['books'])
+        if not page['next_cursor']:
+            break
+        query['cursor'] = page['next_cursor']
+
+    assert seen == sorted(book_ids)
+
+
+def _author_aggregates(author_id):
+    """Return the stored book_count, rated_count and rating_sum of an author."""
+    author = db.session.get(Author, author_id)
+    db.session.refresh(author)
+    return author.book_count, author.rated_count, author.rating_sum
+
+
+def test_author_aggregates_follow_book_writes(app, sample_author, living_author):
+    """Test that create, rate, update, author reassignment and delete keep the stored aggregates exact"""
+    first = BookService.create_book({'title': 'Emma', 'author_id': str(sample_author.id), 'rating': '8'})
+    second = BookService.create_book({'title': 'Persuasion', 'author_id': str(sample_author.id)})
+    assert _author_aggregates(sample_author.id) == (2, 1, 8.0)
+
+    BookService.rate_book(second.id, 6.0)
+    assert _author_aggregates(sample_author.id) == (2, 2, 14.0)
+
+    BookService.update_book(first.id, {'title': 'Emma', 'author_id': str(sample_author.id), 'rating': '9'})
+    assert _author_aggregates(sample_author.id) == (2, 2, 15.0)
+
+    BookService.update_book(second.id, {'title': 'Persuasion', 'author_id': str(living_author.id), 'rating': '6'})
+    assert _author_aggregates(sample_author.id) == (1, 1, 9.0)
+    assert _author_aggregates(living_author.id) == (1, 1, 6.0)
+
+    BookService.delete_book(first.id)
+    assert db.session.get(Author, sample_author.id) is None
+    assert _author_aggregates(living_author.id) == (1, 1, 6.0)
+
+
+def test_delete_book_keeps_author_with_drifted_book_count(app, sample_author):
+    """Test that a stale book_count cannot make delete_book remove an author who still has books"""
+    first = BookService.create_book({'title': 'Emma', 'author_id': str(sample_author.id)})
+    BookService.create_book({'title': 'Persuasion', 'author_id': str(sample_author.id)})
+    db.session.execute(update(Author).where(Author.id == sample_author.id).values(book_count=1))
+    db.session.commit()
+
+    result = BookService.delete_book(first.id)
+
+    assert not result['author_deleted']
+    assert [book.title for book in Book.query.filter_by(author_id=sample_author.id)] == ['Persuasion']
+
+
+def test_create_app_leaves_cover_workers_to_the_entry_point(app):
+    """Test that building the app, as importing it for tests or CLI commands does, starts no worker threads"""
+    import app as app_module
+
+    assert not hasattr(app_module, 'app')
+    assert 'cover_worker' not in app.extensions
+
+
+def test_circuit_breaker_state_transitions():
+    """Test that the breaker opens at the threshold, lets one trial through after the timeout and closes on success"""
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and not breaker.allow_request()
+
+    breaker._opened_at -= 60
+    assert breaker.allow_request()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow_request()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow_request()
+
+
+@pytest.mark.parametrize('error', [requests.exceptions.ChunkedEncodingError, requests.TooManyRedirects])
+def test_failed_half_open_trial_reopens_the_circuit(monkeypatch, error):
+    """Test that an exception the client does not retry still counts as a failed trial"""
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    client = ProviderClient('test', pool_size=1, retries=0, backoff=0, backoff_max=0, breaker=breaker)
+    breaker.record_failure()
+    breaker._opened_at -= 60
+
+    def fail(*args, **kwargs):
+        raise error("broken response")
+
+    monkeypatch.setattr(client.session, 'get', fail)
+
+    with pytest.raises(error):
+        client.get('https://covers.example/volumes')
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        client.get('https://covers.example/volumes')
+
+
+@pytest.mark.parametrize('error, attempts', [(requests.ConnectionError, 1), (CircuitOpenError, 0)])
+def test_cover_job_retries_provider_errors(app, sample_author, monkeypatch, error, attempts):
+    """Test that transport errors retry the job instead of storing the placeholder and
+    that a lookup skipped by an open circuit does not use up an attempt"""
+    app.config['COVER_JOB_MAX_ATTEMPTS'] = 2
+    monkeypatch.setenv('GOOGLE_BOOKS_API_KEY', 'test-key')
+    monkeypatch.setattr(cover_cache, '_memory_cache', None)
+
+    def fail(query):
+        raise error("provider unavailable")
+
+    monkeypatch.setattr(cover_service, '_query_google_books', fail)
+    book = BookService.create_book({'title': 'Emma', 'isbn': '9780141439587', 'author_id': str(sample_author.id)})
+
+    assert cover_jobs.process_next_cover_job()
+
+    job = CoverJob.query.filter_by(book_id=book.id).one()
+    assert (job.status, job.attempts) == (CoverJob.QUEUED, attempts)
+    assert db.session.get(Book, book.id).cover_status == CoverStatus.PENDING
+
+
+def test_import_catalog_resolves_authors_and_skips_bad_rows(app, sample_author):
+    """Test that imported books get the right new or existing authors, duplicates and invalid rows are skipped,
+    and books without queued cover jobs are left to the backfill"""
+    stream = io.StringIO(
+        "title,isbn,publication_year,rating,author\n"
+        "Emma,9780141439587,1815,8,Jane Austen\n"
+        "Carrie,9780307743664,1974,,Stephen King\n"
+        "It,,1986,7,Stephen King\n"
+        "Emma again,9780141439587,1815,,Jane Austen\n"
+        ",9780000000002,2000,,Nobody\n"
+        "Misery,,1987,11,Stephen King\n"
+    )
+
+    stats = import_catalog(stream, 'csv', batch_size=2)
+
+    assert (stats['imported_books'], stats['created_authors']) == (3, 1)
+    assert (stats['skipped_duplicates'], stats['failed_rows']) == (1, 2)
+    assert [error.split(':')[0] for error in stats['errors']] == ['Row 5', 'Row 6']
+
+    king = Author.query.filter_by(name='Stephen King').one()
+    assert sorted(book.title for book in king.books) == ['Carrie', 'It']
+    assert Book.query.filter_by(title='Emma').one().author_id == sample_author.id
+    assert _author_aggregates(king.id) == (2, 1, 7.0)
+    assert _author_aggregates(sample_author.id) == (1, 1, 8.0)
+
+    assert {book.cover_status for book in Book.query} == {None}
+    assert CoverJob.query.count() == 0
+
+
+def test_import_catalog_queues_a_cover_job_per_book(app, sample_book):
+    """Test that --enqueue-covers queues exactly the imported books across batches"""
+    stream = io.StringIO(
+        '{"title": "Emma", "author": "Jane Austen"}\n'
+        '{"title": "Persuasion", "author": "Jane Austen"}\n'
+        '{"title": "Carrie", "author": "Stephen King"}\n'
+    )
+
+    stats = import_catalog(stream, 'jsonl', batch_size=2, enqueue_covers=True)
+
+    imported = Book.query.filter(Book.id != sample_book.id).all()
+    assert stats['imported_books'] == len(imported) == 3
+    assert sorted(job.book_id for job in CoverJob.query) == sorted(book.id for book in imported)
+    assert {book.cover_status for book in imported} == {CoverStatus.PENDING}
+
+
+@pytest.mark.parametrize('fields, expected_keys', [
+    (None, {'highlights'}),
+    ('id,title', {'id', 'title'}),
+    ('title,highlights', {'title', 'highlights'}),
+])
+def test_search_highlights_follow_the_requested_fields(client, sample_book, fields, expected_keys):
+    """Test that highlights are only added to search results when fields does not leave them out"""
+    query = {'search': 'pride'}
+    if fields is not None:
+        query['fields'] = fields
+
+    book = client.get('/api/books', query_string=query).get_json()['books'][0]
+
+    assert expected_keys <= set(book)
+    if fields is not None:
+        assert set(book) == expected_keys
+    if 'highlights' in expected_keys:
+        assert '<mark>' in book['highlights']['title']
+
+
+def _search_titles(search_query):
+    """Return the titles BookService finds for a search, in title order."""
+    return [book.title for book in BookService.get_all_books(search_query)]
+
+
+def test_full_text_search_follows_book_and_author_writes(app, sample_author, living_author):
+    """Test that title, author and year searches match word prefixes and see every write"""
+    if not is_search_index_enabled():
+        pytest.skip("FTS5 is not available")
+
+    emma = BookService.create_book({'title': 'Emma', 'publication_year': '1815', 'author_id': str(sample_author.id)})
+    BookService.create_book({'title': 'Pride and Prejudice', 'author_id': str(sample_author.id)})
+    BookService.create_book({'title': 'Carrie', 'publication_year': '1974', 'author_id': str(living_author.id)})
+
+    assert _search_titles('prej') == ['Pride and Prejudice']
+    assert _search_titles('austen') == ['Emma', 'Pride and Prejudice']
+    assert _search_titles('1974') == ['Carrie']
+    assert _search_titles('king carr') == ['Carrie']
+    assert _search_titles('"emma" (*') == ['Emma']
+
+    BookService.update_book(emma.id, {'title': 'Persuasion', 'publication_year': '1817',
+                                      'author_id': str(sample_author.id)})
+    AuthorService.update_author(living_author.id, {'name': 'Richard Bachman'})
+    assert _search_titles('emma') == []
+    assert _search_titles('persua') == ['Persuasion']
+    assert _search_titles('king') == []
+    assert _search_titles('bachman') == ['Carrie']
+
+    BookService.delete_book(emma.id)
+    assert _search_titles('persuasion') == []
+
+
+def test_cover_lookups_are_cached_with_negative_ttl(app, monkeypatch):
+    """Test that found and missing covers are served from the LRU and the table until they expire"""
+    monkeypatch.setenv('GOOGLE_BOOKS_API_KEY', 'test-key')
+    monkeypatch.setattr(cover_cache, '_memory_cache', None)
+    queries = []
+
+    def query_google_books(query):
+        queries.append(query)
+        return 'https://covers.example/emma.jpg' if query.startswith('isbn:') else None
+
+    monkeypatch.setattr(cover_service, '_query_google_books', query_google_books)
+
+    assert cover_service.get_book_cover_url('978-0141439587', 'Emma') == 'https://covers.example/emma.jpg'
+    assert cover_service.get_book_cover_url(None, 'Unknown Book!') == AppConstants.DEFAULT_COVER_URL
+    assert queries == ['isbn:9780141439587', 'intitle:"Unknown Book!"']
+
+    # Served by the table once the in-process LRU is gone; titles are normalized
+    cover_cache._get_memory_cache().clear()
+    cover_service.get_book_cover_url('9780141439587', 'Emma')
+    cover_service.get_book_cover_url(None, 'unknown  book')
+    assert len(queries) == 2
+
+    cover_service.get_book_cover_url('9780141439587', 'Emma', bypass_cache=True)
+    assert len(queries) == 3
+
+    lookups = {lookup.lookup_key: lookup for lookup in CoverLookup.query}
+    assert lookups['title:unknown book'].cover_url is None
+    assert lookups['title:unknown book'].expires_at < lookups['isbn:9780141439587'].expires_at
+
+    lookups['title:unknown book'].expires_at = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+    cover_cache._get_memory_cache().clear()
+    cover_service.get_book_cover_url(None, 'Unknown Book')
+    assert queries[-1] == 'intitle:"Unknown Book"'
+
+
+def test_cover_backfill_resolves_in_batches_and_resumes(app, runner, sample_author, monkeypatch, tmp_path):
+    """Test that the backfill stores found and missing covers, stops at provider errors and resumes after them"""
+    app.config['COVER_BACKFILL_CHECKPOINT'] = str(tmp_path / 'backfill.json')
+    books = {}
+    for title, cover_url in [('Emma', None), ('Persuasion', AppConstants.DEFAULT_COVER_URL),
+                             ('Sanditon', 'https://covers.example/sanditon.jpg'), ('Lady Susan', None)]:
+        books[title] = Book(title=title, author_id=sample_author.id, cover_url_cached=cover_url)
+        db.session.add(books[title])
+    db.session.flush()
+    db.session.add(CoverJob(book_id=books['Emma'].id))
+    db.session.commit()
+
+    provider_down = True
+
+    def get_book_cover_url(isbn, title):
+        if title == 'Persuasion' and provider_down:
+            raise requests.ConnectionError("provider unavailable")
+        return 'https://covers.example/emma.jpg' if title == 'Emma' else AppConstants.DEFAULT_COVER_URL
+
+    monkeypatch.setattr(cover_backfill, 'get_book_cover_url', get_book_cover_url)
+
+    result = runner.invoke(args=['covers', 'backfill', '--batch-size', '1', '--workers', '2'])
+    assert result.exit_code == 1 and 'Run the command again to resume' in result.output
+    assert cover_backfill.load_checkpoint(app.config['COVER_BACKFILL_CHECKPOINT']) == books['Emma'].id
+
+    provider_down = False
+    result = runner.invoke(args=['covers', 'backfill', '--batch-size', '1', '--workers', '2'])
+    assert result.exit_code == 0 and 'Done: 2 books' in result.output
+
+    db.session.expire_all()
+    assert (books['Emma'].cover_url_cached, books['Emma'].cover_status) == \
+        ('https://covers.example/emma.jpg', CoverStatus.RESOLVED)
+    assert books['Persuasion'].cover_status == books['Lady Susan'].cover_status == CoverStatus.FAILED
+    assert books['Sanditon'].cover_status is None
+    assert CoverJob.query.count() == 0
+    assert not (tmp_path / 'backfill.json').exists()
+
+
+def test_rate_limit_only_applies_to_the_limited_thread(monkeypatch):
+    """Test that a bulk job's rate limit does not throttle other threads sharing the provider client"""
+    client = ProviderClient('test', pool_size=1, retries=0, backoff=0, backoff_max=0,
+                            breaker=CircuitBreaker(failure_threshold=5, reset_timeout=60))
+    response = requests.Response()
+    response.status_code = 200
+    monkeypatch.setattr(client.session, 'get', lambda *args, **kwargs: response)
+
+    acquired = []
+
+    class RecordingLimiter:
+        def acquire(self):
+            acquired.append(threading.current_thread().name)
+
+    with client.rate_limited(RecordingLimiter()):
+        client.get('https://covers.example/volumes')
+        other = threading.Thread(target=client.get, args=('https://covers.example/volumes',), name='cover-worker')
+        other.start()
+        other.join()
+    client.get('https://covers.example/volumes')
+
+    assert acquired == [threading.current_thread().name]
+
+
+def test_ndjson_export_streams_every_book_and_author(client, sample_author, living_author):
+    """Test that format=ndjson streams one object per line, with the same keys as the paged API"""
+    for title in ['Emma', 'Persuasion', 'Sanditon']:
+        BookService.create_book({'title': title, 'author_id': str(sample_author.id)})
+    BookService.create_book({'title': 'Carrie', 'author_id': str(living_author.id)})
+
+    response = client.get('/api/books', query_string={'format': 'ndjson', 'search': 'austen'})
+    assert response.is_streamed and response.mimetype == 'application/x-ndjson'
+    books = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [book['title'] for book in books] == ['Emma', 'Persuasion', 'Sanditon']
+
+    paged = client.get('/api/books', query_string={'search': 'austen'}).get_json()['books']
+    assert set(books[0]) == set(paged[0]) - {'highlights'}
+
+    response = client.get('/api/authors', query_string={'format': 'ndjson', 'fields': 'id,name'})
+    authors = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert authors == [{'id': sample_author.id, 'name': 'Jane Austen'},
+                       {'id': living_author.id, 'name': 'Stephen King'}]
+
+
+def test_sqlite_pragmas_apply_to_every_connection(app, tmp_path):
+    """Test that the configured pragmas are set on new connections and None skips a setting"""
+    config = dict(app.config, SQLITE_MMAP_SIZE=None, SQLITE_CACHE_SIZE=-2000)
+    assert not any('mmap_size' in pragma for pragma in build_sqlite_pragmas(config))
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'library.sqlite'}")
+    register_sqlite_pragmas(engine, config)
+    try:
+        with engine.connect() as connection:
+            def pragma(name):
+                return connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+
+            assert pragma('journal_mode') == 'wal'
+            assert pragma('synchronous') == 1
+            assert pragma('cache_size') == -2000
+            assert pragma('temp_store') == 2
+            assert pragma('foreign_keys') == 1
+    finally:
+        engine.dispose()
+
+
+def test_response_cache_serves_hits_until_a_write(app, client, sample_book):
+    """Test that listings are cached per query, whatever the argument order, and invalidated by writes"""
+    app.config['RESPONSE_CACHE_BACKEND'] = 'memory'
+    cache = init_response_cache(app)
+
+    first = client.get('/api/books?sort=title&limit=5')
+    second = client.get('/api/books?limit=5&sort=title')
+    assert first.get_data() == second.get_data()
+    assert cache.get_stats() == {'hits': 1, 'misses': 1, 'stale_hits': 0, 'revalidations': 0, 'entries': 1}
+
+    BookService.create_book({'title': 'Emma', 'author_id': str(sample_book.author_id)})
+    titles = [book['title'] for book in client.get('/api/books?sort=title&limit=5').get_json()['books']]
+    assert titles == ['Emma', 'Pride and Prejudice']
+    assert client.get('/api/cache/stats').get_json()['misses'] == 2
+
+
+def test_response_cache_serves_stale_entries_while_revalidating(app, client, sample_book):
+    """Test that an outdated entry within the stale window is served once while a new one is rendered"""
+    app.config.update(RESPONSE_CACHE_BACKEND='memory', RESPONSE_CACHE_STALE_WHILE_REVALIDATE=60)
+    cache = init_response_cache(app)
+    client.get('/api/books')
+
+    BookService.create_book({'title': 'Emma', 'author_id': str(sample_book.author_id)})
+    stale = client.get('/api/books').get_json()['books']
+    assert [book['title'] for book in stale] == ['Pride and Prejudice']
+
+    for _ in range(100):
+        if cache.get_stats()['revalidations']:
+            break
+        time.sleep(0.02)
+    fresh = client.get('/api/books').get_json()['books']
+    assert [book['title'] for book in fresh] == ['Emma', 'Pride and Prejudice']
+    assert cache.get_stats()['stale_hits'] == 1
+
+
+def test_file_cache_backend_is_shared_between_instances(tmp_path):
+    """Test that entries written by one worker process are read by another and expire with the TTL"""
+    writer = FileCacheBackend(str(tmp_path), max_entries=10, ttl=60)
+    reader = FileCacheBackend(str(tmp_path), max_entries=10, ttl=60)
+    entry = CacheEntry(3, time.time(), 200, [('Content-Type', 'application/json')], b'{"books": []}')
+
+    writer.set('api_books?sort=title', entry)
+
+    assert reader.get('api_books?sort=title') == entry
+    assert reader.get('api_books?sort=author') is None
+    assert FileCacheBackend(str(tmp_path), max_entries=10, ttl=0).get('api_books?sort=title') is None
+
+
+def test_conditional_get_answers_unchanged_resources_with_304(client, sample_book):
+    """Test ETag and Last-Modified revalidation of the listing and a book page, and that writes change the ETag"""
+    listing = client.get('/api/books')
+    detail = client.get(f'/book/{sample_book.id}')
+    assert listing.headers['ETag'] and detail.headers['ETag']
+
+    not_modified = client.get('/api/books', headers={'If-None-Match': listing.headers['ETag']})
+    assert not_modified.status_code == 304 and not not_modified.get_data()
+    assert client.get(f'/book/{sample_book.id}', headers={'If-None-Match': detail.headers['ETag']}).status_code == 304
+
+    BookService.rate_book(sample_book.id, 9.0)
+    changed = client.get(f'/book/{sample_book.id}', headers={'If-None-Match': detail.headers['ETag']})
+    assert changed.status_code == 200 and changed.headers['ETag'] != detail.headers['ETag']
+    assert client.get('/api/books', headers={'If-None-Match': listing.headers['ETag']}).status_code == 200
+
+    # Last-Modified is only sent once the second of the last change is over
+    db.session.execute(update(CatalogRevision).values(updated_at=datetime.utcnow() - timedelta(hours=1)))
+    db.session.commit()
+    last_modified = client.get('/api/books').headers['Last-Modified']
+    assert client.get('/api/books', headers={'If-Modified-Since': last_modified}).status_code == 304
+
+    assert 'ETag' not in client.get('/book/999999').headers
+
+
+def _metric_value(client, prefix):
+    """Return the value of the /metrics sample whose line starts with prefix, 0 if absent."""
+    for line in client.get('/metrics').get_data(as_text=True).splitlines():
+        if line.startswith(prefix):
+            return float(line.rsplit(' ', 1)[1])
+    return 0.0
+
+
+def test_requests_report_server_timing_and_metrics(app, client, sample_book):
+    """Test that a page reports its SQL and template time and is counted per route on /metrics"""
+    if not app.config['METRICS_ENABLED']:
+        pytest.skip("METRICS_ENABLED is off")
+    requests_before = _metric_value(client, 'http_request_duration_seconds_count{route="/",method="GET",status="200"}')
+    found_before = _metric_value(client, 'cover_api_calls_total{outcome="found"}')
+
+    timing = client.get('/').headers['Server-Timing']
+    entries = dict(entry.split(';', 1) for entry in timing.split(', '))
+    assert set(entries) == {'db', 'tpl', 'total'}
+    assert int(entries['db'].split('desc="')[1].split(' ')[0]) > 0
+
+    with app.test_request_context():
+        with cover_api_call() as call:
+            call.outcome = 'found'
+
+    metrics = client.get('/metrics')
+    assert metrics.mimetype == 'text/plain'
+    assert '# TYPE http_request_sql_queries histogram' in metrics.get_data(as_text=True)
+    assert _metric_value(client, 'http_request_duration_seconds_count{route="/",method="GET",status="200"}') \
+        == requests_before + 1
+    assert _metric_value(client, 'cover_api_calls_total{outcome="found"}') == found_before + 1
+
+
+JSON_PAYLOADS = [
+    {'books': [{'id': 1, 'title': 'Brontë’s “Jane Eyre” 📚', 'rating': 8.5, 'isbn': None, 'cover': '</script>'}],
+     'count': 1, 'success': True},
+    [0.1, 2.5, -0.0, 1 / 3, 123456789.123, 5e-324, -7, 0, 2 ** 63 - 1, 2 ** 70],
+    {12: {'cover_url': None}, 3: {'z': None, 'a': []}},
+    {2.5: 'float key', 1.5: 'float key'},
+    {'published': date(1847, 10, 16), 'updated': datetime(2024, 1, 2, 3, 4, 5), 'price': Decimal('9.90')},
+    '\x00\x1f\u2028 control characters',
+]
+
+
+@pytest.mark.parametrize('payload', JSON_PAYLOADS)
+@pytest.mark.parametrize('dumps_options', [{'separators': (',', ':')}, {'indent': 2}])
+def test_orjson_provider_matches_the_default_provider(app, payload, dumps_options):
+    """Test that the orjson provider writes the same text as Flask's default provider"""
+    pytest.importorskip('orjson')
+
+    assert OrjsonProvider(app).dumps(payload, **dumps_options) == app.json.dumps(payload, **dumps_options)
+
+
+def test_orjson_provider_documented_float_differences(app):
+    """Test the only known differences: exponent notation and non-finite floats"""
+    pytest.importorskip('orjson')
+
+    payload = [1e16, 1e-7, float('nan'), float('inf'), float('-inf')]
+    assert app.json.dumps(payload, separators=(',', ':')) == '[1e+16,1e-07,NaN,Infinity,-Infinity]'
+    assert OrjsonProvider(app).dumps(payload, separators=(',', ':')) == '[1e16,1e-7,null,null,null]'
+
+
+def test_sparse_fieldsets_select_only_requested_columns(app, client, sample_book):
+    """Test fields= and embed= on the book API, and that the authors table is only read when needed"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        books = client.get('/api/books', query_string={'fields': 'id,title'}).get_json()['books']
+        assert books == [{'id': sample_book.id, 'title': 'Pride and Prejudice'}]
+        book_queries = [statement for statement in statements if 'FROM books' in statement]
+        assert book_queries and not any('authors' in statement for statement in book_queries)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+    books = client.get('/api/books', query_string={'fields': 'isbn,author.name'}).get_json()['books']
+    assert books == [{'isbn': '9780141439518', 'author': {'name': 'Jane Austen'}}]
+
+    default = client.get('/api/books').get_json()['books'][0]
+    assert 'author' in default and 'rating_stars' in default
+    assert 'author' not in client.get('/api/books', query_string={'embed': ''}).get_json()['books'][0]
+
+    assert client.get('/api/books', query_string={'fields': 'id,secret'}).status_code == 400
+    authors = client.get('/api/authors', query_string={'fields': 'name'}).get_json()['authors']
+    assert authors == [{'name': 'Jane Austen'}]
+
+
+PNG_COVER = b'\x89PNG\r\n\x1a\n' + b'\x00' * 32
+
+
+@pytest.fixture
+def provider_cover_book(app, sample_book, tmp_path):
+    """Book with a resolved provider cover but no local copy, and an empty cover image directory"""
+    app.config['COVER_IMAGE_DIR'] = str(tmp_path / 'covers')
+    book = db.session.get(Book, sample_book.id)
+    book.cover_url_cached = 'https://covers.example/pride.jpg'
+    book.cover_status = CoverStatus.RESOLVED
+    db.session.commit()
+    return book
+
+
+def test_cover_proxy_queues_downloads_instead_of_fetching(client, provider_cover_book, monkeypatch):
+    """Test that a cover request without a local copy redirects and queues one download job"""
+    def download(url):
+        raise AssertionError("Covers must not be downloaded while a request waits")
+
+    monkeypatch.setattr(cover_images, 'download_cover_image', download)
+    revision = CatalogRevision.current()
+
+    for _ in range(2):
+        response = client.get(f'/covers/{provider_cover_book.id}/thumb')
+        assert response.status_code == 302
+        assert response.location == 'https://covers.example/pride.jpg'
+
+    job = CoverJob.query.one()
+    assert (job.book_id, job.kind, job.status) == (provider_cover_book.id, CoverJob.IMAGE, CoverJob.QUEUED)
+    assert CatalogRevision.current() == revision
+
+
+def test_cover_image_job_stores_the_image_without_a_catalog_bump(app, client, provider_cover_book, monkeypatch):
+    """Test that the worker downloads the queued image, which the proxy then serves"""
+    def download(url):
+        image_hash = hashlib.sha256(PNG_COVER).hexdigest()
+        cover_images._write_atomic(cover_images.cover_image_path(image_hash), PNG_COVER)
+        return image_hash
+
+    monkeypatch.setattr(cover_images, 'download_cover_image', download)
+    client.get(f'/covers/{provider_cover_book.id}/original')
+    revision, book_revision = CatalogRevision.current(), provider_cover_book.revision
+
+    assert cover_jobs.process_next_cover_job()
+
+    db.session.refresh(provider_cover_book)
+    assert provider_cover_book.cover_image_hash == hashlib.sha256(PNG_COVER).hexdigest()
+    assert provider_cover_book.revision == book_revision + 1
+    assert CatalogRevision.current() == revision
+    assert CoverJob.query.count() == 0
+
+    response = client.get(f'/covers/{provider_cover_book.id}/original')
+    assert response.status_code == 200 and response.get_data() == PNG_COVER
+
+
+def test_failed_cover_download_is_recorded_and_not_retried_per_view(app, client, provider_cover_book, monkeypatch):
+    """Test that a download that keeps failing waits for the negative cache TTL and views do not queue it again"""
+    app.config['COVER_JOB_MAX_ATTEMPTS'] = 1
+
+    def download(url):
+        raise requests.ConnectionError("image host unavailable")
+
+    monkeypatch.setattr(cover_images, 'download_cover_image', download)
+    client.get(f'/covers/{provider_cover_book.id}/thumb')
+
+    assert cover_jobs.process_next_cover_job()
+    assert not cover_jobs.process_next_cover_job()
+
+    client.get(f'/covers/{provider_cover_book.id}/thumb')
+    job = CoverJob.query.one()
+    assert job.status == CoverJob.QUEUED and 'image host unavailable' in job.last_error
+    assert job.available_at > datetime.utcnow() + timedelta(seconds=app.config['COVER_CACHE_NEGATIVE_TTL'] - 60)
+    assert db.session.get(Book, provider_cover_book.id).cover_status == CoverStatus.RESOLVED
+
+
+@pytest.mark.parametrize('use_index', [True, False])
+def test_author_lookup_returns_matching_names(app, client, monkeypatch, use_index):
+    """Test that the author picker API returns id and name of the authors matching the typed prefix"""
+    if not use_index:
+        monkeypatch.delitem(app.extensions, 'suggest_index', raising=False)
+    elif get_suggest_index() is None:
+        pytest.skip("SUGGEST_INDEX_ENABLED is off")
+
+    authors = {name: AuthorService.create_author({'name': name, 'birthdate': '1900-01-01'}).id
+               for name in ['Janet Frame', 'Jane Austen', 'Stephen King']}
+
+    response = client.get('/api/authors/lookup', query_string={'q': 'JAN'})
+    assert response.status_code == 200
+    assert response.get_json() == {'success': True, 'authors': [
+        {'id': authors['Jane Austen'], 'name': 'Jane Austen'},
+        {'id': authors['Janet Frame'], 'name': 'Janet Frame'},
+    ]}
+
+    response = client.get('/api/authors/lookup', query_string={'q': 'jan', 'limit': '1'})
+    assert [author['name'] for author in response.get_json()['authors']] == ['Jane Austen']
+
+    assert client.get('/api/authors/lookup', query_string={'q': ' '}).get_json()['authors'] == []
+
+
+def test_book_forms_resolve_typed_author_names(client, sample_author, living_author, sample_book):
+    """Test that the book forms render without the author list and resolve an author name typed without the picker"""
+    page = client.get('/add_book').get_data(as_text=True)
+    assert '/api/authors/lookup' in page
+    assert 'Stephen King' not in page
+
+    response = client.post('/add_book', data={'title': 'Emma', 'author_name': ' Jane Austen '})
+    assert response.status_code == 302
+    book = Book.query.filter_by(title='Emma').one()
+    assert book.author_id == sample_author.id
+
+    response = client.post('/add_book', data={'title': 'Unknown Author', 'author_name': 'Nobody'})
+    assert response.status_code == 200
+    assert not Book.query.filter_by(title='Unknown Author').count()
+
+    page = client.get(f'/book/{sample_book.id}/edit').get_data(as_text=True)
+    assert 'value="Jane Austen"' in page
+    assert 'Stephen King' not in page
+
+    response = client.post(f'/book/{sample_book.id}/edit',
+                           data={'title': 'Pride and Prejudice', 'author_name': 'Stephen King'})
+    assert response.status_code == 302
+    assert db.session.get(Book, sample_book.id).author_id == living_author.id
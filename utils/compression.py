@@ -0,0 +1,163 @@
+import zlib
+from typing import Iterable, Iterator, Optional
+
+from flask import Flask, Response, current_app, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class _GzipCompressor:
+    """Incremental gzip compressor with the interface used for both encodings."""
+
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class _BrotliCompressor:
+    """Incremental brotli compressor."""
+
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+def available_encodings() -> list:
+    """
+    List the supported content codings in order of preference.
+    :return: Content coding names
+    """
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """
+    Derive the entity tag of a compressed representation.
+    Strong tags must differ between encodings of the same resource.
+    :param etag: Entity tag of the uncompressed representation
+    :param encoding: Content coding
+    :return: Entity tag for the encoded representation
+    """
+    return f"{etag}-{encoding}"
+
+
+def negotiate_encoding() -> Optional[str]:
+    """
+    Pick the best supported content coding from the request's Accept-Encoding header.
+    :return: 'br', 'gzip' or None if the client accepts neither
+    """
+    supported = available_encodings()
+    best = request.accept_encodings.best_match(supported)
+    if best and request.accept_encodings[best] > 0:
+        return best
+    return None
+
+
+def _create_compressor(encoding: str):
+    """
+    Create an incremental compressor configured from the application settings.
+    :param encoding: 'br' or 'gzip'
+    :return: Compressor instance
+    """
+    if encoding == 'br':
+        return _BrotliCompressor(current_app.config['COMPRESSION_BROTLI_QUALITY'])
+    return _GzipCompressor(current_app.config['COMPRESSION_LEVEL'])
+
+
+def _compress_stream(chunks: Iterable, compressor, flush_size: int) -> Iterator[bytes]:
+    """
+    Compress a streamed body, flushing regularly so clients receive data while it is produced.
+    :param chunks: Body chunks as str or bytes
+    :param compressor: Incremental compressor
+    :param flush_size: Uncompressed bytes between flushes
+    :return: Iterator of compressed chunks
+    """
+    pending = 0
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+
+            output = compressor.compress(chunk)
+            pending += len(chunk)
+            if pending >= flush_size:
+                output += compressor.flush()
+                pending = 0
+            if output:
+                yield output
+
+        yield compressor.finish()
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
+def compress_response(response: Response) -> Response:
+    """
+    Compress a response body according to the request's Accept-Encoding header.
+    Bodies smaller than COMPRESSION_MIN_SIZE, files and non-text types are sent unchanged.
+    :param response: Response object
+    :return: Possibly compressed response
+    """
+    config = current_app.config
+
+    if (response.mimetype not in config['COMPRESSION_MIMETYPES']
+            or response.status_code < 200 or response.status_code in (204, 206)
+            or response.status_code >= 300 or response.direct_passthrough
+            or 'Content-Encoding' in response.headers):
+        return response
+
+    response.vary.add('Accept-Encoding')
+
+    encoding = negotiate_encoding()
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        compressor = _create_compressor(encoding)
+        response.response = _compress_stream(response.response, compressor,
+                                             config['COMPRESSION_STREAM_FLUSH_SIZE'])
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < config['COMPRESSION_MIN_SIZE']:
+            return response
+
+        compressor = _create_compressor(encoding)
+        response.set_data(compressor.compress(data) + compressor.finish())
+
+    response.headers['Content-Encoding'] = encoding
+
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(encoded_etag(etag, encoding), weak)
+
+    return response
+
+
+def init_compression(app: Flask) -> None:
+    """
+    Register response compression if COMPRESSION_ENABLED is set.
+    :param app: Flask application instance
+    """
+    if app.config.get('COMPRESSION_ENABLED'):
+        app.after_request(compress_response)
@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta
+from functools import wraps
+from typing import Callable, Optional, Tuple
+
+from flask import current_app, g, request, session
+from werkzeug.http import is_resource_modified
+from werkzeug.wrappers import Response
+
+from utils.compression import available_encodings, encoded_etag
+
+Version = Tuple[str, Optional[datetime]]
+
+
+def conditional_get(get_version: Callable[..., Optional[Version]]):
+    """
+    Decorator adding strong ETag and Last-Modified validators to a GET view.
+
+    get_version receives the view arguments and returns a tag that changes with
+    every revision of the resource plus its last change time, or None if the
+    resource does not exist. Matching If-None-Match or If-Modified-Since requests
+    are answered with 304 before the view runs.
+    :param get_version: Function returning the resource version for the view arguments
+    :return: Decorator
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or session.get('_flashes'):
+                return view(*args, **kwargs)
+
+            version = get_version(**kwargs)
+            if version is None:
+                return view(*args, **kwargs)
+
+            etag, last_modified = version
+            last_modified = _http_last_modified(last_modified)
+
+            matched_etag = _match_if_none_match(etag)
+            if matched_etag or not is_resource_modified(request.environ, etag=etag,
+                                                        last_modified=last_modified):
+                response = Response(status=304)
+                _set_validators(response, matched_etag or etag, last_modified)
+                return response
+
+            response = current_app.make_response(view(*args, **kwargs))
+
+            # A stale response cache entry was rendered for an older revision
+            if response.status_code == 200 and not g.get('response_cache_stale'):
+                _set_validators(response, etag, last_modified)
+
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def _http_last_modified(last_modified: Optional[datetime]) -> Optional[datetime]:
+    """
+    Truncate a change time to the whole seconds of an HTTP date.
+    While that second is still running a later change would get the same date, so
+    Last-Modified is left out and the ETag alone validates until the second has passed.
+    :param last_modified: Last change time in UTC or None
+    :return: Truncated change time or None if it must not be used
+    """
+    if not last_modified:
+        return None
+
+    truncated = last_modified.replace(microsecond=0)
+    if datetime.utcnow() < truncated + timedelta(seconds=1):
+        return None
+    return truncated
+
+
+def _match_if_none_match(etag: str) -> Optional[str]:
+    """
+    Find the entity tag from If-None-Match that names a compressed representation of the resource.
+    :param etag: Entity tag of the uncompressed representation
+    :return: Matching encoded entity tag or None
+    """
+    for encoding in available_encodings():
+        candidate = encoded_etag(etag, encoding)
+        if request.if_none_match.contains(candidate):
+            return candidate
+    return None
+
+
+def _set_validators(response: Response, etag: str, last_modified: Optional[datetime]) -> None:
+    """
+    Attach ETag, Last-Modified and a revalidation policy to a response.
+    :param response: Response object
+    :param etag: Strong entity tag
+    :param last_modified: Last change time or None
+    """
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    response.cache_control.no_cache = True
@@ -1,6 +1,8 @@
-from typing import Any, Dict, List, Optional
+import base64
+import json
+from typing import Any, Dict, Iterable, List, Optional
 
-from flask import flash
+from flask import Response, current_app, flash, stream_with_context
 from markupsafe import escape
 from sqlalchemy import or_
 
@@ -139,4 +141,87 @@ def paginate_results(query, page: int = 1, per_page: int = 20):
         page=page,
         per_page=per_page,
         error_out=False
-    )
\ No newline at end of file
+    )
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """
+    Encode keyset pagination values into an opaque URL-safe cursor.
+    :param values: Sort key values of the last item on a page
+    :return: Cursor string
+    """
+    payload = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[List[Any]]:
+    """
+    Decode a cursor created by encode_cursor.
+    :param cursor: Cursor string
+    :return: List of sort key values or None if the cursor is malformed
+    """
+    if not cursor:
+        return None
+
+    try:
+        padding = '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(cursor + padding))
+    except (ValueError, TypeError):
+        return None
+
+    return values if isinstance(values, list) else None
+
+
+def parse_page_size(value: Any, default: int = AppConstants.DEFAULT_BOOKS_PER_PAGE,
+                    maximum: int = AppConstants.MAX_BOOKS_PER_PAGE) -> int:
+    """
+    Parse a requested page size and clamp it to the allowed range.
+    :param value: Raw page size value from the request
+    :param default: Page size used when the value is missing or invalid
+    :param maximum: Largest allowed page size
+    :return: Page size between 1 and maximum
+    """
+    try:
+        size = int(value)
+    except (ValueError, TypeError):
+        return default
+
+    return max(1, min(size, maximum))
+
+
+def parse_field_list(value: Optional[str]) -> Optional[List[str]]:
+    """
+    Parse a comma-separated list parameter such as fields or embed.
+    :param value: Raw parameter value from the request, None if absent
+    :return: List of stripped, non-empty names (empty if the value is blank) or None if absent
+    """
+    if value is None:
+        return None
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def parse_id_list(value: Optional[str]) -> List[int]:
+    """
+    Parse a comma-separated list of IDs, dropping duplicates but keeping their order.
+    :param value: Raw parameter value from the request
+    :return: List of positive integer IDs
+    :raises ValueError: If an entry is not a positive integer
+    """
+    ids = [int(entry) for entry in (value or '').split(',') if entry.strip()]
+    if any(entry_id < 1 for entry_id in ids):
+        raise ValueError("IDs must be positive")
+    return list(dict.fromkeys(ids))
+
+
+def ndjson_response(items: Iterable[Any], serialize=lambda item: item.to_dict()) -> Response:
+    """
+    Stream items as newline-delimited JSON, one object per line.
+    :param items: Iterable of items, consumed lazily while the response is sent
+    :param serialize: Function converting an item into a JSON-serializable object
+    :return: Streaming response
+    """
+    def generate():
+        for item in items:
+            yield current_app.json.dumps(serialize(item)) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
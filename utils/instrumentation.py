@@ -0,0 +1,292 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from flask import Flask, Response, before_render_template, g, has_request_context, request, template_rendered
+from sqlalchemy import event
+
+from models.models import db
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class Histogram:
+    """Prometheus-style histogram with one series per label set."""
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...], buckets: Tuple[float, ...]):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series: Dict[Tuple[str, ...], List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        """
+        Record one observation.
+        :param value: Observed value
+        :param labels: Label values in the order of label_names
+        """
+        with self._lock:
+            series = self._series.setdefault(labels, [[0] * len(self.buckets), 0.0, 0])
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def expose(self) -> Iterator[str]:
+        """
+        Render the histogram in the Prometheus text format.
+        :return: Iterator of lines
+        """
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+
+        with self._lock:
+            snapshot = [(labels, list(series[0]), series[1], series[2])
+                        for labels, series in sorted(self._series.items())]
+
+        for labels, bucket_counts, total, count in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket{_labels(self.label_names, labels, le=_number(bound))} {cumulative}"
+            yield f"{self.name}_bucket{_labels(self.label_names, labels, le='+Inf')} {count}"
+            yield f"{self.name}_sum{_labels(self.label_names, labels)} {_number(total)}"
+            yield f"{self.name}_count{_labels(self.label_names, labels)} {count}"
+
+
+class Counter:
+    """Prometheus-style counter with one series per label set."""
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...]):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self._series: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        """
+        Increment the counter.
+        :param labels: Label values in the order of label_names
+        :param amount: Increment
+        """
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0) + amount
+
+    def expose(self) -> Iterator[str]:
+        """
+        Render the counter in the Prometheus text format.
+        :return: Iterator of lines
+        """
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+
+        with self._lock:
+            snapshot = sorted(self._series.items())
+
+        for labels, value in snapshot:
+            yield f"{self.name}{_labels(self.label_names, labels)} {_number(value)}"
+
+
+REQUEST_DURATION = Histogram('http_request_duration_seconds', 'Time spent handling a request.',
+                             ('route', 'method', 'status'), DURATION_BUCKETS)
+REQUEST_SQL_QUERIES = Histogram('http_request_sql_queries', 'SQL statements executed per request.',
+                                ('route',), COUNT_BUCKETS)
+REQUEST_SQL_DURATION = Histogram('http_request_sql_duration_seconds', 'Time spent in SQL per request.',
+                                 ('route',), DURATION_BUCKETS)
+REQUEST_TEMPLATE_DURATION = Histogram('http_request_template_duration_seconds',
+                                      'Time spent rendering templates per request.', ('route',), DURATION_BUCKETS)
+REQUEST_COVER_DURATION = Histogram('http_request_cover_api_duration_seconds',
+                                   'Time spent calling the cover API per request.', ('route',), DURATION_BUCKETS)
+COVER_API_DURATION = Histogram('cover_api_call_duration_seconds', 'Duration of cover API calls.',
+                               ('outcome',), DURATION_BUCKETS)
+COVER_API_CALLS = Counter('cover_api_calls_total', 'Cover API calls by outcome.', ('outcome',))
+
+METRICS = (REQUEST_DURATION, REQUEST_SQL_QUERIES, REQUEST_SQL_DURATION, REQUEST_TEMPLATE_DURATION,
+           REQUEST_COVER_DURATION, COVER_API_DURATION, COVER_API_CALLS)
+
+
+class RequestMetrics:
+    """Timings collected while one request is handled."""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.query_count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.cover_api_time = 0.0
+        self._template_started: List[float] = []
+
+
+def current_request_metrics() -> Optional[RequestMetrics]:
+    """
+    Get the metrics of the request being handled on this thread.
+    :return: Request metrics or None outside of an instrumented request
+    """
+    if not has_request_context():
+        return None
+    return g.get('request_metrics')
+
+
+class CoverApiCall:
+    """Outcome of one cover API call, set by the caller before the block ends."""
+
+    def __init__(self):
+        self.outcome = 'error'
+
+
+@contextmanager
+def cover_api_call() -> Iterator[CoverApiCall]:
+    """
+    Time a cover API call, count its outcome and add its duration to the current request.
+    The outcome stays 'error' unless the block sets another one.
+    :return: Context manager yielding the call record
+    """
+    call = CoverApiCall()
+    started = time.perf_counter()
+    try:
+        yield call
+    finally:
+        duration = time.perf_counter() - started
+        COVER_API_CALLS.inc(call.outcome)
+        COVER_API_DURATION.observe(duration, call.outcome)
+
+        metrics = current_request_metrics()
+        if metrics:
+            metrics.cover_api_time += duration
+
+
+def render_metrics() -> str:
+    """
+    Render all metrics in the Prometheus text exposition format.
+    :return: Metrics text
+    """
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.expose())
+    return '\n'.join(lines) + '\n'
+
+
+def server_timing_header(metrics: RequestMetrics, total: float) -> str:
+    """
+    Build a Server-Timing header value from request metrics.
+    :param metrics: Request metrics
+    :param total: Total request time in seconds
+    :return: Header value
+    """
+    entries = [
+        f'db;dur={metrics.sql_time * 1000:.2f};desc="{metrics.query_count} queries"',
+        f'tpl;dur={metrics.template_time * 1000:.2f}',
+    ]
+    if metrics.cover_api_time:
+        entries.append(f'cover;dur={metrics.cover_api_time * 1000:.2f}')
+    entries.append(f'total;dur={total * 1000:.2f}')
+    return ', '.join(entries)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info['query_started_at'] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop('query_started_at', None)
+    metrics = current_request_metrics()
+    if metrics and started is not None:
+        metrics.query_count += 1
+        metrics.sql_time += time.perf_counter() - started
+
+
+def _before_render_template(app, template, context, **extra):
+    metrics = current_request_metrics()
+    if metrics:
+        metrics._template_started.append(time.perf_counter())
+
+
+def _template_rendered(app, template, context, **extra):
+    metrics = current_request_metrics()
+    if metrics and metrics._template_started:
+        metrics.template_time += time.perf_counter() - metrics._template_started.pop()
+
+
+def init_instrumentation(app: Flask) -> None:
+    """
+    Record per-request SQL, template and cover API timings if METRICS_ENABLED is set.
+    Adds a Server-Timing header if SERVER_TIMING_ENABLED is set and serves /metrics.
+    Must run after init_db and before the other after_request hooks are registered,
+    so the total request time includes them.
+    :param app: Flask application instance
+    """
+    if not app.config.get('METRICS_ENABLED'):
+        return
+
+    with app.app_context():
+        engine = db.engine
+
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    before_render_template.connect(_before_render_template, app)
+    template_rendered.connect(_template_rendered, app)
+
+    @app.before_request
+    def start_request_metrics():
+        g.request_metrics = RequestMetrics()
+
+    @app.after_request
+    def record_request_metrics(response: Response) -> Response:
+        metrics = g.pop('request_metrics', None)
+        if metrics is None:
+            return response
+
+        total = time.perf_counter() - metrics.started_at
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+
+        REQUEST_DURATION.observe(total, route, request.method, str(response.status_code))
+        REQUEST_SQL_QUERIES.observe(metrics.query_count, route)
+        REQUEST_SQL_DURATION.observe(metrics.sql_time, route)
+        REQUEST_TEMPLATE_DURATION.observe(metrics.template_time, route)
+        if metrics.cover_api_time:
+            REQUEST_COVER_DURATION.observe(metrics.cover_api_time, route)
+
+        if app.config.get('SERVER_TIMING_ENABLED'):
+            response.headers['Server-Timing'] = server_timing_header(metrics, total)
+
+        return response
+
+    @app.route('/metrics')
+    def metrics_endpoint():
+        """
+        Expose request and cover API metrics in the Prometheus text format.
+        :return: Plain text metrics response
+        """
+        return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], **extra: str) -> str:
+    """
+    Format a Prometheus label set.
+    :param names: Label names
+    :param values: Label values
+    :param extra: Additional labels such as le
+    :return: Label string including braces, or an empty string
+    """
+    pairs = list(zip(names, values)) + list(extra.items())
+    if not pairs:
+        return ''
+    escaped = (f'{name}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+               for name, value in pairs)
+    return '{' + ','.join(escaped) + '}'
+
+
+def _number(value: float) -> str:
+    """
+    Format a sample value without a trailing '.0' for whole numbers.
+    :param value: Number
+    :return: Formatted number
+    """
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
@@ -0,0 +1,76 @@
+import re
+from typing import Any
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_NON_ASCII = re.compile('[^\x00-\x7f]')
+
+
+def _escape_non_ascii(match: re.Match) -> str:
+    """
+    Escape one non-ASCII character the way json.dumps does with ensure_ascii,
+    using a surrogate pair outside the Basic Multilingual Plane.
+    :param match: Regex match of a single character
+    :return: \\uXXXX escape sequence(s)
+    """
+    code = ord(match.group())
+    if code < 0x10000:
+        return f'\\u{code:04x}'
+    code -= 0x10000
+    return f'\\u{0xd800 | (code >> 10):04x}\\u{0xdc00 | (code & 0x3ff):04x}'
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    JSON provider that serializes with orjson, with the same output as the default provider
+    for the values the API returns: strings, integers, plain floats, dates, None and
+    nested dicts and lists.
+
+    Two differences remain: floats written in exponent form lose the sign and padding
+    of the exponent (1e16 instead of 1e+16, 1e-7 instead of 1e-07), and NaN and
+    Infinity become null, where json emits tokens that are not valid JSON. Values orjson
+    rejects go to the json module: integers beyond 64 bits and dicts with non-string
+    keys, which orjson would sort as strings ("12" before "3") instead of numerically.
+
+    orjson handles the two forms Flask's response() produces, compact separators and
+    two-space indentation in debug mode. Any other dumps call goes to the json module,
+    since json.dumps defaults to spaced separators that orjson cannot emit.
+    """
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        compact = kwargs == {'separators': (',', ':')}
+        indented = kwargs == {'indent': 2}
+        if not (compact or indented):
+            return super().dumps(obj, **kwargs)
+
+        options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indented:
+            options |= orjson.OPT_INDENT_2
+
+        try:
+            text = orjson.dumps(obj, default=self.default, option=options).decode()
+        except orjson.JSONEncodeError:
+            return super().dumps(obj, **kwargs)
+        if self.ensure_ascii:
+            text = _NON_ASCII.sub(_escape_non_ascii, text)
+        return text
+
+
+def init_json_provider(app: Flask) -> None:
+    """
+    Switch the app to the orjson provider if JSON_PROVIDER is 'orjson' and orjson is installed.
+    :param app: Flask application instance
+    """
+    if app.config.get('JSON_PROVIDER') == 'orjson':
+        if orjson is None:
+            app.logger.warning("JSON_PROVIDER is 'orjson' but orjson is not installed, using the default provider")
+            return
+        app.json = OrjsonProvider(app)
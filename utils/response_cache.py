@@ -0,0 +1,343 @@
+import hashlib
+import os
+import pickle
+import random
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from flask import Flask, Response, current_app, g, request, session
+
+from models.models import CatalogRevision
+
+
+class CacheEntry(NamedTuple):
+    """A cached response together with the catalog revision it was rendered for."""
+
+    revision: int
+    created_at: float
+    status: int
+    headers: List[Tuple[str, str]]
+    body: bytes
+
+
+class MemoryCacheBackend:
+    """In-process LRU store bounded by entry count and age."""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """
+        Get an entry that is younger than the TTL.
+        :param key: Cache key
+        :return: Cache entry or None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            if time.time() - entry.created_at > self.ttl:
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        """
+        Store an entry, evicting the least recently used ones beyond max_entries.
+        :param key: Cache key
+        :param entry: Cache entry
+        """
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """
+        Remove all entries.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class FileCacheBackend:
+    """On-disk store shared by all worker processes that use the same directory."""
+
+    PRUNE_PROBABILITY = 0.01
+
+    def __init__(self, directory: str, max_entries: int, ttl: float):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.ttl = ttl
+        os.makedirs(directory, exist_ok=True)
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """
+        Get an entry that is younger than the TTL.
+        :param key: Cache key
+        :return: Cache entry or None
+        """
+        try:
+            with open(self._path(key), 'rb') as cache_file:
+                entry = CacheEntry(*pickle.load(cache_file))
+        except (OSError, pickle.UnpicklingError, EOFError, TypeError):
+            return None
+
+        if time.time() - entry.created_at > self.ttl:
+            return None
+        return entry
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        """
+        Store an entry with an atomic rename so readers never see partial files.
+        :param key: Cache key
+        :param entry: Cache entry
+        """
+        path = self._path(key)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+        try:
+            with open(temp_path, 'wb') as cache_file:
+                pickle.dump(tuple(entry), cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, path)
+        except OSError:
+            return
+
+        if random.random() < self.PRUNE_PROBABILITY:
+            self.prune()
+
+    def prune(self) -> None:
+        """
+        Delete expired files and the oldest files beyond max_entries.
+        """
+        files = []
+        now = time.time()
+
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                modified = os.path.getmtime(path)
+                if now - modified > self.ttl:
+                    os.remove(path)
+                else:
+                    files.append((modified, path))
+            except OSError:
+                continue
+
+        files.sort()
+        for _, path in files[:max(0, len(files) - self.max_entries)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def clear(self) -> None:
+        """
+        Remove all entries.
+        """
+        for name in os.listdir(self.directory):
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+    def __len__(self) -> int:
+        return len(os.listdir(self.directory))
+
+    def _path(self, key: str) -> str:
+        """
+        Map a cache key to a file path.
+        :param key: Cache key
+        :return: File path
+        """
+        return os.path.join(self.directory, hashlib.sha256(key.encode('utf-8')).hexdigest())
+
+
+class ResponseCache:
+    """
+    Caches full responses of read-only views until the catalog revision changes.
+
+    Every BookService and AuthorService write increments the catalog revision, so an
+    entry is fresh exactly while its stored revision matches the current one. With
+    stale_while_revalidate > 0, an outdated entry younger than that many seconds is
+    still served while a background thread renders the new version.
+    """
+
+    def __init__(self, app: Flask, backend, stale_while_revalidate: float = 0):
+        self.app = app
+        self.backend = backend
+        self.stale_while_revalidate = stale_while_revalidate
+        self.stats = {'hits': 0, 'misses': 0, 'stale_hits': 0, 'revalidations': 0}
+        self._lock = threading.Lock()
+        self._revalidating = set()
+
+    def serve(self, view, args: tuple, kwargs: dict) -> Response:
+        """
+        Serve a view from the cache or render and store it.
+        :param view: Undecorated view function
+        :param args: View positional arguments
+        :param kwargs: View keyword arguments
+        :return: Response
+        """
+        key = self._request_key()
+        revision = CatalogRevision.current()
+        entry = self.backend.get(key)
+
+        if entry and entry.revision == revision:
+            self._count('hits')
+            return self._to_response(entry)
+
+        if entry and self.stale_while_revalidate and \
+                time.time() - entry.created_at <= self.stale_while_revalidate:
+            self._count('stale_hits')
+            g.response_cache_stale = True
+            self._revalidate_async(key, view, args, kwargs)
+            return self._to_response(entry)
+
+        self._count('misses')
+        response = current_app.make_response(view(*args, **kwargs))
+        self._store(key, revision, response)
+        return response
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Get hit and miss counters and the number of stored entries.
+        :return: Dictionary of counters
+        """
+        with self._lock:
+            stats = dict(self.stats)
+        stats['entries'] = len(self.backend)
+        return stats
+
+    def _store(self, key: str, revision: int, response: Response) -> None:
+        """
+        Store a response if it is cacheable.
+        :param key: Cache key
+        :param revision: Catalog revision the response was rendered for
+        :param response: Response to store
+        """
+        if response.status_code != 200 or response.is_streamed or session.modified:
+            return
+
+        headers = [(name, value) for name, value in response.headers
+                   if name.lower() not in ('set-cookie', 'content-length')]
+        entry = CacheEntry(revision, time.time(), response.status_code, headers, response.get_data())
+        self.backend.set(key, entry)
+
+    def _revalidate_async(self, key: str, view, args: tuple, kwargs: dict) -> None:
+        """
+        Re-render a stale entry in a background thread, at most once per key at a time.
+        :param key: Cache key
+        :param view: Undecorated view function
+        :param args: View positional arguments
+        :param kwargs: View keyword arguments
+        """
+        with self._lock:
+            if key in self._revalidating:
+                return
+            self._revalidating.add(key)
+
+        path, query_string = request.path, request.query_string.decode('latin-1')
+
+        def revalidate():
+            try:
+                with self.app.test_request_context(path, query_string=query_string):
+                    revision = CatalogRevision.current()
+                    response = self.app.make_response(view(*args, **kwargs))
+                    self._store(key, revision, response)
+                    self._count('revalidations')
+            except Exception:
+                self.app.logger.exception("Revalidating cached response %s failed", key)
+            finally:
+                with self._lock:
+                    self._revalidating.discard(key)
+
+        threading.Thread(target=revalidate, name='response-cache-revalidate', daemon=True).start()
+
+    def _count(self, counter: str) -> None:
+        """
+        Increment a statistics counter.
+        :param counter: Counter name
+        """
+        with self._lock:
+            self.stats[counter] += 1
+
+    @staticmethod
+    def _request_key() -> str:
+        """
+        Build the cache key from the endpoint and the sorted query arguments.
+        :return: Cache key
+        """
+        arguments = '&'.join(f"{name}={value}" for name, value in sorted(request.args.items(multi=True)))
+        return f"{request.endpoint}?{arguments}"
+
+    @staticmethod
+    def _to_response(entry: CacheEntry) -> Response:
+        """
+        Rebuild a response from a cache entry.
+        :param entry: Cache entry
+        :return: Response
+        """
+        return Response(entry.body, status=entry.status, headers=entry.headers)
+
+
+def cached_response(view):
+    """
+    Decorator serving a GET view through the application's response cache.
+    Requests with pending flash messages or a streaming format bypass the cache.
+    :param view: View function
+    :return: Wrapped view function
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        cache = current_app.extensions.get('response_cache')
+        if (cache is None or request.method != 'GET' or session.get('_flashes')
+                or request.args.get('format') == 'ndjson'):
+            return view(*args, **kwargs)
+
+        return cache.serve(view, args, kwargs)
+
+    return wrapper
+
+
+CACHE_BACKENDS = {
+    'memory': lambda config: MemoryCacheBackend(config['RESPONSE_CACHE_MAX_ENTRIES'],
+                                                config['RESPONSE_CACHE_TTL']),
+    'filesystem': lambda config: FileCacheBackend(config['RESPONSE_CACHE_DIR'],
+                                                  config['RESPONSE_CACHE_MAX_ENTRIES'],
+                                                  config['RESPONSE_CACHE_TTL']),
+}
+
+
+def init_response_cache(app: Flask) -> Optional[ResponseCache]:
+    """
+    Create the response cache configured by RESPONSE_CACHE_BACKEND.
+    The setting may name a built-in backend or be a factory taking the app config.
+    :param app: Flask application instance
+    :return: Response cache or None if caching is disabled
+    """
+    backend_setting = app.config.get('RESPONSE_CACHE_BACKEND')
+    if not backend_setting:
+        return None
+
+    factory = CACHE_BACKENDS.get(backend_setting, backend_setting)
+    if not callable(factory):
+        raise ValueError(f"Unknown response cache backend '{backend_setting}'")
+
+    cache = ResponseCache(app, factory(app.config),
+                          app.config.get('RESPONSE_CACHE_STALE_WHILE_REVALIDATE', 0))
+    app.extensions['response_cache'] = cache
+    return cache
@@ -0,0 +1,178 @@
+import hmac
+import json
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from flask import Flask, abort, current_app, has_request_context, render_template, request
+from sqlalchemy import event
+
+from models.models import db
+
+MAX_PARAMETER_LENGTH = 200
+
+
+class SlowQueryLog:
+    """Bounded ring buffer of slow statements, optionally mirrored to a JSONL file."""
+
+    def __init__(self, threshold: float, max_entries: int, log_file: Optional[str] = None):
+        self.threshold = threshold
+        self.log_file = log_file
+        self._records = deque(maxlen=max_entries)
+        self._lock = threading.Lock()
+
+    def add(self, record: Dict[str, Any]) -> None:
+        """
+        Store a slow query record and append it to the log file if one is configured.
+        :param record: Slow query record
+        """
+        with self._lock:
+            self._records.append(record)
+
+            if self.log_file:
+                with open(self.log_file, 'a', encoding='utf-8') as log_file:
+                    log_file.write(json.dumps(record, default=str) + '\n')
+
+    def records(self) -> List[Dict[str, Any]]:
+        """
+        Get the buffered records, newest first.
+        :return: List of slow query records
+        """
+        with self._lock:
+            return list(reversed(self._records))
+
+    def clear(self) -> None:
+        """
+        Drop all buffered records. The log file is left untouched.
+        """
+        with self._lock:
+            self._records.clear()
+
+
+def explain_query_plan(cursor, statement: str, parameters) -> Optional[List[str]]:
+    """
+    Run EXPLAIN QUERY PLAN for a statement on the DBAPI connection of its cursor.
+    Bypasses SQLAlchemy so the EXPLAIN itself is neither timed nor counted.
+    :param cursor: DBAPI cursor that executed the statement
+    :param statement: SQL statement
+    :param parameters: Statement parameters
+    :return: Indented plan lines or None if the statement cannot be explained
+    """
+    if not statement.lstrip().upper().startswith(('SELECT', 'WITH', 'UPDATE', 'DELETE', 'INSERT')):
+        return None
+
+    try:
+        rows = cursor.connection.execute(f"EXPLAIN QUERY PLAN {statement}", parameters or ()).fetchall()
+    except Exception:
+        return None
+
+    depths = {0: -1}
+    lines = []
+    for node_id, parent_id, _, detail in rows:
+        depths[node_id] = depths.get(parent_id, -1) + 1
+        lines.append('  ' * depths[node_id] + detail)
+    return lines
+
+
+def _serialize_parameters(parameters) -> Any:
+    """
+    Make statement parameters JSON-safe and cap long values.
+    :param parameters: Positional or named statement parameters
+    :return: List or dict of printable values
+    """
+    def serialize(value):
+        if value is None or isinstance(value, (int, float, bool)):
+            return value
+        text = str(value)
+        return text if len(text) <= MAX_PARAMETER_LENGTH else text[:MAX_PARAMETER_LENGTH] + '…'
+
+    if isinstance(parameters, dict):
+        return {key: serialize(value) for key, value in parameters.items()}
+    return [serialize(value) for value in parameters or ()]
+
+
+def _request_details() -> Dict[str, Optional[str]]:
+    """
+    Describe the request that issued a statement.
+    :return: Route, method and path, all None outside of a request
+    """
+    if not has_request_context():
+        return {'route': None, 'method': None, 'path': None}
+    return {
+        'route': request.url_rule.rule if request.url_rule else None,
+        'method': request.method,
+        'path': request.full_path.rstrip('?'),
+    }
+
+
+def init_slow_query_log(app: Flask) -> None:
+    """
+    Record statements slower than SLOW_QUERY_THRESHOLD_MS with their parameters,
+    issuing route and query plan, and serve them on /debug/slow-queries.
+    The page is only reachable in debug mode or with DEBUG_TOKEN as token.
+    :param app: Flask application instance
+    """
+    threshold_ms = app.config.get('SLOW_QUERY_THRESHOLD_MS')
+    if threshold_ms is None:
+        return
+
+    slow_query_log = SlowQueryLog(threshold_ms / 1000, app.config.get('SLOW_QUERY_BUFFER_SIZE', 200),
+                                  app.config.get('SLOW_QUERY_LOG_FILE'))
+    app.extensions['slow_query_log'] = slow_query_log
+
+    with app.app_context():
+        engine = db.engine
+    capture_plan = engine.dialect.name == 'sqlite'
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info['slow_query_started_at'] = time.perf_counter()
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def record_slow_query(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop('slow_query_started_at', None)
+        if started is None:
+            return
+
+        duration = time.perf_counter() - started
+        if duration < slow_query_log.threshold:
+            return
+
+        slow_query_log.add({
+            'recorded_at': datetime.utcnow().isoformat(timespec='seconds'),
+            'duration_ms': round(duration * 1000, 2),
+            'statement': statement,
+            'parameters': None if executemany else _serialize_parameters(parameters),
+            'executemany': executemany,
+            'plan': explain_query_plan(cursor, statement, parameters) if capture_plan and not executemany else None,
+            **_request_details(),
+        })
+
+    @app.route('/debug/slow-queries')
+    def slow_queries():
+        """
+        List the recorded slow queries, newest first.
+        :return: Slow query template
+        """
+        _require_debug_access()
+
+        return render_template('debug/slow_queries.html',
+                               records=slow_query_log.records(),
+                               threshold_ms=threshold_ms,
+                               log_file=slow_query_log.log_file)
+
+
+def _require_debug_access() -> None:
+    """
+    Abort with 404 unless the app runs in debug mode or the request carries DEBUG_TOKEN,
+    either as X-Debug-Token header or as token query parameter.
+    """
+    if current_app.debug:
+        return
+
+    expected = current_app.config.get('DEBUG_TOKEN')
+    supplied = request.headers.get('X-Debug-Token') or request.args.get('token')
+    if not expected or not supplied or not hmac.compare_digest(expected.encode(), supplied.encode()):
+        abort(404)